@@ -1,7 +1,21 @@
 """Import stuff"""
 
+from alphaessaio.cache import HistoryCache, SharedResponseCache
 from alphaessaio.client import AlphaEssAPI, AlphaEssAuth
+from alphaessaio.deadline import AlphaEssDeadlineError, AlphaEssTimeoutError
+from alphaessaio.quota import QuotaLedger
+from alphaessaio.scheduler import Priority, RequestScheduler
 
-__all__ = [AlphaEssAPI, AlphaEssAuth]
+__all__ = [
+    "AlphaEssAPI",
+    "AlphaEssAuth",
+    "AlphaEssDeadlineError",
+    "AlphaEssTimeoutError",
+    "HistoryCache",
+    "Priority",
+    "QuotaLedger",
+    "RequestScheduler",
+    "SharedResponseCache",
+]
 
 __version__ = "0.2.0"
@@ -0,0 +1,358 @@
+"""Local caches for AlphaESS API responses."""
+
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Hit and miss counters of a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _connect(path: str | Path, timeout: float = 30) -> sqlite3.Connection:
+    """Open a sqlite database in autocommit and WAL mode.
+
+    WAL lets any number of readers, also from other processes, run next to
+    a single writer. timeout is how many seconds a write waits for another
+    writer before failing.
+    """
+    connection = sqlite3.connect(
+        str(path), timeout=timeout, isolation_level=None, check_same_thread=False
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _encode(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+class HistoryCache:
+    """Persistent cache for history responses of days that are over.
+
+    Responses of getOneDayPowerBySn and getOneDateEnergyBySn are stored by
+    endpoint, sys_sn and query date. Days younger than settle_days are
+    never cached nor served, so the still changing current day always comes
+    from the cloud. Increase settle_days if systems live in time zones ahead
+    of the local one.
+    """
+
+    ENDPOINTS = ("getOneDayPowerBySn", "getOneDateEnergyBySn")
+
+    def __init__(
+        self,
+        path: str | Path,
+        settle_days: int = 1,
+        today: Callable[[], datetime.date] = datetime.date.today,
+    ):
+        self.path = Path(path)
+        self.settle_days = settle_days
+        self.stats = CacheStats()
+        self._today = today
+        self._lock = threading.Lock()
+        self._connection = _connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " endpoint TEXT NOT NULL, sys_sn TEXT NOT NULL, query_date TEXT NOT NULL,"
+            " data BLOB NOT NULL, PRIMARY KEY (endpoint, sys_sn, query_date))"
+        )
+
+    def is_cacheable(self, endpoint: str, query_date: str) -> bool:
+        """Whether responses of endpoint for query_date never change anymore."""
+        if endpoint not in self.ENDPOINTS:
+            return False
+        try:
+            day = datetime.date.fromisoformat(query_date)
+        except ValueError:
+            return False
+        return (self._today() - day).days >= self.settle_days
+
+    def get(self, endpoint: str, sys_sn: str, query_date: str) -> dict | None:
+        """Return the cached raw response or None."""
+        if not self.is_cacheable(endpoint, query_date):
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM history"
+                " WHERE endpoint = ? AND sys_sn = ? AND query_date = ?",
+                (endpoint, sys_sn, query_date),
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        logger.debug(f"history cache hit for {endpoint=} {sys_sn=} {query_date=}")
+        return _decode(row[0])
+
+    def put(self, endpoint: str, sys_sn: str, query_date: str, data: dict) -> bool:
+        """Store a raw response, returns whether it was cacheable."""
+        if not self.is_cacheable(endpoint, query_date) or not data.get("data"):
+            return False
+        blob = _encode(data)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)",
+                (endpoint, sys_sn, query_date, blob),
+            )
+            self.stats.stores += 1
+        return True
+
+    def delete(self, endpoint: str, sys_sn: str, query_date: str):
+        """Drop a cached response, e.g. after it turned out to be incomplete."""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM history"
+                " WHERE endpoint = ? AND sys_sn = ? AND query_date = ?",
+                (endpoint, sys_sn, query_date),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM history").fetchone()[
+                0
+            ]
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+
+# seconds a response stays fresh, endpoints not listed are never shared
+DEFAULT_TTLS: dict[str, float] = {
+    "getLastPowerData": 10,
+    "getEvChargerStatusBySn": 10,
+    "getSumDataForCustomer": 60,
+    "getEssList": 300,
+    "getChargeConfigInfo": 300,
+    "getDisChargeConfigInfo": 300,
+    "getEvChargerConfigList": 3600,
+}
+
+
+@dataclasses.dataclass
+class SharedCacheStats(CacheStats):
+    """Counters of a shared cache including waits for other fetchers."""
+
+    lock_waits: int = 0
+    lock_wait_time: float = 0.0
+
+
+class SharedResponseCache:
+    """Response cache shared by all processes using the same sqlite file.
+
+    For every (account, endpoint, params) only one process fetches within
+    the freshness window, the others wait for its result. The fetching
+    process holds a lock row that expires after lock_timeout seconds, so a
+    crashed worker cannot block the others. Within a process concurrent
+    lookups of the same key wait on a single future. Database access runs
+    in a thread, a busy database never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttls: dict[str, float] | None = None,
+        lock_timeout: float = 30,
+        poll_interval: float = 0.05,
+        busy_timeout: float = 1,
+    ):
+        """
+        Args:
+            path (str | Path): sqlite database shared by the workers
+            ttls (dict[str, float] | None): freshness by endpoint name, merged into DEFAULT_TTLS
+            lock_timeout (float): seconds after which a fetch lock is considered stale
+            poll_interval (float): seconds between checks while waiting for another process
+            busy_timeout (float): seconds a write waits for other processes, a lock
+                claim that times out is retried after poll_interval
+        """
+        self.path = Path(path)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.stats = SharedCacheStats()
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._connection = _connect(self.path, timeout=busy_timeout)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS locks ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def key(endpoint: str, params, account: str = "") -> str:
+        """Cache key, responses of different accounts are never shared."""
+        return f"{account}:{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def lookup(self, key: str) -> dict | None:
+        """Return a fresh response or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM responses WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else _decode(row[0])
+
+    def store(self, key: str, data: dict, ttl: float):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, _encode(data), time.time() + ttl),
+            )
+            self.stats.stores += 1
+
+    def invalidate(self, endpoint: str, params, account: str = ""):
+        """Drop a shared response, e.g. after the settings it shows were changed."""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key = ?",
+                (self.key(endpoint, params, account),),
+            )
+
+    def _claim(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            try:
+                self._connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as error:
+                logger.debug(f"fetch lock of {key} not claimed: {error}")
+                return False
+            try:
+                self._connection.execute(
+                    "DELETE FROM locks WHERE key = ? AND expires <= ?", (key, now)
+                )
+                claimed = self._connection.execute(
+                    "INSERT OR IGNORE INTO locks VALUES (?, ?, ?)",
+                    (key, self._owner, now + self.lock_timeout),
+                ).rowcount
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return bool(claimed)
+
+    def _release(self, key: str):
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM locks WHERE key = ? AND owner = ?", (key, self._owner)
+            )
+
+    async def _store_quietly(self, key: str, data: dict, ttl: float):
+        try:
+            await asyncio.to_thread(self.store, key, data, ttl)
+        except sqlite3.OperationalError as error:
+            # the caller still gets the response, other workers fetch it again
+            logger.warning(f"Response of {key} not shared: {error}")
+
+    async def _fetch_shared(
+        self, key: str, ttl: float, fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        waited_since = None
+        try:
+            while True:
+                if await asyncio.to_thread(self._claim, key):
+                    try:
+                        self.stats.misses += 1
+                        data = await fetch()
+                        await self._store_quietly(key, data, ttl)
+                        return data
+                    finally:
+                        await asyncio.to_thread(self._release, key)
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self.stats.lock_waits += 1
+                await asyncio.sleep(self.poll_interval)
+                data = await asyncio.to_thread(self.lookup, key)
+                if data is not None:
+                    self.stats.hits += 1
+                    return data
+        finally:
+            if waited_since is not None:
+                self.stats.lock_wait_time += time.monotonic() - waited_since
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        params,
+        fetch: Callable[[], Awaitable[dict]],
+        account: str = "",
+    ) -> dict:
+        """Return a fresh shared response or fetch and share it.
+
+        Args:
+            endpoint (str): endpoint name, e.g. getLastPowerData
+            params: request parameters
+            fetch (Callable[[], Awaitable[dict]]): sends the request
+            account (str): AppID the request is sent with
+
+        Returns:
+            (dict): raw response
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return await fetch()
+        key = self.key(endpoint, params, account)
+        data = await asyncio.to_thread(self.lookup, key)
+        if data is not None:
+            self.stats.hits += 1
+            return data
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            await asyncio.wait({inflight})
+            if inflight.cancelled():
+                return await self.get_or_fetch(endpoint, params, fetch, account)
+            data = inflight.result()
+            self.stats.hits += 1
+            return data
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._fetch_shared(key, ttl, fetch)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # retrieved here so a future without waiters does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+            return data
+        finally:
+            del self._inflight[key]
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
@@ -0,0 +1,138 @@
+"""Record API interactions to a file and replay them without network."""
+
+import asyncio
+import collections
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "REDACTED"
+
+
+class CassetteMissError(LookupError):
+    """No recorded response is left for a request in replay mode."""
+
+
+def _key(method: str, url: str, params) -> tuple[str, str, str]:
+    return method, url, json.dumps(params, sort_keys=True, default=str)
+
+
+class Cassette:
+    """Gzip compressed json lines file of request/response pairs.
+
+    In record mode every request sent by AlphaEssAPI is appended together
+    with its status, response body and duration. The sign header is
+    replaced and the app secret is scrubbed from every line. In replay mode
+    the recorded responses are served in recording order per request
+    without network access, optionally sleeping for the recorded duration.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        mode: Literal["record", "replay"] = "replay",
+        keep_timing: bool = False,
+        secrets: tuple[str, ...] = (),
+    ):
+        """
+        Args:
+            path (str | Path): cassette file
+            mode (Literal["record", "replay"]): record or replay interactions
+            keep_timing (bool): sleep for the recorded duration when replaying
+            secrets (tuple[str, ...]): strings scrubbed from recorded lines
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.keep_timing = keep_timing
+        self.secrets = tuple(secret for secret in secrets if secret)
+        self.recorded = 0
+        self.played = 0
+        self._file = None
+        self._interactions: dict[tuple[str, str, str], collections.deque] = (
+            collections.defaultdict(collections.deque)
+        )
+        if mode == "record":
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            for line in file:
+                interaction = json.loads(line)
+                key = _key(
+                    interaction["method"], interaction["url"], interaction["params"]
+                )
+                self._interactions[key].append(interaction)
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        params,
+        headers: dict,
+        status: int,
+        data: dict,
+        elapsed: float,
+    ):
+        """Append an interaction to the cassette."""
+        if self._file is None:
+            raise RuntimeError("cassette is not in record mode")
+        headers = dict(headers)
+        if "sign" in headers:
+            headers["sign"] = REDACTED
+        line = json.dumps(
+            {
+                "method": method,
+                "url": url,
+                "params": params,
+                "headers": headers,
+                "status": status,
+                "data": data,
+                "elapsed": round(elapsed, 6),
+            },
+            separators=(",", ":"),
+            default=str,
+        )
+        for secret in self.secrets:
+            line = line.replace(secret, REDACTED)
+        self._file.write(line + "\n")
+        self.recorded += 1
+
+    async def play(self, method: str, url: str, params) -> tuple[int, dict]:
+        """Return the next recorded status and response body for a request."""
+        queue = self._interactions.get(_key(method, url, params))
+        if not queue:
+            raise CassetteMissError(f"no recorded response for {method} {url} {params}")
+        interaction = queue.popleft()
+        if self.keep_timing:
+            await asyncio.sleep(interaction["elapsed"])
+        self.played += 1
+        logger.debug(f"replaying {method} {url} {params}")
+        return interaction["status"], interaction["data"]
+
+    def remaining(self) -> int:
+        """Return the number of recorded responses not played yet."""
+        return sum(len(queue) for queue in self._interactions.values())
+
+    def close(self):
+        """Flush and close the cassette file in record mode."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,313 @@
+"""Command line tool for bulk operations on AlphaESS systems.
+
+Results are written as newline delimited json, one line per request, as
+soon as they arrive. Progress goes to stderr.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Iterable, Iterator, TextIO
+
+import pydantic
+
+from alphaessaio.client import AlphaEssAPI, AlphaEssAuth
+from alphaessaio.stream import date_range
+
+Job = tuple[dict, Callable[[], Awaitable[pydantic.BaseModel]]]
+
+
+class RateLimiter:
+    """Space out calls to at most rate per second."""
+
+    def __init__(self, rate: float | None):
+        self.interval = 1 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class Progress:
+    """Print completed requests and throughput to stderr."""
+
+    def __init__(self, total: int | None, stream: TextIO | None, every: float = 1.0):
+        self.total = total
+        self.stream = stream
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self._start = time.monotonic()
+        self._last = 0.0
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self._start
+        return self.done / elapsed if elapsed else 0.0
+
+    def update(self, ok: bool):
+        self.done += 1
+        self.failed += not ok
+        if time.monotonic() - self._last >= self.every:
+            self.print()
+
+    def print(self):
+        if self.stream is None:
+            return
+        self._last = time.monotonic()
+        total = f"/{self.total}" if self.total is not None else ""
+        self.stream.write(
+            f"\r{self.done}{total} requests, {self.failed} failed,"
+            f" {self.rate:.1f} req/s"
+        )
+        self.stream.flush()
+
+
+async def run_jobs(
+    jobs: Iterable[Job],
+    output: TextIO,
+    concurrency: int = 8,
+    rate: float | None = None,
+    progress: Progress | None = None,
+):
+    """Run jobs concurrently and stream one json line per result.
+
+    Args:
+        jobs (Iterable[Job]): (fields for the output line, call) pairs, consumed lazily
+        output (TextIO): target of the json lines
+        concurrency (int): maximum concurrent requests
+        rate (float | None): maximum requests per second
+        progress (Progress | None): progress reporting
+    """
+    limiter = RateLimiter(rate)
+    iterator: Iterator[Job] = iter(jobs)
+
+    async def worker():
+        for fields, call in iterator:
+            await limiter.wait()
+            line = dict(fields)
+            try:
+                result = await call()
+                line["data"] = result.model_dump(mode="json", by_alias=True)["data"]
+            except Exception as error:  # noqa: BLE001 - reported per line
+                line["error"] = f"{type(error).__name__}: {error}"
+            output.write(json.dumps(line, separators=(",", ":")) + "\n")
+            output.flush()
+            if progress is not None:
+                progress.update("error" not in line)
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    if progress is not None:
+        progress.print()
+        if progress.stream is not None:
+            progress.stream.write("\n")
+
+
+def _read_sns(args: argparse.Namespace) -> list[str]:
+    sys_sns = list(args.sn or [])
+    if args.sn_file:
+        if args.sn_file == "-":
+            sys_sns += [line.strip() for line in sys.stdin if line.strip()]
+        else:
+            with open(args.sn_file) as file:
+                sys_sns += [line.strip() for line in file if line.strip()]
+    return list(dict.fromkeys(sys_sns))
+
+
+def _is_write(args: argparse.Namespace) -> bool:
+    return getattr(args, "action", None) == "set"
+
+
+async def _resolve_sns(api: AlphaEssAPI, args: argparse.Namespace) -> list[str]:
+    sys_sns = _read_sns(args)
+    if sys_sns:
+        return sys_sns
+    if _is_write(args) and not args.all:
+        # the api accepts one settings update a day, never write to all by accident
+        raise ValueError("no systems given, pass --sn, --sn-file or --all")
+    ess_list = await api.get_ess_list()
+    return [system.sys_sn for system in ess_list.data]
+
+
+def _job_count(args: argparse.Namespace, sys_sns: list[str]) -> int:
+    if args.command == "backfill":
+        return len(sys_sns) * len(date_range(args.start, args.end))
+    return len(sys_sns)
+
+
+def _jobs(
+    api: AlphaEssAPI, args: argparse.Namespace, sys_sns: list[str]
+) -> Iterator[Job]:
+    """Generate the jobs of a command, calls are created as they are consumed."""
+    if args.command == "snapshot":
+        return (
+            ({"sys_sn": sys_sn}, lambda sys_sn=sys_sn: api.get_last_power_data(sys_sn))
+            for sys_sn in sys_sns
+        )
+    if args.command == "backfill":
+        fetch = (
+            api.get_one_date_energy_by_sn
+            if args.energy
+            else api.get_one_day_power_by_sn
+        )
+        return (
+            (
+                {"sys_sn": sys_sn, "query_date": query_date},
+                lambda sys_sn=sys_sn, query_date=query_date: fetch(query_date, sys_sn),
+            )
+            for query_date in date_range(args.start, args.end)
+            for sys_sn in sys_sns
+        )
+    if args.command == "charge-config" and args.action == "get":
+        return (
+            (
+                {"sys_sn": sys_sn},
+                lambda sys_sn=sys_sn: api.get_charge_config_info(sys_sn),
+            )
+            for sys_sn in sys_sns
+        )
+    if args.command == "charge-config":
+        return (
+            (
+                {"sys_sn": sys_sn},
+                lambda sys_sn=sys_sn: api.update_charge_config_info(
+                    sys_sn,
+                    args.bat_high_cap,
+                    args.grid_charge,
+                    args.time_chae1,
+                    args.time_chae2,
+                    args.time_chaf1,
+                    args.time_chaf2,
+                ),
+            )
+            for sys_sn in sys_sns
+        )
+    if args.action == "get":
+        return (
+            (
+                {"sys_sn": sys_sn},
+                lambda sys_sn=sys_sn: api.get_dis_charge_config_info(sys_sn),
+            )
+            for sys_sn in sys_sns
+        )
+    return (
+        (
+            {"sys_sn": sys_sn},
+            lambda sys_sn=sys_sn: api.update_dis_charge_config_info(
+                args.bat_use_cap,
+                args.ctr_dis,
+                args.time_dise1,
+                args.time_dise2,
+                args.time_disf1,
+                args.time_disf2,
+                sys_sn,
+            ),
+        )
+        for sys_sn in sys_sns
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="alphaess", description="Bulk operations on AlphaESS systems."
+    )
+    parser.add_argument(
+        "--appid", default=os.environ.get("ALPHAESS_APPID"), help="$ALPHAESS_APPID"
+    )
+    parser.add_argument(
+        "--appsecret",
+        default=os.environ.get("ALPHAESS_APPSECRET"),
+        help="$ALPHAESS_APPSECRET",
+    )
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-r", "--rate", type=float, help="maximum requests per second")
+    parser.add_argument("-o", "--output", help="write json lines to file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress")
+
+    systems = argparse.ArgumentParser(add_help=False)
+    systems.add_argument(
+        "--sn",
+        action="append",
+        help="system S/N, repeatable, reads default to all systems",
+    )
+    systems.add_argument("--sn-file", help="file with one S/N per line, - for stdin")
+    every = argparse.ArgumentParser(add_help=False)
+    every.add_argument(
+        "--all", action="store_true", help="update all systems if none are given"
+    )
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "snapshot", parents=[systems], help="real-time power data of systems"
+    )
+
+    backfill = commands.add_parser(
+        "backfill", parents=[systems], help="history of a date range"
+    )
+    backfill.add_argument("--start", required=True, help="first date, yyyy-MM-dd")
+    backfill.add_argument("--end", required=True, help="last date, yyyy-MM-dd")
+    backfill.add_argument(
+        "--energy", action="store_true", help="daily energy instead of power series"
+    )
+
+    charge = commands.add_parser("charge-config", help="charging settings")
+    charge_actions = charge.add_subparsers(dest="action", required=True)
+    charge_actions.add_parser("get", parents=[systems])
+    charge_set = charge_actions.add_parser("set", parents=[systems, every])
+    charge_set.add_argument("--bat-high-cap", type=float, required=True)
+    charge_set.add_argument("--grid-charge", type=int, required=True)
+    for name in ("time-chaf1", "time-chae1", "time-chaf2", "time-chae2"):
+        charge_set.add_argument(f"--{name}", required=True, help="HH:mm")
+
+    discharge = commands.add_parser("discharge-config", help="discharging settings")
+    discharge_actions = discharge.add_subparsers(dest="action", required=True)
+    discharge_actions.add_parser("get", parents=[systems])
+    discharge_set = discharge_actions.add_parser("set", parents=[systems, every])
+    discharge_set.add_argument("--bat-use-cap", type=float, required=True)
+    discharge_set.add_argument("--ctr-dis", type=int, required=True)
+    for name in ("time-disf1", "time-dise1", "time-disf2", "time-dise2"):
+        discharge_set.add_argument(f"--{name}", required=True, help="HH:mm")
+    return parser
+
+
+async def run(args: argparse.Namespace, output: TextIO) -> int:
+    """Run a parsed command, returns the exit code."""
+    auth = AlphaEssAuth(appid=args.appid, appsecret=args.appsecret)
+    async with AlphaEssAPI(auth) as api:
+        sys_sns = await _resolve_sns(api, args)
+        progress = Progress(
+            _job_count(args, sys_sns), None if args.quiet else sys.stderr
+        )
+        await run_jobs(
+            _jobs(api, args, sys_sns), output, args.concurrency, args.rate, progress
+        )
+    return 1 if progress.failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.appid or not args.appsecret:
+        parser.error(
+            "--appid and --appsecret or their environment variables are required"
+        )
+    if _is_write(args) and not (args.sn or args.sn_file or args.all):
+        parser.error("set needs --sn, --sn-file or --all")
+    if args.output:
+        with open(args.output, "w") as output:
+            return asyncio.run(run(args, output))
+    return asyncio.run(run(args, sys.stdout))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,37 @@
 """Sending requests to AlphaESS API"""
 
+import asyncio
+import contextvars
 import logging
 import time
 import hashlib
 import json
+from concurrent.futures import Executor
+from typing import TypeVar
 import aiohttp
 import pydantic
-from alphaessaio import response
+from alphaessaio import deadline, response
+from alphaessaio.cache import HistoryCache, SharedResponseCache
+from alphaessaio.cassette import Cassette
+from alphaessaio.clock import ServerClock
+from alphaessaio.deadline import AlphaEssDeadlineError, AlphaEssTimeoutError
+from alphaessaio.quota import QuotaLedger
+from alphaessaio.scheduler import RequestScheduler, endpoint_priority
 
 logger = logging.getLogger(__name__)
 
+ResponseModel = TypeVar("ResponseModel", bound=pydantic.BaseModel)
+
+
+def _validate(model: type[ResponseModel], raw_response: dict) -> ResponseModel:
+    """Build a response model, module level so it can run in a process pool."""
+    return model(**raw_response)
+
+
+def _payload_items(raw_response: dict) -> int:
+    data = raw_response.get("data")
+    return len(data) if isinstance(data, list) else 1
+
 
 class AlphaEssRequestError(Exception):
     """Request Error."""
@@ -23,6 +45,56 @@ class AlphaEssAuthError(Exception):
     """Provided AppID and/or AppSecret are invalid."""
 
 
+class AlphaEssTimestampError(AlphaEssRequestError):
+    """The server rejected the timestamp of the request signature."""
+
+
+TIMESTAMP_ERROR_CODE = 6006
+
+# connect: establishing the connection, sock_read: waiting for each chunk of
+# the response including the first byte, total: the whole request
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, sock_connect=10, sock_read=20)
+FAST_TIMEOUT = aiohttp.ClientTimeout(total=15, sock_connect=5, sock_read=10)
+BULK_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10, sock_read=45)
+
+ENDPOINT_TIMEOUTS: dict[str, aiohttp.ClientTimeout] = {
+    "getLastPowerData": FAST_TIMEOUT,
+    "getEvChargerStatusBySn": FAST_TIMEOUT,
+    "remoteControlEvCharger": FAST_TIMEOUT,
+    "getOneDayPowerBySn": BULK_TIMEOUT,
+    "getEssList": BULK_TIMEOUT,
+}
+
+
+# parts of get_system_snapshot
+SNAPSHOT_PARTS = (
+    "last_power_data",
+    "sum_data",
+    "charge_config",
+    "dis_charge_config",
+    "ev_chargers",
+)
+
+# session opened for the sub-requests of one call on a client without session
+_scoped_session: contextvars.ContextVar[aiohttp.ClientSession | None] = (
+    contextvars.ContextVar("alphaess_scoped_session", default=None)
+)
+
+
+def _clip_timeout(timeout: aiohttp.ClientTimeout, left: float) -> aiohttp.ClientTimeout:
+    """Limit every part of a timeout to the seconds left until a deadline."""
+
+    def clip(value: float | None) -> float:
+        return left if value is None else min(value, left)
+
+    return aiohttp.ClientTimeout(
+        total=clip(timeout.total),
+        connect=clip(timeout.connect),
+        sock_connect=clip(timeout.sock_connect),
+        sock_read=clip(timeout.sock_read),
+    )
+
+
 class AlphaEssAuth(pydantic.BaseModel):
     """Authentication for AlphaEssOpenAPI"""
 
@@ -38,8 +110,8 @@ class AlphaEssAuth(pydantic.BaseModel):
             ).hexdigest()
         )
 
-    def create_headers(self):
-        timestamp = str(int(time.time()))
+    def create_headers(self, offset: float = 0.0):
+        timestamp = str(int(time.time()) + round(offset))
         sign = self._get_signature(timestamp)
         return {"appId": self.appid, "timeStamp": timestamp, "sign": sign}
 
@@ -47,24 +119,200 @@ class AlphaEssAuth(pydantic.BaseModel):
 class AlphaEssAPI:
     """Send get and post requests to AlphaEssOpenApi."""
 
-    def __init__(self, auth: AlphaEssAuth):
+    def __init__(
+        self,
+        auth: AlphaEssAuth,
+        history_cache: HistoryCache | None = None,
+        scheduler: RequestScheduler | None = None,
+        parse_executor: Executor | None = None,
+        offload_min_items: int = 100,
+        cassette: Cassette | None = None,
+        clock: ServerClock | None = None,
+        session: aiohttp.ClientSession | None = None,
+        timeouts: dict[str, aiohttp.ClientTimeout] | None = None,
+        shared_cache: SharedResponseCache | None = None,
+        quota: QuotaLedger | None = None,
+    ):
+        """
+        Args:
+            auth (AlphaEssAuth): authentication
+            history_cache (HistoryCache | None): persistent cache for history of past days
+            scheduler (RequestScheduler | None): priority scheduling and concurrency caps
+            parse_executor (Executor | None): thread or process pool for validating large responses
+            offload_min_items (int): responses with fewer data items are validated inline
+            cassette (Cassette | None): record responses to or replay them from a file
+            clock (ServerClock | None): server clock offset applied to signatures
+            session (aiohttp.ClientSession | None): session shared by all requests,
+                by default each request opens its own unless the client is used
+                as async context manager
+            timeouts (dict[str, aiohttp.ClientTimeout] | None): timeouts by endpoint
+                name overriding ENDPOINT_TIMEOUTS, key "default" for all others
+            shared_cache (SharedResponseCache | None): response cache shared with
+                other processes
+            quota (QuotaLedger | None): counts every request sent to the api
+        """
         self.auth = auth
+        self.history_cache = history_cache
+        self.scheduler = scheduler
+        self.parse_executor = parse_executor
+        self.offload_min_items = offload_min_items
+        self.cassette = cassette
+        self.clock = clock if clock is not None else ServerClock()
+        if cassette is not None and not cassette.replaying:
+            cassette.secrets += (auth.appsecret.get_secret_value(),)
+        self.session = session
+        self._owns_session = False
+        self.timeouts = {
+            "default": DEFAULT_TIMEOUT,
+            **ENDPOINT_TIMEOUTS,
+            **(timeouts or {}),
+        }
+        self.shared_cache = shared_cache
+        self.quota = quota
+
+    async def __aenter__(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the shared session if the client opened it."""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+            self._owns_session = False
+
+    async def _get(self, url: str, params: str, cached: bool = True) -> dict:
+        if cached and self.shared_cache is not None:
+            return await self.shared_cache.get_or_fetch(
+                url.rsplit("/", 1)[-1],
+                params,
+                lambda: self._request("GET", url, params),
+                account=self.auth.appid,
+            )
+        return await self._request("GET", url, params)
+
+    async def _post(self, url: str, params: str) -> dict:
+        return await self._request("POST", url, params)
+
+    async def _invalidate(self, endpoint: str, params: dict):
+        """Drop a shared response that a successful update made stale."""
+        if self.shared_cache is not None:
+            await asyncio.to_thread(
+                self.shared_cache.invalidate, endpoint, params, self.auth.appid
+            )
+
+    async def _request(self, method: str, url: str, params: str) -> dict:
+        endpoint = url.rsplit("/", 1)[-1]
+        if self.scheduler is None:
+            deadline.check(endpoint)
+            return await self._send(method, url, params)
+        async with self.scheduler.slot(endpoint_priority(endpoint)):
+            return await self._send(method, url, params)
 
-    async def _get(self, url: str, params: str) -> dict:
-        headers = self.auth.create_headers()
+    async def _send(self, method: str, url: str, params: str) -> dict:
+        try:
+            return await self._send_once(method, url, params)
+        except AlphaEssTimestampError:
+            logger.warning(f"Timestamp rejected by {url}, retrying with resynced clock")
+            return await self._send_once(method, url, params)
+
+    async def _send_once(self, method: str, url: str, params: str) -> dict:
+        if self.cassette is not None and self.cassette.replaying:
+            status, data = await self.cassette.play(method, url, params)
+            return self._check_response(status, data, url)
+        session = self.session or _scoped_session.get()
+        if session is not None:
+            return await self._exchange(session, method, url, params)
         async with aiohttp.ClientSession() as session:
+            return await self._exchange(session, method, url, params)
+
+    async def _exchange(
+        self, session: aiohttp.ClientSession, method: str, url: str, params: str
+    ) -> dict:
+        endpoint = url.rsplit("/", 1)[-1]
+        timeout = self.timeouts.get(endpoint, self.timeouts["default"])
+        left = deadline.remaining()
+        if left is not None:
+            deadline.check(endpoint)
+            timeout = _clip_timeout(timeout, left)
+        headers = self.auth.create_headers(self.clock.offset)
+        if self.quota is not None:
+            await asyncio.to_thread(self.quota.record, self.auth.appid, endpoint)
+        start = time.monotonic()
+        sent = time.time()
+        if method == "GET":
             logger.debug(f"Sending get request to {url=} with {params=}")
-            async with session.get(url, headers=headers, params=params) as resp:
-                return await self._evaluate_response(resp)
+            request = session.get(url, headers=headers, params=params, timeout=timeout)
+        else:
+            request = session.post(url, headers=headers, json=params, timeout=timeout)
+        try:
+            async with request as resp:
+                data = await self._read_response(resp)
+        except asyncio.TimeoutError as error:
+            elapsed = time.monotonic() - start
+            if left is not None and elapsed >= left:
+                raise AlphaEssDeadlineError(
+                    f"deadline exceeded after {elapsed:.1f}s waiting for {endpoint}"
+                ) from error
+            raise AlphaEssTimeoutError(
+                f"{endpoint} timed out after {elapsed:.1f}s"
+            ) from error
+        self.clock.observe(
+            resp.headers.get("Date"),
+            sent,
+            time.time(),
+            resync=data.get("code") == TIMESTAMP_ERROR_CODE,
+        )
+        if self.cassette is not None:
+            self.cassette.record(
+                method,
+                url,
+                params,
+                headers,
+                resp.status,
+                data,
+                time.monotonic() - start,
+            )
+        return self._check_response(resp.status, data, resp.url)
+
+    async def _parse(
+        self, model: type[ResponseModel], raw_response: dict
+    ) -> ResponseModel:
+        if (
+            self.parse_executor is None
+            or _payload_items(raw_response) < self.offload_min_items
+        ):
+            return _validate(model, raw_response)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.parse_executor, _validate, model, raw_response
+        )
 
-    async def _post(self, url: str, params: str) -> dict:
-        headers = self.auth.create_headers()
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=params) as resp:
-                return await self._evaluate_response(resp)
+    async def _get_history(self, url: str, query_date: str, sys_sn: str) -> dict:
+        endpoint = url.rsplit("/", 1)[-1]
+        cacheable = self.history_cache is not None and self.history_cache.is_cacheable(
+            endpoint, query_date
+        )
+        if cacheable:
+            # sqlite and zlib block, keep them off the event loop
+            cached = await asyncio.to_thread(
+                self.history_cache.get, endpoint, sys_sn, query_date
+            )
+            if cached is not None:
+                return cached
+        data = await self._get(url, {"queryDate": query_date, "sysSn": sys_sn})
+        if cacheable:
+            await asyncio.to_thread(
+                self.history_cache.put, endpoint, sys_sn, query_date, data
+            )
+        return data
 
     @staticmethod
-    async def _evaluate_response(resp: aiohttp.ClientResponse) -> dict:
+    async def _read_response(resp: aiohttp.ClientResponse) -> dict:
         try:
             data = await resp.json()
             logger.debug(f"api response: {data}")
@@ -72,19 +320,30 @@ class AlphaEssAPI:
             raise AlphaEssRequestError(
                 {"msg": "returned data is not valid json", "err": json_decode_error}
             )
-        if resp.status == 200 and data.get("code", 0) == 200:
-            logger.debug(f"Request successful. {resp.url}")
+        return data
+
+    @staticmethod
+    def _check_response(status: int, data: dict, url) -> dict:
+        if status == 200 and data.get("code", 0) == 200:
+            logger.debug(f"Request successful. {url}")
             return data
 
         logger.error(f"Request error: {data=}")
 
-        if resp.status == 200 and data.get("code") == 6007:
+        if status == 200 and data.get("code") == 6007:
             raise AlphaEssAuthError(
                 "Authentication failed. Check provided AppID and AppSecret."
             )
+        if status == 200 and data.get("code") == TIMESTAMP_ERROR_CODE:
+            raise AlphaEssTimestampError(data)
         # other error
         raise AlphaEssRequestError(data)
 
+    @staticmethod
+    async def _evaluate_response(resp: aiohttp.ClientResponse) -> dict:
+        data = await AlphaEssAPI._read_response(resp)
+        return AlphaEssAPI._check_response(resp.status, data, resp.url)
+
     @pydantic.validate_call
     async def get_ev_charger_config_list(
         self, sys_sn: str
@@ -102,7 +361,7 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/getEvChargerConfigList", {"sysSn": sys_sn}
         )
 
-        return response.EvChargerConfigList(**raw_response)
+        return await self._parse(response.EvChargerConfigList, raw_response)
 
     @pydantic.validate_call
     async def get_ev_charger_currents_by_sn(
@@ -122,7 +381,7 @@ class AlphaEssAPI:
             {"sysSn": sys_sn},
         )
 
-        return response.EvChargerCurrentsBySn(**raw_response)
+        return await self._parse(response.EvChargerCurrentsBySn, raw_response)
 
     @pydantic.validate_call
     async def set_ev_charger_currents_by_sn(
@@ -143,7 +402,7 @@ class AlphaEssAPI:
             {"sysSn": sys_sn, "currentsetting": currentsetting},
         )
 
-        return response.EvChargerCurrentsBySn(**raw_response)
+        return await self._parse(response.EvChargerCurrentsBySn, raw_response)
 
     @pydantic.validate_call
     async def get_ev_charger_status_by_sn(
@@ -164,7 +423,7 @@ class AlphaEssAPI:
             {"sysSn": sys_sn, "evchargerSn": evcharger_sn},
         )
 
-        return response.EvChargerStatusBySn(**raw_response)
+        return await self._parse(response.EvChargerStatusBySn, raw_response)
 
     @pydantic.validate_call
     async def remote_control_ev_charger(
@@ -186,7 +445,7 @@ class AlphaEssAPI:
             {"sysSn": sys_sn, "evchargerSn": evcharger_sn, "controlMode": control_mode},
         )
 
-        return response.ControlEvCharger(**raw_response)
+        return await self._parse(response.ControlEvCharger, raw_response)
 
     @pydantic.validate_call
     async def get_sum_data_for_customer(
@@ -205,7 +464,7 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/getSumDataForCustomer", {"sysSn": sys_sn}
         )
 
-        return response.SumDataForCustomer(**raw_response)
+        return await self._parse(response.SumDataForCustomer, raw_response)
 
     @pydantic.validate_call
     async def get_last_power_data(self, sys_sn: str) -> response.LastPowerData:
@@ -222,7 +481,7 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/getLastPowerData", {"sysSn": sys_sn}
         )
 
-        return response.LastPowerData(**raw_response)
+        return await self._parse(response.LastPowerData, raw_response)
 
     @pydantic.validate_call
     async def get_one_day_power_by_sn(
@@ -238,12 +497,27 @@ class AlphaEssAPI:
             (response.OneDayPowerBySn): response data
         """
 
-        raw_response: dict = await self._get(
-            "https://openapi.alphaess.com/api/getOneDayPowerBySn",
-            {"queryDate": query_date, "sysSn": sys_sn},
-        )
+        raw_response = await self.get_one_day_power_by_sn_raw(query_date, sys_sn)
+
+        return await self._parse(response.OneDayPowerBySn, raw_response)
+
+    @pydantic.validate_call
+    async def get_one_day_power_by_sn_raw(self, query_date: str, sys_sn: str) -> dict:
+        """According  SN to get system power data without validating it
+
+        For callers that validate only part of the rows themselves.
+
+        Args:
+            query_date (str): Date，Format：yyyy-MM-dd
+        sys_sn (str): System S/N
+
+        Returns:
+            (dict): raw response
+        """
 
-        return response.OneDayPowerBySn(**raw_response)
+        return await self._get_history(
+            "https://openapi.alphaess.com/api/getOneDayPowerBySn", query_date, sys_sn
+        )
 
     @pydantic.validate_call
     async def get_one_date_energy_by_sn(
@@ -259,29 +533,33 @@ class AlphaEssAPI:
             (response.OneDateEnergyBySn): response data
         """
 
-        raw_response: dict = await self._get(
-            "https://openapi.alphaess.com/api/getOneDateEnergyBySn",
-            {"queryDate": query_date, "sysSn": sys_sn},
+        raw_response: dict = await self._get_history(
+            "https://openapi.alphaess.com/api/getOneDateEnergyBySn", query_date, sys_sn
         )
 
-        return response.OneDateEnergyBySn(**raw_response)
+        return await self._parse(response.OneDateEnergyBySn, raw_response)
 
     @pydantic.validate_call
-    async def get_charge_config_info(self, sys_sn: str) -> response.ChargeConfigInfo:
+    async def get_charge_config_info(
+        self, sys_sn: str, cached: bool = True
+    ) -> response.ChargeConfigInfo:
         """According  SN to get charging setting information
 
         Args:
             sys_sn (str): System S/N
+        cached (bool): False to bypass the shared cache, e.g. to verify an update
 
         Returns:
             (response.ChargeConfigInfo): response data
         """
 
         raw_response: dict = await self._get(
-            "https://openapi.alphaess.com/api/getChargeConfigInfo", {"sysSn": sys_sn}
+            "https://openapi.alphaess.com/api/getChargeConfigInfo",
+            {"sysSn": sys_sn},
+            cached,
         )
 
-        return response.ChargeConfigInfo(**raw_response)
+        return await self._parse(response.ChargeConfigInfo, raw_response)
 
     @pydantic.validate_call
     async def update_charge_config_info(
@@ -321,27 +599,31 @@ class AlphaEssAPI:
                 "timeChaf2": time_chaf2,
             },
         )
+        await self._invalidate("getChargeConfigInfo", {"sysSn": sys_sn})
 
-        return response.ChargeConfigInfo(**raw_response)
+        return await self._parse(response.ChargeConfigInfo, raw_response)
 
     @pydantic.validate_call
     async def get_dis_charge_config_info(
-        self, sys_sn: str
+        self, sys_sn: str, cached: bool = True
     ) -> response.DisChargeConfigInfo:
         """According to SN discharge setting information
 
         Args:
             sys_sn (str): System S/N
+        cached (bool): False to bypass the shared cache, e.g. to verify an update
 
         Returns:
             (response.DisChargeConfigInfo): response data
         """
 
         raw_response: dict = await self._get(
-            "https://openapi.alphaess.com/api/getDisChargeConfigInfo", {"sysSn": sys_sn}
+            "https://openapi.alphaess.com/api/getDisChargeConfigInfo",
+            {"sysSn": sys_sn},
+            cached,
         )
 
-        return response.DisChargeConfigInfo(**raw_response)
+        return await self._parse(response.DisChargeConfigInfo, raw_response)
 
     @pydantic.validate_call
     async def update_dis_charge_config_info(
@@ -381,8 +663,9 @@ class AlphaEssAPI:
                 "sysSn": sys_sn,
             },
         )
+        await self._invalidate("getDisChargeConfigInfo", {"sysSn": sys_sn})
 
-        return response.DisChargeConfigInfo(**raw_response)
+        return await self._parse(response.DisChargeConfigInfo, raw_response)
 
     @pydantic.validate_call
     async def get_verification_code(
@@ -403,7 +686,7 @@ class AlphaEssAPI:
             {"sysSn": sys_sn, "checkCode": check_code},
         )
 
-        return response.VerificationCode(**raw_response)
+        return await self._parse(response.VerificationCode, raw_response)
 
     @pydantic.validate_call
     async def bind_sn(self, sys_sn: str, code: str) -> response.Sn:
@@ -421,7 +704,7 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/bindSn", {"sysSn": sys_sn, "code": code}
         )
 
-        return response.Sn(**raw_response)
+        return await self._parse(response.Sn, raw_response)
 
     @pydantic.validate_call
     async def un_bind_sn(self, sys_sn: str) -> response.BindSn:
@@ -438,7 +721,7 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/unBindSn", {"sysSn": sys_sn}
         )
 
-        return response.BindSn(**raw_response)
+        return await self._parse(response.BindSn, raw_response)
 
     @pydantic.validate_call
     async def get_ess_list(
@@ -457,4 +740,96 @@ class AlphaEssAPI:
             "https://openapi.alphaess.com/api/getEssList", {}
         )
 
-        return response.EssList(**raw_response)
+        return await self._parse(response.EssList, raw_response)
+
+    async def get_ev_charger_status_row(
+        self, sys_sn: str, charger: response.DataEvChargerConfigList
+    ) -> response.EvChargerStatusRow:
+        """Get the status of a charger as a row, a failed request is reported in its error
+
+        Args:
+            sys_sn (str): System S/N
+            charger (response.DataEvChargerConfigList): charger from getEvChargerConfigList
+
+        Returns:
+            (response.EvChargerStatusRow): status of the charger
+        """
+        row = {
+            "sys_sn": sys_sn,
+            "evcharger_sn": charger.evcharger_sn,
+            "evcharger_model": charger.evcharger_model,
+        }
+        try:
+            status = await self.get_ev_charger_status_by_sn(
+                sys_sn, charger.evcharger_sn
+            )
+        except Exception as error:  # noqa: BLE001 - reported per row
+            return response.EvChargerStatusRow(
+                **row, error=f"{type(error).__name__}: {error}"
+            )
+        return response.EvChargerStatusRow(
+            **row,
+            evcharger_status=status.data[0].evcharger_status if status.data else None,
+        )
+
+    async def _ev_charger_rows(self, sys_sn: str) -> list[response.EvChargerStatusRow]:
+        config_list = await self.get_ev_charger_config_list(sys_sn)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.get_ev_charger_status_row(sys_sn, charger)
+                    for charger in config_list.data
+                )
+            )
+        )
+
+    @pydantic.validate_call
+    async def get_system_snapshot(
+        self, sys_sn: str, parts: tuple[str, ...] = SNAPSHOT_PARTS
+    ) -> response.SystemSnapshot:
+        """Get real-time data, summary, charge settings and EV chargers of a system at once
+
+        The sub-requests run concurrently on one session, so the snapshot takes
+        about as long as the slowest of them. A part that fails stays None and
+        its error is listed in errors, a charger whose status fails is kept
+        with the error in its row.
+
+        Args:
+            sys_sn (str): System S/N
+            parts (tuple[str, ...]): subset of SNAPSHOT_PARTS to fetch
+
+        Returns:
+            (response.SystemSnapshot): combined data
+        """
+        unknown = set(parts) - set(SNAPSHOT_PARTS)
+        if unknown:
+            raise ValueError(f"unknown snapshot parts: {sorted(unknown)}")
+        calls = {
+            "last_power_data": self.get_last_power_data,
+            "sum_data": self.get_sum_data_for_customer,
+            "charge_config": self.get_charge_config_info,
+            "dis_charge_config": self.get_dis_charge_config_info,
+        }
+        snapshot = response.SystemSnapshot(sys_sn=sys_sn)
+
+        async def fetch(part: str):
+            try:
+                if part == "ev_chargers":
+                    result = await self._ev_charger_rows(sys_sn)
+                else:
+                    result = (await calls[part](sys_sn)).data
+            except Exception as error:  # noqa: BLE001 - reported in errors
+                snapshot.errors[part] = f"{type(error).__name__}: {error}"
+            else:
+                setattr(snapshot, part, result)
+
+        if self.session is not None or _scoped_session.get() is not None:
+            await asyncio.gather(*map(fetch, dict.fromkeys(parts)))
+            return snapshot
+        async with aiohttp.ClientSession() as session:
+            token = _scoped_session.set(session)
+            try:
+                await asyncio.gather(*map(fetch, dict.fromkeys(parts)))
+            finally:
+                _scoped_session.reset(token)
+        return snapshot
@@ -0,0 +1,67 @@
+"""Estimate the offset between the local clock and the AlphaESS server."""
+
+import email.utils
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(date_header: str | None) -> float | None:
+    if not date_header:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(date_header).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ServerClock:
+    """Smoothed offset of the server clock, taken from Date response headers.
+
+    The Date header has a resolution of one second, so every sample compares
+    the middle of that second with the middle of the request round trip.
+    Samples are combined by an exponentially weighted moving average.
+    """
+
+    def __init__(self, smoothing: float = 0.1):
+        """
+        Args:
+            smoothing (float): weight of a new sample, between 0 and 1
+        """
+        self.smoothing = smoothing
+        self.offset = 0.0
+        self.samples = 0
+        self.resyncs = 0
+
+    def observe(
+        self, date_header: str | None, sent: float, received: float, resync=False
+    ) -> bool:
+        """Add a sample from a response.
+
+        Args:
+            date_header (str | None): Date header of the response
+            sent (float): local time.time() when the request was sent
+            received (float): local time.time() when the response arrived
+            resync (bool): replace the estimate instead of smoothing
+
+        Returns:
+            (bool): whether the header held a usable date
+        """
+        server_time = _parse_date(date_header)
+        if server_time is None:
+            return False
+        sample = server_time + 0.5 - (sent + received) / 2
+        if resync or not self.samples:
+            if resync:
+                self.resyncs += 1
+                logger.info(f"clock resynced, offset {sample:+.1f}s")
+            self.offset = sample
+        else:
+            self.offset += self.smoothing * (sample - self.offset)
+        self.samples += 1
+        return True
+
+    def time(self) -> float:
+        """Return the current server time estimate."""
+        return time.time() + self.offset
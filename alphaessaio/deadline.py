@@ -0,0 +1,63 @@
+"""Timeouts and deadlines shared by all API calls made within a block."""
+
+import contextlib
+import contextvars
+import time
+from typing import Iterator
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "alphaess_deadline", default=None
+)
+
+
+class AlphaEssTimeoutError(Exception):
+    """A request did not finish in time."""
+
+
+class AlphaEssDeadlineError(AlphaEssTimeoutError):
+    """The deadline of a request passed before it could finish."""
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Set a deadline for all api calls made inside the block.
+
+    The deadline is carried by a context variable, so it also applies to
+    tasks created inside the block. Nested deadlines never extend an outer
+    one.
+
+    Args:
+        seconds (float): time budget from now
+
+    Yields:
+        (float): the deadline as time.monotonic() value
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        at = min(at, current)
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> float | None:
+    """Return the active deadline as time.monotonic() value or None."""
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    """Return the seconds left until the active deadline or None."""
+    at = _deadline.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+def check(what: str = "request"):
+    """Raise AlphaEssDeadlineError if the active deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise AlphaEssDeadlineError(f"deadline exceeded before {what} was sent")
@@ -0,0 +1,125 @@
+"""Fleet wide discovery and status sweeps of EV chargers."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Iterable, TypeVar
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+Result = TypeVar("Result")
+
+# kept here for imports from before the row moved next to the other models
+EvChargerStatusRow = response.EvChargerStatusRow
+
+
+class EvChargerInventory:
+    """Charger topology of many systems and concurrent status sweeps.
+
+    The charger list of a system rarely changes, so it is fetched once and
+    kept for topology_ttl seconds. Sweeps only request the status of every
+    known charger.
+    """
+
+    def __init__(
+        self,
+        api: AlphaEssAPI,
+        concurrency: int = 32,
+        topology_ttl: float = 24 * 3600,
+    ):
+        """
+        Args:
+            api (AlphaEssAPI): client used for fetching
+            concurrency (int): maximum concurrent requests
+            topology_ttl (float): seconds a charger list of a system stays valid
+        """
+        self.api = api
+        self.topology_ttl = topology_ttl
+        self.topology: dict[str, list[response.DataEvChargerConfigList]] = {}
+        self._discovered: dict[str, float] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _limited(self, call: Awaitable[Result]) -> Result:
+        async with self._semaphore:
+            return await call
+
+    def _is_fresh(self, sys_sn: str) -> bool:
+        discovered = self._discovered.get(sys_sn)
+        return (
+            discovered is not None and time.monotonic() - discovered < self.topology_ttl
+        )
+
+    async def _discover_one(self, sys_sn: str):
+        try:
+            config_list = await self._limited(
+                self.api.get_ev_charger_config_list(sys_sn)
+            )
+        except Exception as error:  # noqa: BLE001 - keep the last known topology
+            logger.warning(f"Discovery of EV chargers failed for {sys_sn}: {error}")
+            return
+        self.topology[sys_sn] = list(config_list.data)
+        self._discovered[sys_sn] = time.monotonic()
+
+    async def discover(
+        self, sys_sns: Iterable[str] | None = None, force: bool = False
+    ) -> dict[str, list[response.DataEvChargerConfigList]]:
+        """Fetch the charger lists of systems whose topology is unknown or stale.
+
+        Args:
+            sys_sns (Iterable[str] | None): systems, by default all of the account
+            force (bool): fetch also fresh topologies
+
+        Returns:
+            (dict): chargers per system
+        """
+        if sys_sns is None:
+            ess_list = await self._limited(self.api.get_ess_list())
+            sys_sns = [system.sys_sn for system in ess_list.data]
+        sys_sns = list(dict.fromkeys(sys_sns))
+        await asyncio.gather(
+            *(
+                self._discover_one(sys_sn)
+                for sys_sn in sys_sns
+                if force or not self._is_fresh(sys_sn)
+            )
+        )
+        return {
+            sys_sn: self.topology[sys_sn]
+            for sys_sn in sys_sns
+            if sys_sn in self.topology
+        }
+
+    def forget(self, sys_sn: str):
+        """Drop the topology of a system, e.g. after it left the account."""
+        self.topology.pop(sys_sn, None)
+        self._discovered.pop(sys_sn, None)
+
+    async def _status(
+        self, sys_sn: str, charger: response.DataEvChargerConfigList
+    ) -> response.EvChargerStatusRow:
+        return await self._limited(self.api.get_ev_charger_status_row(sys_sn, charger))
+
+    async def sweep(
+        self, sys_sns: Iterable[str] | None = None
+    ) -> list[response.EvChargerStatusRow]:
+        """Return the status of every charger of the given systems.
+
+        Args:
+            sys_sns (Iterable[str] | None): systems, by default all of the account
+
+        Returns:
+            (list[response.EvChargerStatusRow]): one row per charger
+        """
+        topology = await self.discover(sys_sns)
+        return list(
+            await asyncio.gather(
+                *(
+                    self._status(sys_sn, charger)
+                    for sys_sn, chargers in topology.items()
+                    for charger in chargers
+                )
+            )
+        )
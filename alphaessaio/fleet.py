@@ -0,0 +1,202 @@
+"""Compact in-memory store for the latest real-time data of many systems."""
+
+import math
+import time
+from array import array
+from typing import Iterator
+
+from alphaessaio import response
+
+# flattened numeric fields of DataLastPowerData and its detail models,
+# as (field name, attribute path, api alias path)
+LAST_POWER_FIELDS: tuple[tuple[str, tuple[str, ...], tuple[str, ...]], ...] = (
+    ("ppv", ("ppv",), ("ppv",)),
+    ("pload", ("pload",), ("pload",)),
+    ("soc", ("soc",), ("soc",)),
+    ("pgrid", ("pgrid",), ("pgrid",)),
+    ("pbat", ("pbat",), ("pbat",)),
+    ("preal_l1", ("preal_l1",), ("prealL1",)),
+    ("preal_l2", ("preal_l2",), ("prealL2",)),
+    ("preal_l3", ("preal_l3",), ("prealL3",)),
+    ("pev", ("pev",), ("pev",)),
+    ("ppv1", ("ppv_detail", "ppv1"), ("ppvDetail", "ppv1")),
+    ("ppv2", ("ppv_detail", "ppv2"), ("ppvDetail", "ppv2")),
+    ("ppv3", ("ppv_detail", "ppv3"), ("ppvDetail", "ppv3")),
+    ("ppv4", ("ppv_detail", "ppv4"), ("ppvDetail", "ppv4")),
+    ("pmeter_dc", ("ppv_detail", "pmeter_dc"), ("ppvDetail", "pmeterDc")),
+    ("pmeter_l1", ("pgrid_detail", "pmeter_l1"), ("pgridDetail", "pmeterL1")),
+    ("pmeter_l2", ("pgrid_detail", "pmeter_l2"), ("pgridDetail", "pmeterL2")),
+    ("pmeter_l3", ("pgrid_detail", "pmeter_l3"), ("pgridDetail", "pmeterL3")),
+    ("ev1_power", ("pev_detail", "ev1_power"), ("pevDetail", "ev1Power")),
+    ("ev2_power", ("pev_detail", "ev2_power"), ("pevDetail", "ev2Power")),
+    ("ev3_power", ("pev_detail", "ev3_power"), ("pevDetail", "ev3Power")),
+    ("ev4_power", ("pev_detail", "ev4_power"), ("pevDetail", "ev4Power")),
+)
+
+FIELD_NAMES: tuple[str, ...] = tuple(name for name, _, _ in LAST_POWER_FIELDS)
+
+
+def flatten_last_power_data(
+    data: response.LastPowerData | response.DataLastPowerData,
+) -> tuple[float, ...]:
+    """Flatten a real-time data model into values ordered like FIELD_NAMES."""
+    if isinstance(data, response.LastPowerData):
+        data = data.data
+    values = []
+    for _, path, _ in LAST_POWER_FIELDS:
+        value = data
+        for attr in path:
+            value = getattr(value, attr)
+        values.append(float(value))
+    return tuple(values)
+
+
+def flatten_raw_last_power_data(raw: dict) -> tuple[float, ...]:
+    """Flatten a raw getLastPowerData payload without building models.
+
+    Accepts either the full response or its "data" member. Missing values
+    become NaN.
+    """
+    if "data" in raw and isinstance(raw["data"], dict):
+        raw = raw["data"]
+    values = []
+    for _, _, aliases in LAST_POWER_FIELDS:
+        value = raw
+        for alias in aliases:
+            value = value.get(alias) if isinstance(value, dict) else None
+        values.append(math.nan if value is None else float(value))
+    return tuple(values)
+
+
+class FleetSnapshotStore:
+    """Latest real-time values of many systems in preallocated typed arrays.
+
+    Every field of DataLastPowerData is kept in its own array("d") column,
+    one row per sys_sn. Rows are updated in place and looked up in O(1) by
+    sys_sn, columns can be read fleet-wide without touching python objects.
+    """
+
+    __slots__ = ("_capacity", "_columns", "_index", "_sys_sns", "_updated")
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(int(capacity), 1)
+        self._columns: dict[str, array] = {
+            name: array("d", bytes(8 * self._capacity)) for name in FIELD_NAMES
+        }
+        self._updated = array("d", [math.nan]) * self._capacity
+        self._index: dict[str, int] = {}
+        self._sys_sns: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._sys_sns)
+
+    def __contains__(self, sys_sn: object) -> bool:
+        return sys_sn in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sys_sns)
+
+    @property
+    def capacity(self) -> int:
+        """Number of preallocated rows."""
+        return self._capacity
+
+    @property
+    def sys_sns(self) -> list[str]:
+        """System S/Ns in row order."""
+        return list(self._sys_sns)
+
+    def _grow(self, capacity: int):
+        extra = capacity - self._capacity
+        for column in self._columns.values():
+            column.frombytes(bytes(8 * extra))
+        self._updated.extend(array("d", [math.nan]) * extra)
+        self._capacity = capacity
+
+    def _row(self, sys_sn: str) -> int:
+        row = self._index.get(sys_sn)
+        if row is None:
+            row = len(self._sys_sns)
+            if row >= self._capacity:
+                self._grow(self._capacity * 2)
+            self._index[sys_sn] = row
+            self._sys_sns.append(sys_sn)
+        return row
+
+    def _write(self, sys_sn: str, values: tuple[float, ...], timestamp: float | None):
+        row = self._row(sys_sn)
+        for name, value in zip(FIELD_NAMES, values):
+            self._columns[name][row] = value
+        self._updated[row] = time.time() if timestamp is None else timestamp
+
+    def update(
+        self,
+        sys_sn: str,
+        data: response.LastPowerData | response.DataLastPowerData,
+        timestamp: float | None = None,
+    ):
+        """Store the values of a getLastPowerData response for sys_sn.
+
+        Args:
+            sys_sn (str): System S/N
+            data (response.LastPowerData | response.DataLastPowerData): response data
+            timestamp (float | None): time of the sample, defaults to now
+        """
+        self._write(sys_sn, flatten_last_power_data(data), timestamp)
+
+    def update_raw(self, sys_sn: str, raw: dict, timestamp: float | None = None):
+        """Store a raw getLastPowerData payload for sys_sn without building models.
+
+        Args:
+            sys_sn (str): System S/N
+            raw (dict): raw api response or its "data" member
+            timestamp (float | None): time of the sample, defaults to now
+        """
+        self._write(sys_sn, flatten_raw_last_power_data(raw), timestamp)
+
+    def remove(self, sys_sn: str):
+        """Drop the row of sys_sn, the last row is moved into its place."""
+        row = self._index.pop(sys_sn)
+        last = len(self._sys_sns) - 1
+        if row != last:
+            moved = self._sys_sns[last]
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._updated[row] = self._updated[last]
+            self._sys_sns[row] = moved
+            self._index[moved] = row
+        self._sys_sns.pop()
+        for column in self._columns.values():
+            column[last] = 0.0
+        self._updated[last] = math.nan
+
+    def get(self, sys_sn: str) -> dict[str, float]:
+        """Return the stored values of sys_sn keyed by field name."""
+        row = self._index[sys_sn]
+        return {name: column[row] for name, column in self._columns.items()}
+
+    def value(self, sys_sn: str, field: str) -> float:
+        """Return a single stored value."""
+        return self._columns[field][self._index[sys_sn]]
+
+    def updated_at(self, sys_sn: str) -> float:
+        """Return the timestamp of the last update of sys_sn."""
+        return self._updated[self._index[sys_sn]]
+
+    def column(self, field: str) -> memoryview:
+        """Return a zero-copy view of a field for all stored systems in row order.
+
+        Release the view before adding new systems, the arrays cannot grow
+        while a view is exported.
+        """
+        return memoryview(self._columns[field])[: len(self._sys_sns)]
+
+    def updated(self) -> memoryview:
+        """Return a zero-copy view of the update timestamps in row order."""
+        return memoryview(self._updated)[: len(self._sys_sns)]
+
+    def nbytes(self) -> int:
+        """Return the size of the preallocated arrays in bytes."""
+        return sum(
+            column.itemsize * len(column) for column in self._columns.values()
+        ) + self._updated.itemsize * len(self._updated)
@@ -0,0 +1,144 @@
+"""Incremental tracking of the current day's getOneDayPowerBySn series.
+
+Every poll returns the whole day so far. Only rows with an upload time not
+seen before are validated and handed to listeners, so the work per poll is
+proportional to the new rows. Rows that arrive late, e.g. after an inverter
+reconnects, are merged in by upload time.
+"""
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+from typing import Callable, Iterable
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[str, list[response.DataOneDayPowerBySn]], None]
+
+
+@dataclasses.dataclass
+class IntradaySeries:
+    """Rows of one system and day seen so far."""
+
+    query_date: str
+    # ordered by upload time
+    rows: list[response.DataOneDayPowerBySn] = dataclasses.field(default_factory=list)
+    uploads: set[datetime.datetime] = dataclasses.field(default_factory=set)
+
+    @property
+    def last_upload(self) -> datetime.datetime | None:
+        """uploadTime of the newest row."""
+        return max(self.uploads, default=None)
+
+
+def _upload_time(row: dict) -> datetime.datetime:
+    try:
+        return datetime.datetime.fromisoformat(row["uploadTime"])
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"row without valid uploadTime: {row}") from error
+
+
+class IntradayTracker:
+    """Keep the current day's power series of systems up to date."""
+
+    def __init__(
+        self,
+        api: AlphaEssAPI,
+        today: Callable[[], datetime.date] = datetime.date.today,
+    ):
+        """
+        Args:
+            api (AlphaEssAPI): client used for fetching
+            today (Callable[[], datetime.date]): current date of the systems
+        """
+        self.api = api
+        self.listeners: list[Listener] = []
+        self.validated = 0
+        self._today = today
+        self._series: dict[str, IntradaySeries] = {}
+
+    def add_listener(self, listener: Listener):
+        """Call listener with sys_sn and the new rows after every update."""
+        self.listeners.append(listener)
+
+    def series(self, sys_sn: str) -> IntradaySeries | None:
+        return self._series.get(sys_sn)
+
+    def _merge(
+        self, sys_sn: str, series: IntradaySeries, raw_response: dict
+    ) -> list[response.DataOneDayPowerBySn]:
+        uploads = ((_upload_time(row), row) for row in raw_response.get("data") or ())
+        unseen = {
+            upload: row for upload, row in uploads if upload not in series.uploads
+        }
+        rows = [
+            response.DataOneDayPowerBySn.model_validate(unseen[upload])
+            for upload in sorted(unseen)
+        ]
+        self.validated += len(rows)
+        if rows:
+            late = series.uploads and min(unseen) < series.last_upload
+            series.uploads.update(unseen)
+            series.rows.extend(rows)
+            if late:
+                series.rows.sort(key=lambda row: row.upload_time)
+            for listener in self.listeners:
+                listener(sys_sn, rows)
+        return rows
+
+    async def _fetch(self, sys_sn: str, series: IntradaySeries):
+        raw_response = await self.api.get_one_day_power_by_sn_raw(
+            series.query_date, sys_sn
+        )
+        return self._merge(sys_sn, series, raw_response)
+
+    async def update(self, sys_sn: str) -> list[response.DataOneDayPowerBySn]:
+        """Fetch the current day and return the rows that were not known yet.
+
+        After midnight the previous day is fetched a last time, so rows
+        uploaded since the previous update are not lost, and a new series
+        is started.
+
+        Args:
+            sys_sn (str): System S/N
+
+        Returns:
+            (list[response.DataOneDayPowerBySn]): new rows ordered by upload time,
+                including late rows older than known ones
+        """
+        query_date = self._today().isoformat()
+        series = self._series.get(sys_sn)
+        new_rows = []
+        if series is not None and series.query_date != query_date:
+            try:
+                new_rows += await self._fetch(sys_sn, series)
+            except Exception as error:  # noqa: BLE001 - the new day goes on
+                logger.warning(
+                    f"Final fetch of {series.query_date} failed for {sys_sn}: {error}"
+                )
+            series = None
+        if series is None:
+            series = self._series[sys_sn] = IntradaySeries(query_date)
+        new_rows += await self._fetch(sys_sn, series)
+        return new_rows
+
+    async def update_all(
+        self, sys_sns: Iterable[str], concurrency: int = 8
+    ) -> dict[str, list[response.DataOneDayPowerBySn]]:
+        """Update several systems, failed systems are logged and left out."""
+        semaphore = asyncio.Semaphore(concurrency)
+        results = {}
+
+        async def update(sys_sn: str):
+            async with semaphore:
+                try:
+                    results[sys_sn] = await self.update(sys_sn)
+                except Exception as error:  # noqa: BLE001 - keep the others
+                    logger.warning(f"Intraday update failed for {sys_sn}: {error}")
+
+        await asyncio.gather(*map(update, sys_sns))
+        return results
@@ -0,0 +1,186 @@
+"""Vectorized fleet KPIs from getSumDataForCustomer and getEssList.
+
+Requires numpy, install with the "analytics" extra.
+"""
+
+import math
+
+import numpy as np
+
+from alphaessaio import response
+
+SUM_FIELDS = ("epvtoday", "eself_consumption", "eself_sufficiency")
+ESS_FIELDS = ("popv", "poinv", "cbat", "surplus_cobat", "us_capacity")
+FIELDS = SUM_FIELDS + ESS_FIELDS
+
+# derived metrics, generation relative to nominal pv power is in kWh per kW
+METRICS = (
+    "self_sufficiency",
+    "self_consumption",
+    "specific_yield",
+    "surplus_cobat",
+    "us_capacity",
+)
+
+
+class FleetKpis:
+    """Aligned per-system arrays of the KPI inputs of a fleet.
+
+    One row per sys_sn, updated in place as systems refresh. Missing values
+    are NaN and are left out of percentiles, rankings and outlier checks.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(int(capacity), 1)
+        self._columns = {name: np.full(self._capacity, math.nan) for name in FIELDS}
+        self._index: dict[str, int] = {}
+        self._sys_sns: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._sys_sns)
+
+    def __contains__(self, sys_sn: object) -> bool:
+        return sys_sn in self._index
+
+    @property
+    def sys_sns(self) -> list[str]:
+        """System S/Ns in row order."""
+        return list(self._sys_sns)
+
+    def _row(self, sys_sn: str) -> int:
+        row = self._index.get(sys_sn)
+        if row is None:
+            row = len(self._sys_sns)
+            if row >= self._capacity:
+                self._capacity *= 2
+                for name, column in self._columns.items():
+                    grown = np.full(self._capacity, math.nan)
+                    grown[: len(column)] = column
+                    self._columns[name] = grown
+            self._index[sys_sn] = row
+            self._sys_sns.append(sys_sn)
+        return row
+
+    def update_sum_data(
+        self,
+        sys_sn: str,
+        data: response.SumDataForCustomer | response.DataSumDataForCustomer,
+    ):
+        """Store the summary of a system."""
+        if isinstance(data, response.SumDataForCustomer):
+            data = data.data
+        row = self._row(sys_sn)
+        for name in SUM_FIELDS:
+            self._columns[name][row] = getattr(data, name)
+
+    def update_ess_list(self, ess_list: response.EssList | list[response.DataEssList]):
+        """Store nominal power and battery state of the listed systems."""
+        if isinstance(ess_list, response.EssList):
+            ess_list = ess_list.data
+        rows = np.fromiter(
+            (self._row(system.sys_sn) for system in ess_list),
+            dtype=np.intp,
+            count=len(ess_list),
+        )
+        for name in ESS_FIELDS:
+            self._columns[name][rows] = [getattr(system, name) for system in ess_list]
+
+    def remove(self, sys_sn: str):
+        """Drop the row of sys_sn, the last row is moved into its place."""
+        row = self._index.pop(sys_sn)
+        last = len(self._sys_sns) - 1
+        if row != last:
+            moved = self._sys_sns[last]
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._sys_sns[row] = moved
+            self._index[moved] = row
+        self._sys_sns.pop()
+        for column in self._columns.values():
+            column[last] = math.nan
+
+    def column(self, field: str) -> np.ndarray:
+        """Return a view of an input field in row order."""
+        return self._columns[field][: len(self._sys_sns)]
+
+    def metric(self, name: str) -> np.ndarray:
+        """Compute a metric of METRICS for all systems in row order."""
+        if name == "self_sufficiency":
+            return self.column("eself_sufficiency").copy()
+        if name == "self_consumption":
+            return self.column("eself_consumption").copy()
+        if name == "specific_yield":
+            popv = self.column("popv")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(popv > 0, self.column("epvtoday") / popv, math.nan)
+        if name in ("surplus_cobat", "us_capacity"):
+            return self.column(name).copy()
+        raise ValueError(f"unknown metric {name!r}, use one of {list(METRICS)}")
+
+    def percentiles(
+        self, name: str, q: tuple[float, ...] = (5, 25, 50, 75, 95)
+    ) -> dict[float, float]:
+        """Percentiles of a metric over the systems that have it."""
+        values = self.metric(name)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {p: math.nan for p in q}
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def _ranked(self, name: str, k: int, largest: bool) -> list[tuple[str, float]]:
+        values = self.metric(name)
+        valid = np.flatnonzero(~np.isnan(values))
+        keys = -values[valid] if largest else values[valid]
+        k = min(k, valid.size)
+        if not k:
+            return []
+        chosen = np.argpartition(keys, k - 1)[:k]
+        chosen = chosen[np.argsort(keys[chosen], kind="stable")]
+        return [
+            (self._sys_sns[row], float(values[row])) for row in valid[chosen].tolist()
+        ]
+
+    def top(self, name: str, k: int = 10) -> list[tuple[str, float]]:
+        """The k systems with the highest metric, best first."""
+        return self._ranked(name, k, largest=True)
+
+    def bottom(self, name: str, k: int = 10) -> list[tuple[str, float]]:
+        """The k systems with the lowest metric, worst first."""
+        return self._ranked(name, k, largest=False)
+
+    def outliers(self, name: str, threshold: float = 3.5) -> np.ndarray:
+        """Flag systems whose metric is far from the fleet median.
+
+        Uses the modified z-score based on the median absolute deviation,
+        which a few broken systems cannot shift.
+
+        Returns:
+            (np.ndarray): boolean flags in row order, False where the metric is missing
+        """
+        values = self.metric(name)
+        valid = values[~np.isnan(values)]
+        flags = np.zeros(values.size, dtype=bool)
+        if not valid.size:
+            return flags
+        median = np.median(valid)
+        mad = np.median(np.abs(valid - median))
+        if mad == 0:
+            return flags
+        with np.errstate(invalid="ignore"):
+            flags = np.abs(0.6745 * (values - median) / mad) > threshold
+        return flags
+
+    def overview(self, k: int = 10) -> dict[str, dict]:
+        """Percentiles, top and bottom k and outlier S/Ns of every metric."""
+        return {
+            name: {
+                "percentiles": self.percentiles(name),
+                "top": self.top(name, k),
+                "bottom": self.bottom(name, k),
+                "outliers": [
+                    self._sys_sns[row]
+                    for row in np.flatnonzero(self.outliers(name)).tolist()
+                ],
+            }
+            for name in METRICS
+        }
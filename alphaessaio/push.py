@@ -0,0 +1,230 @@
+"""Local server pushing real-time data to any number of subscribers.
+
+The server polls getLastPowerData once per system and interval, however
+many clients are connected, and fans the changed values out over
+Server-Sent Events (GET /events) and WebSocket (GET /ws). Both accept
+?sn=SN1,SN2 to receive only some systems. A subscriber that lets its queue
+fill up is disconnected instead of slowing down the others.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Iterable
+
+from aiohttp import web
+
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """Bounded queue of updates for one connected client."""
+
+    def __init__(self, sys_sns: Iterable[str] | None = None, queue_size: int = 100):
+        self.sys_sns = set(sys_sns) if sys_sns else None
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(queue_size)
+        self.dropped = False
+
+    def wants(self, sys_sn: str) -> bool:
+        return self.sys_sns is None or sys_sn in self.sys_sns
+
+    def offer(self, message: str) -> bool:
+        """Queue a message, returns False if the subscriber was dropped."""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.drop()
+            return False
+
+    def drop(self):
+        """Discard the backlog and wake the writer with the end marker."""
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class PushHub:
+    """Fan out messages to the subscribers interested in a system."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: set[Subscriber] = set()
+        self.latest: dict[str, str] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, sys_sns: Iterable[str] | None = None) -> Subscriber:
+        """Add a subscriber, it starts with the latest message of every system.
+
+        The queue is enlarged by the replayed messages, only a subscriber
+        lagging queue_size messages behind on top of them is dropped.
+        """
+        wanted = set(sys_sns) if sys_sns else None
+        replay = [
+            message
+            for sys_sn, message in self.latest.items()
+            if wanted is None or sys_sn in wanted
+        ]
+        subscriber = Subscriber(wanted, self.queue_size + len(replay))
+        for message in replay:
+            subscriber.queue.put_nowait(message)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, sys_sn: str, message: str):
+        self.latest[sys_sn] = message
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(sys_sn) and not subscriber.offer(message):
+                self.dropped += 1
+                self.subscribers.discard(subscriber)
+                logger.info(f"Dropped slow subscriber of {sys_sn}")
+
+
+def _sn_filter(request: web.Request) -> list[str] | None:
+    sys_sns = [
+        sys_sn
+        for value in request.query.getall("sn", [])
+        for sys_sn in value.split(",")
+        if sys_sn
+    ]
+    return sys_sns or None
+
+
+class PushServer:
+    """Poll real-time data once and push it to local subscribers."""
+
+    def __init__(
+        self,
+        api: AlphaEssAPI,
+        sys_sns: Iterable[str] | None = None,
+        interval: float = 10,
+        queue_size: int = 100,
+        concurrency: int = 16,
+    ):
+        """
+        Args:
+            api (AlphaEssAPI): client used for the upstream polls
+            sys_sns (Iterable[str] | None): systems to poll, by default from get_ess_list
+            interval (float): seconds between polls of a system
+            queue_size (int): messages a subscriber may lag behind before it is dropped
+            concurrency (int): maximum concurrent upstream requests
+        """
+        self.api = api
+        self.sys_sns = list(sys_sns) if sys_sns is not None else None
+        self.interval = interval
+        self.concurrency = concurrency
+        self.hub = PushHub(queue_size)
+        self.polls = 0
+        self._poller: asyncio.Task | None = None
+
+    async def poll_once(self):
+        """Poll every system once and publish the values that changed."""
+        if self.sys_sns is None:
+            ess_list = await self.api.get_ess_list()
+            self.sys_sns = [system.sys_sn for system in ess_list.data]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll(sys_sn: str):
+            async with semaphore:
+                try:
+                    result = await self.api.get_last_power_data(sys_sn)
+                except Exception as error:  # noqa: BLE001 - keep polling the others
+                    logger.warning(f"Polling {sys_sn} failed: {error}")
+                    return
+                finally:
+                    self.polls += 1
+            message = json.dumps(
+                {
+                    "sys_sn": sys_sn,
+                    "data": result.model_dump(mode="json", by_alias=True)["data"],
+                },
+                separators=(",", ":"),
+            )
+            if self.hub.latest.get(sys_sn) != message:
+                self.hub.publish(sys_sn, message)
+
+        await asyncio.gather(*(poll(sys_sn) for sys_sn in self.sys_sns))
+
+    async def _poll_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                await self.poll_once()
+            except Exception:  # noqa: BLE001 - retried next interval
+                logger.exception("Polling round failed")
+            await asyncio.sleep(max(self.interval - (loop.time() - started), 0))
+
+    @staticmethod
+    def _poller_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Poller stopped", exc_info=task.exception())
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        """Server-Sent Events endpoint."""
+        subscriber = self.hub.subscribe(_sn_filter(request))
+        stream = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        try:
+            await stream.prepare(request)
+            while (message := await subscriber.queue.get()) is not None:
+                await stream.write(f"data: {message}\n\n".encode("utf-8"))
+        except ConnectionResetError:
+            pass
+        finally:
+            self.hub.unsubscribe(subscriber)
+        return stream
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """WebSocket endpoint, messages are sent as text frames."""
+        subscriber = self.hub.subscribe(_sn_filter(request))
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+
+        async def send():
+            while (message := await subscriber.queue.get()) is not None:
+                await socket.send_str(message)
+            await socket.close(code=1008, message=b"too slow")
+
+        sender = asyncio.create_task(send())
+        try:
+            # incoming messages are ignored, the loop ends when the client leaves
+            async for _ in socket:
+                pass
+        finally:
+            sender.cancel()
+            self.hub.unsubscribe(subscriber)
+        return socket
+
+    async def _start(self, app: web.Application):
+        self._poller = asyncio.create_task(self._poll_forever())
+        self._poller.add_done_callback(self._poller_done)
+
+    async def _stop(self, app: web.Application):
+        if self._poller is not None:
+            self._poller.cancel()
+        for subscriber in list(self.hub.subscribers):
+            subscriber.drop()
+
+    def app(self) -> web.Application:
+        """Build the aiohttp application, polling runs while it is served."""
+        app = web.Application()
+        app.router.add_get("/events", self.events)
+        app.router.add_get("/ws", self.websocket)
+        app.on_startup.append(self._start)
+        app.on_shutdown.append(self._stop)
+        return app
+
+    def run(self, host: str = "127.0.0.1", port: int = 8765):
+        web.run_app(self.app(), host=host, port=port)
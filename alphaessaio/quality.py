@@ -0,0 +1,172 @@
+"""Data quality checks for getOneDayPowerBySn series.
+
+Requires numpy, install with the "analytics" extra.
+"""
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+from typing import Iterable
+
+import numpy as np
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+# power fields that can never be negative
+NON_NEGATIVE_FIELDS = ("ppv", "load", "cbat", "feed_in", "grid_charge")
+
+
+@dataclasses.dataclass
+class DayQualityReport:
+    """Result of checking one day of a system's power series."""
+
+    sys_sn: str
+    query_date: str
+    rows: int
+    expected_rows: int
+    missing_intervals: int
+    duplicates: int
+    out_of_order: int
+    outside_day: int
+    invalid_values: int
+    # set if the last fetch of the day failed
+    error: str | None = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the series has no gaps and no invalid rows."""
+        return not (
+            self.error
+            or self.missing_intervals
+            or self.duplicates
+            or self.out_of_order
+            or self.outside_day
+            or self.invalid_values
+        )
+
+
+def check_day(
+    sys_sn: str,
+    query_date: str,
+    rows: list[response.DataOneDayPowerBySn],
+    interval: int = 300,
+    until: datetime.datetime | None = None,
+) -> DayQualityReport:
+    """Check a day of power data for gaps, duplicates and impossible values.
+
+    Args:
+        sys_sn (str): System S/N
+        query_date (str): Date，Format：yyyy-MM-dd
+        rows (list[response.DataOneDayPowerBySn]): series as returned by the api
+        interval (int): expected seconds between samples
+        until (datetime.datetime | None): end of the expected coverage, for the
+            current day pass the current local time of the system, the last
+            interval before it is not expected yet
+
+    Returns:
+        (DayQualityReport): counts of the detected problems
+    """
+    day_start = np.datetime64(query_date, "s")
+    day_seconds = 24 * 3600
+    if until is not None:
+        until_at = np.datetime64(until.replace(tzinfo=None), "s")
+        covered = (until_at - day_start).astype(np.int64) - interval
+        day_seconds = int(min(max(covered, 0), day_seconds))
+    expected_rows = -(-day_seconds // interval)
+
+    offsets = (
+        np.array(
+            [row.upload_time.replace(tzinfo=None) for row in rows],
+            dtype="datetime64[s]",
+        )
+        - day_start
+    ).astype(np.int64)
+    steps = np.diff(offsets)
+    inside = (offsets >= 0) & (offsets < 24 * 3600)
+    slots = offsets[inside & (offsets < day_seconds)] // interval
+
+    values = np.array(
+        [[getattr(row, field) for field in NON_NEGATIVE_FIELDS] for row in rows],
+        dtype=np.float64,
+    ).reshape(len(rows), len(NON_NEGATIVE_FIELDS))
+    cbat = values[:, NON_NEGATIVE_FIELDS.index("cbat")]
+    invalid = (~np.isfinite(values) | (values < 0)).any(axis=1) | (cbat > 100)
+
+    return DayQualityReport(
+        sys_sn=sys_sn,
+        query_date=query_date,
+        rows=len(rows),
+        expected_rows=expected_rows,
+        missing_intervals=int(expected_rows - np.unique(slots).size),
+        duplicates=int((steps == 0).sum()),
+        out_of_order=int((steps < 0).sum()),
+        outside_day=int((~inside).sum()),
+        invalid_values=int(invalid.sum()),
+    )
+
+
+async def fetch_checked(
+    api: AlphaEssAPI,
+    days: Iterable[tuple[str, str]],
+    attempts: int = 3,
+    concurrency: int = 8,
+    interval: int = 300,
+) -> dict[tuple[str, str], tuple[response.OneDayPowerBySn | None, DayQualityReport]]:
+    """Fetch days of power data and re-fetch only the incomplete ones.
+
+    A day whose fetch fails is retried like an incomplete one, it does not
+    affect the other days.
+
+    Args:
+        api (AlphaEssAPI): client used for fetching
+        days (Iterable[tuple[str, str]]): (sys_sn, query_date) pairs
+        attempts (int): maximum fetches per day
+        concurrency (int): maximum concurrent requests
+        interval (int): expected seconds between samples
+
+    Returns:
+        (dict): last fetched response and its report per (sys_sn, query_date),
+            check DayQualityReport.complete for days that stayed incomplete;
+            the response is None and DayQualityReport.error is set if no
+            fetch of the day succeeded
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: dict[
+        tuple[str, str], tuple[response.OneDayPowerBySn | None, DayQualityReport]
+    ] = {}
+
+    async def fetch(sys_sn: str, query_date: str):
+        error = None
+        try:
+            async with semaphore:
+                day = await api.get_one_day_power_by_sn(query_date, sys_sn)
+        except Exception as failure:  # noqa: BLE001 - retried with the incomplete days
+            logger.warning(f"Fetching {sys_sn} {query_date} failed: {failure}")
+            error = f"{type(failure).__name__}: {failure}"
+            # keep the response of an earlier attempt if there is one
+            day = results.get((sys_sn, query_date), (None, None))[0]
+        now = datetime.datetime.now()
+        until = now if query_date == now.date().isoformat() else None
+        report = check_day(sys_sn, query_date, day.data if day else [], interval, until)
+        report.error = error
+        results[(sys_sn, query_date)] = (day, report)
+
+    pending = list(dict.fromkeys(days))
+    for attempt in range(attempts):
+        await asyncio.gather(
+            *(fetch(sys_sn, query_date) for sys_sn, query_date in pending)
+        )
+        pending = [key for key in pending if not results[key][1].complete]
+        if not pending:
+            break
+        if api.history_cache is not None:
+            for sys_sn, query_date in pending:
+                await asyncio.to_thread(
+                    api.history_cache.delete, "getOneDayPowerBySn", sys_sn, query_date
+                )
+        logger.info(f"{len(pending)} incomplete days after attempt {attempt + 1}")
+    return results
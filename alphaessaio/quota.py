@@ -0,0 +1,227 @@
+"""Persistent accounting of api calls against a daily allowance."""
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable
+
+from alphaessaio.cache import _connect
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class QuotaStatus:
+    """Usage of an account on the current day."""
+
+    used: int
+    limit: int | None
+    projected: float
+    pace_delay: float
+
+    @property
+    def remaining(self) -> int | None:
+        return None if self.limit is None else max(self.limit - self.used, 0)
+
+
+class QuotaLedger:
+    """Count calls per day, account and endpoint in a sqlite file.
+
+    AlphaEssAPI records every request it sends when given a ledger, cache
+    hits and replayed responses are not counted. Pollers and backfills ask
+    pace_delay or wait before sending to spread the remaining allowance over
+    the rest of the day instead of running into the limit. Counts and the
+    recent call rate live in the database, several processes sharing the
+    file see the usage and rate of all of them.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        daily_limit: int | None = None,
+        endpoint_limits: dict[str, int] | None = None,
+        rate_window: float = 900,
+        now: Callable[[], datetime.datetime] = datetime.datetime.now,
+        busy_timeout: float = 1,
+    ):
+        """
+        Args:
+            path (str | Path): sqlite database, may be shared by several processes
+            daily_limit (int | None): allowed calls per account and day
+            endpoint_limits (dict[str, int] | None): allowed calls per account,
+                day and endpoint name
+            rate_window (float): seconds of recent calls the projection is based on,
+                counted in minute buckets
+            now (Callable[[], datetime.datetime]): current local time, days end at midnight
+            busy_timeout (float): seconds a write waits for other processes, calls
+                that cannot be recorded in time are logged and not counted
+        """
+        self.path = Path(path)
+        self.daily_limit = daily_limit
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.rate_window = rate_window
+        self._now = now
+        self._lock = threading.Lock()
+        self._pruned = 0
+        self._connection = _connect(self.path, timeout=busy_timeout)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " day TEXT NOT NULL, account TEXT NOT NULL, endpoint TEXT NOT NULL,"
+            " calls INTEGER NOT NULL, PRIMARY KEY (day, account, endpoint))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS recent ("
+            " minute INTEGER NOT NULL, account TEXT NOT NULL, endpoint TEXT NOT NULL,"
+            " calls INTEGER NOT NULL, PRIMARY KEY (minute, account, endpoint))"
+        )
+
+    def _window_minutes(self) -> int:
+        return math.ceil(self.rate_window / 60)
+
+    def record(self, account: str, endpoint: str, calls: int = 1) -> bool:
+        """Count calls of an account to an endpoint.
+
+        Returns:
+            (bool): False if the database stayed locked and the calls were not counted
+        """
+        now = self._now()
+        day = now.date().isoformat()
+        minute = int(now.timestamp() // 60)
+        with self._lock:
+            try:
+                self._connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as error:
+                logger.warning(
+                    f"{calls} {endpoint} calls of {account} not counted: {error}"
+                )
+                return False
+            try:
+                self._connection.execute(
+                    "INSERT INTO usage VALUES (?, ?, ?, ?) ON CONFLICT"
+                    " (day, account, endpoint) DO UPDATE SET calls = calls + excluded.calls",
+                    (day, account, endpoint, calls),
+                )
+                self._connection.execute(
+                    "INSERT INTO recent VALUES (?, ?, ?, ?) ON CONFLICT"
+                    " (minute, account, endpoint) DO UPDATE SET calls = calls + excluded.calls",
+                    (minute, account, endpoint, calls),
+                )
+                if minute != self._pruned:
+                    # a day of buckets tells whether the rate window was observed
+                    self._connection.execute(
+                        "DELETE FROM recent WHERE minute < ?",
+                        (minute - 24 * 60 - self._window_minutes(),),
+                    )
+                    self._pruned = minute
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return True
+
+    def usage(
+        self, account: str, endpoint: str | None = None, day: str | None = None
+    ) -> int:
+        """Calls of an account on a day, by default today, optionally of one endpoint."""
+        day = day or self._now().date().isoformat()
+        query = (
+            "SELECT COALESCE(SUM(calls), 0) FROM usage WHERE day = ? AND account = ?"
+        )
+        params: tuple = (day, account)
+        if endpoint is not None:
+            query += " AND endpoint = ?"
+            params += (endpoint,)
+        with self._lock:
+            return self._connection.execute(query, params).fetchone()[0]
+
+    def usage_by_endpoint(self, account: str, day: str | None = None) -> dict[str, int]:
+        """Calls of an account on a day by endpoint name."""
+        day = day or self._now().date().isoformat()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT endpoint, calls FROM usage WHERE day = ? AND account = ?"
+                " ORDER BY endpoint",
+                (day, account),
+            ).fetchall()
+        return dict(rows)
+
+    def _seconds(self) -> tuple[float, float]:
+        """Seconds since and until midnight."""
+        now = self._now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds()
+        return elapsed, 24 * 3600 - elapsed
+
+    def rate(self, account: str, endpoint: str | None = None) -> float:
+        """Calls per second of all processes over the rate window.
+
+        Until the recorded minutes cover the window, e.g. on a fresh ledger,
+        the average of the day is used.
+        """
+        minutes = self._window_minutes()
+        current = int(self._now().timestamp() // 60)
+        query = (
+            "SELECT MIN(minute), COALESCE(SUM(CASE WHEN minute > ? THEN calls END), 0)"
+            " FROM recent WHERE account = ?"
+        )
+        params: tuple = (current - minutes, account)
+        if endpoint is not None:
+            query += " AND endpoint = ?"
+            params += (endpoint,)
+        with self._lock:
+            first, calls = self._connection.execute(query, params).fetchone()
+        if first is not None and first <= current - minutes:
+            return calls / (minutes * 60)
+        elapsed, _ = self._seconds()
+        return self.usage(account, endpoint) / max(elapsed, 1.0)
+
+    def projected(self, account: str, endpoint: str | None = None) -> float:
+        """Expected calls at the end of the day if the current rate holds."""
+        _, left = self._seconds()
+        return self.usage(account, endpoint) + self.rate(account, endpoint) * left
+
+    def limit(self, endpoint: str | None = None) -> int | None:
+        return (
+            self.daily_limit if endpoint is None else self.endpoint_limits.get(endpoint)
+        )
+
+    def pace_delay(self, account: str, endpoint: str | None = None) -> float:
+        """Seconds to wait before the next call to stay within the limit.
+
+        Zero while the projection stays below the limit, otherwise the
+        remaining calls are spread evenly until midnight.
+        """
+        limit = self.limit(endpoint)
+        if limit is None:
+            return 0.0
+        if self.projected(account, endpoint) <= limit:
+            return 0.0
+        _, left = self._seconds()
+        remaining = limit - self.usage(account, endpoint)
+        return left if remaining <= 0 else left / remaining
+
+    def status(self, account: str, endpoint: str | None = None) -> QuotaStatus:
+        return QuotaStatus(
+            used=self.usage(account, endpoint),
+            limit=self.limit(endpoint),
+            projected=self.projected(account, endpoint),
+            pace_delay=self.pace_delay(account, endpoint),
+        )
+
+    async def wait(self, account: str, endpoint: str | None = None):
+        """Sleep as long as pace_delay of the account and the endpoint demand."""
+        delay = self.pace_delay(account)
+        if endpoint is not None:
+            delay = max(delay, self.pace_delay(account, endpoint))
+        if delay:
+            logger.info(f"Pacing {account} {endpoint or ''} for {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
@@ -0,0 +1,104 @@
+"""Track the systems of an account and report what changed between refreshes."""
+
+import dataclasses
+import logging
+from typing import Any, Callable, Iterable
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+@dataclasses.dataclass(frozen=True)
+class RegistryEvent:
+    """A system that appeared, disappeared or changed in getEssList."""
+
+    kind: str
+    sys_sn: str
+    # current entry, for removed systems the last known one
+    system: response.DataEssList
+    # field name: (old value, new value), only for changed systems
+    changes: dict[str, tuple[Any, Any]] = dataclasses.field(default_factory=dict)
+
+
+Listener = Callable[[list[RegistryEvent]], None]
+
+
+class FleetRegistry:
+    """Latest getEssList entries by sys_sn with diffing against the previous list."""
+
+    def __init__(self, ignore: Iterable[str] = ()):
+        """
+        Args:
+            ignore (Iterable[str]): fields whose changes are not reported,
+                e.g. ("surplus_cobat",) to only follow membership and status
+        """
+        self.ignore = frozenset(ignore)
+        self.systems: dict[str, response.DataEssList] = {}
+        self.listeners: list[Listener] = []
+
+    def add_listener(self, listener: Listener):
+        """Call listener with the events of every update that changed something."""
+        self.listeners.append(listener)
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    def __contains__(self, sys_sn: object) -> bool:
+        return sys_sn in self.systems
+
+    def _changes(
+        self, old: response.DataEssList, new: response.DataEssList
+    ) -> dict[str, tuple[Any, Any]]:
+        old_fields = old.model_dump()
+        new_fields = new.model_dump()
+        return {
+            name: (old_fields.get(name), new_fields.get(name))
+            for name in old_fields.keys() | new_fields.keys()
+            if name not in self.ignore and old_fields.get(name) != new_fields.get(name)
+        }
+
+    def update(
+        self, ess_list: response.EssList | list[response.DataEssList]
+    ) -> list[RegistryEvent]:
+        """Replace the known systems and return what changed.
+
+        Args:
+            ess_list (response.EssList | list[response.DataEssList]): complete list
+
+        Returns:
+            (list[RegistryEvent]): added and changed systems in list order,
+                followed by the removed ones
+        """
+        if isinstance(ess_list, response.EssList):
+            ess_list = ess_list.data
+        current = {system.sys_sn: system for system in ess_list}
+        events = []
+        for sys_sn, system in current.items():
+            previous = self.systems.get(sys_sn)
+            if previous is None:
+                events.append(RegistryEvent(ADDED, sys_sn, system))
+                continue
+            changes = self._changes(previous, system)
+            if changes:
+                events.append(RegistryEvent(CHANGED, sys_sn, system, changes))
+        events += [
+            RegistryEvent(REMOVED, sys_sn, system)
+            for sys_sn, system in self.systems.items()
+            if sys_sn not in current
+        ]
+        self.systems = current
+        if events:
+            logger.debug(f"getEssList changed: {len(events)} events")
+            for listener in self.listeners:
+                listener(events)
+        return events
+
+    async def refresh(self, api: AlphaEssAPI) -> list[RegistryEvent]:
+        """Fetch getEssList and update the registry."""
+        return self.update(await api.get_ess_list())
@@ -634,3 +634,47 @@ class EssList(BaseModel):
         if self.model_extra:
             logging.debug(f"extra fields detected: {self.model_extra }")
         return self
+
+
+class EvChargerStatusRow(BaseModel):
+    "Status of a single EV charger, see get_ev_charger_status_row"
+
+    model_config = ConfigDict(frozen=True)
+
+    sys_sn: str = Field(..., description="System S/N")
+    evcharger_sn: str = Field(..., description="EV-charger SN")
+    evcharger_model: str = Field(..., description="EV-charger model")
+    evcharger_status: int | None = Field(
+        None, description="Status as in getEvChargerStatusBySn, None if it failed"
+    )
+    error: str | None = Field(None, description="Error message if the request failed")
+
+
+class SystemSnapshot(BaseModel):
+    "Combined state of a system from several endpoints, see get_system_snapshot"
+
+    sys_sn: str = Field(..., description="System S/N")
+    last_power_data: DataLastPowerData | None = Field(
+        None, description="getLastPowerData"
+    )
+    sum_data: DataSumDataForCustomer | None = Field(
+        None, description="getSumDataForCustomer"
+    )
+    charge_config: DataChargeConfigInfo | None = Field(
+        None, description="getChargeConfigInfo"
+    )
+    dis_charge_config: DataDisChargeConfigInfo | None = Field(
+        None, description="getDisChargeConfigInfo"
+    )
+    ev_chargers: List[EvChargerStatusRow] | None = Field(
+        None, description="getEvChargerConfigList with getEvChargerStatusBySn"
+    )
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Error message by failed part, failed chargers carry their own",
+    )
+
+    @property
+    def complete(self) -> bool:
+        """Whether every requested part and charger status succeeded."""
+        return not self.errors and not any(row.error for row in self.ev_chargers or ())
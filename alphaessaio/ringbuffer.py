@@ -0,0 +1,324 @@
+"""Compressed ring buffer of recent real-time samples per system.
+
+Samples are encoded like in Facebook's Gorilla time series database:
+timestamps as delta of deltas, values as the XOR with the previous value of
+the same field. Steady values cost a single bit, a sample every minute with
+a few changing fields a few dozen bytes. Samples are kept in blocks, whole
+blocks older than the retention are dropped.
+
+Requires numpy, install with the "analytics" extra.
+"""
+
+import struct
+import time
+from collections import deque
+from typing import Sequence
+
+import numpy as np
+
+from alphaessaio import response
+from alphaessaio.fleet import (
+    FIELD_NAMES,
+    flatten_last_power_data,
+    flatten_raw_last_power_data,
+)
+
+# (prefix, prefix bits, value bits) of delta of delta timestamps
+_TIME_BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+
+
+def _float_bits(value: float) -> int:
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
+
+
+class _BlockEncoder:
+    """Bit stream of a block that is still being appended to."""
+
+    def __init__(self, width: int):
+        self.width = width
+        self.bits = 0
+        self.nbits = 0
+        self.count = 0
+        self.first_time = 0
+        self.last_time = 0
+        self._delta = 0
+        self._values = [0] * width
+        self._leading = [-1] * width
+        self._trailing = [0] * width
+
+    def _write(self, value: int, nbits: int):
+        self.bits = (self.bits << nbits) | value
+        self.nbits += nbits
+
+    def _write_time(self, timestamp: int):
+        delta = timestamp - self.last_time
+        dod = delta - self._delta
+        self._delta = delta
+        if dod == 0:
+            self._write(0, 1)
+            return
+        for prefix, prefix_bits, value_bits in _TIME_BUCKETS:
+            bias = (1 << (value_bits - 1)) - 1
+            if -bias <= dod <= bias + 1:
+                self._write(prefix, prefix_bits)
+                self._write(dod + bias, value_bits)
+                return
+        self._write(0b1111, 4)
+        self._write(dod & 0xFFFFFFFFFFFFFFFF, 64)
+
+    def _write_value(self, field: int, bits: int):
+        xor = bits ^ self._values[field]
+        self._values[field] = bits
+        if not xor:
+            self._write(0, 1)
+            return
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        previous = self._leading[field]
+        if previous >= 0 and leading >= previous and trailing >= self._trailing[field]:
+            self._write(0b10, 2)
+            self._write(
+                xor >> self._trailing[field], 64 - previous - self._trailing[field]
+            )
+            return
+        meaningful = 64 - leading - trailing
+        self._write(0b11, 2)
+        self._write(leading, 5)
+        self._write(meaningful - 1, 6)
+        self._write(xor >> trailing, meaningful)
+        self._leading[field] = leading
+        self._trailing[field] = trailing
+
+    def append(self, timestamp: int, values: Sequence[float]):
+        if self.count == 0:
+            self.first_time = self.last_time = timestamp
+            for field, value in enumerate(values):
+                self._values[field] = bits = _float_bits(value)
+                self._write(bits, 64)
+        else:
+            self._write_time(timestamp)
+            self.last_time = timestamp
+            for field, value in enumerate(values):
+                self._write_value(field, _float_bits(value))
+        self.count += 1
+
+    def seal(self) -> "_Block":
+        padding = -self.nbits % 8
+        data = (self.bits << padding).to_bytes((self.nbits + padding) // 8, "big")
+        return _Block(self.first_time, self.last_time, self.count, self.nbits, data)
+
+
+class _Block:
+    """Immutable encoded samples."""
+
+    __slots__ = ("first_time", "last_time", "count", "nbits", "data")
+
+    def __init__(
+        self, first_time: int, last_time: int, count: int, nbits: int, data: bytes
+    ):
+        self.first_time = first_time
+        self.last_time = last_time
+        self.count = count
+        self.nbits = nbits
+        self.data = data
+
+
+def _decode(
+    first_time: int, count: int, nbits: int, bits: int, width: int
+) -> tuple[np.ndarray, np.ndarray]:
+    stream = format(bits, f"0{nbits}b") if nbits else ""
+    position = 0
+
+    def read(n: int) -> int:
+        nonlocal position
+        position += n
+        return int(stream[position - n : position], 2)
+
+    times = np.empty(count, dtype=np.int64)
+    values = np.empty((count, width), dtype=np.uint64)
+    if not count:
+        return times, values.view(np.float64)
+    times[0] = timestamp = first_time
+    current = [read(64) for _ in range(width)]
+    values[0] = current
+    leading = [0] * width
+    trailing = [0] * width
+    delta = 0
+    for row in range(1, count):
+        if stream[position] == "0":
+            position += 1
+        else:
+            for prefix, prefix_bits, value_bits in _TIME_BUCKETS:
+                if read(prefix_bits) == prefix:
+                    delta += read(value_bits) - (1 << (value_bits - 1)) + 1
+                    break
+                position -= prefix_bits
+            else:
+                position += 4
+                dod = read(64)
+                delta += dod - (1 << 64) if dod >> 63 else dod
+        timestamp += delta
+        times[row] = timestamp
+        for field in range(width):
+            if stream[position] == "0":
+                position += 1
+                continue
+            if stream[position + 1] == "1":
+                position += 2
+                leading[field] = read(5)
+                meaningful = read(6) + 1
+                trailing[field] = 64 - leading[field] - meaningful
+            else:
+                position += 2
+            meaningful = 64 - leading[field] - trailing[field]
+            current[field] ^= read(meaningful) << trailing[field]
+        values[row] = current
+    return times, values.view(np.float64)
+
+
+class SampleRing:
+    """Compressed samples of one system within a retention window."""
+
+    def __init__(
+        self,
+        width: int = len(FIELD_NAMES),
+        retention: float = 24 * 3600,
+        block_size: int = 120,
+    ):
+        """
+        Args:
+            width (int): values per sample
+            retention (float): seconds of samples to keep
+            block_size (int): samples per block, whole blocks are dropped
+        """
+        self.width = width
+        self.retention = retention
+        self.block_size = block_size
+        self._blocks: deque[_Block] = deque()
+        self._open = _BlockEncoder(width)
+        self._last_time: int | None = None
+
+    def append(self, timestamp: int, values: Sequence[float]):
+        """Add a sample, timestamps in seconds must not decrease."""
+        if len(values) != self.width:
+            raise ValueError(f"expected {self.width} values, got {len(values)}")
+        if self._last_time is not None and timestamp < self._last_time:
+            raise ValueError(f"sample at {timestamp} is older than the last one")
+        self._last_time = timestamp
+        self._open.append(timestamp, values)
+        if self._open.count >= self.block_size:
+            self._blocks.append(self._open.seal())
+            self._open = _BlockEncoder(self.width)
+        oldest = timestamp - self.retention
+        while self._blocks and self._blocks[0].last_time < oldest:
+            self._blocks.popleft()
+
+    def window(
+        self, start: int | None = None, end: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Decode the samples with start <= timestamp < end.
+
+        Returns:
+            (tuple[np.ndarray, np.ndarray]): timestamps and a (samples, width) value array
+        """
+        parts = []
+        encoded = [
+            (
+                block.first_time,
+                block.last_time,
+                block.count,
+                block.nbits,
+                int.from_bytes(block.data, "big")
+                >> (len(block.data) * 8 - block.nbits),
+            )
+            for block in self._blocks
+        ]
+        if self._open.count:
+            encoded.append(
+                (
+                    self._open.first_time,
+                    self._open.last_time,
+                    self._open.count,
+                    self._open.nbits,
+                    self._open.bits,
+                )
+            )
+        for first_time, last_time, count, nbits, bits in encoded:
+            if (start is not None and last_time < start) or (
+                end is not None and first_time >= end
+            ):
+                continue
+            parts.append(_decode(first_time, count, nbits, bits, self.width))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.width))
+        times = np.concatenate([part[0] for part in parts])
+        values = np.concatenate([part[1] for part in parts])
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        return times[mask], values[mask]
+
+    def __len__(self) -> int:
+        return sum(block.count for block in self._blocks) + self._open.count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of encoded samples."""
+        return (
+            sum(len(block.data) for block in self._blocks) + (self._open.nbits + 7) // 8
+        )
+
+
+class LiveSampleBuffer:
+    """Ring buffers of real-time data of many systems, fields as FIELD_NAMES."""
+
+    def __init__(self, retention: float = 24 * 3600, block_size: int = 120):
+        self.retention = retention
+        self.block_size = block_size
+        self.rings: dict[str, SampleRing] = {}
+
+    def append(
+        self,
+        sys_sn: str,
+        data: response.LastPowerData | response.DataLastPowerData | dict,
+        timestamp: int | None = None,
+    ):
+        """Add a getLastPowerData result, a model or the raw payload.
+
+        Args:
+            sys_sn (str): System S/N
+            data (response.LastPowerData | response.DataLastPowerData | dict): sample
+            timestamp (int | None): epoch seconds, by default now
+        """
+        values = (
+            flatten_raw_last_power_data(data)
+            if isinstance(data, dict)
+            else flatten_last_power_data(data)
+        )
+        ring = self.rings.get(sys_sn)
+        if ring is None:
+            ring = self.rings[sys_sn] = SampleRing(
+                len(FIELD_NAMES), self.retention, self.block_size
+            )
+        ring.append(int(time.time()) if timestamp is None else timestamp, values)
+
+    def window(
+        self, sys_sn: str, start: int | None = None, end: int | None = None
+    ) -> dict[str, np.ndarray]:
+        """Decode the samples of a system with start <= timestamp < end.
+
+        Returns:
+            (dict[str, np.ndarray]): "time" and one array per name of FIELD_NAMES
+        """
+        ring = self.rings.get(sys_sn) or SampleRing(len(FIELD_NAMES))
+        times, values = ring.window(start, end)
+        columns = {"time": times}
+        for index, name in enumerate(FIELD_NAMES):
+            columns[name] = values[:, index]
+        return columns
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings.values())
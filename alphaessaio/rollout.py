@@ -0,0 +1,282 @@
+"""Staged rollout of charge and discharge settings to many systems.
+
+Systems are updated in waves of growing size, each wave concurrently. Every
+system is read back after its update to verify the settings arrived. A wave
+with too many failures stops the rollout before the next, larger one
+starts. Progress is checkpointed to a json file, a rerun with the same
+file skips the systems that are done.
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import pydantic
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+VERIFIED = "verified"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+DONE = (VERIFIED, UNCHANGED)
+
+
+@dataclasses.dataclass
+class WaveReport:
+    """Outcome of one wave."""
+
+    wave: int
+    systems: int
+    verified: int = 0
+    unchanged: int = 0
+    # sys_sn: error message
+    failures: dict[str, str] = dataclasses.field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Systems per second."""
+        return self.systems / self.seconds if self.seconds else 0.0
+
+    @property
+    def failure_rate(self) -> float:
+        return len(self.failures) / self.systems if self.systems else 0.0
+
+
+@dataclasses.dataclass
+class RolloutReport:
+    """Outcome of a rollout run."""
+
+    waves: list[WaveReport] = dataclasses.field(default_factory=list)
+    skipped: int = 0
+    halted: bool = False
+
+    @property
+    def failures(self) -> dict[str, str]:
+        return {
+            sys_sn: error
+            for wave in self.waves
+            for sys_sn, error in wave.failures.items()
+        }
+
+
+def _differences(target: pydantic.BaseModel, current: pydantic.BaseModel) -> list[str]:
+    return [
+        name
+        for name in type(target).model_fields
+        if getattr(target, name) != getattr(current, name)
+    ]
+
+
+class ConfigRollout:
+    """Apply charge and/or discharge settings to systems in verified waves."""
+
+    def __init__(
+        self,
+        api: AlphaEssAPI,
+        charge: response.DataChargeConfigInfo | None = None,
+        dis_charge: response.DataDisChargeConfigInfo | None = None,
+        waves: Sequence[int | None] = (10, 100, None),
+        concurrency: int | Sequence[int] = 16,
+        max_failure_rate: float = 0.1,
+        checkpoint: str | Path | None = None,
+        skip_matching: bool = True,
+        verify_attempts: int = 3,
+        verify_delay: float = 5.0,
+        checkpoint_interval: float = 1.0,
+    ):
+        """
+        Args:
+            api (AlphaEssAPI): client used for updates and read-backs
+            charge (response.DataChargeConfigInfo | None): target charge settings
+            dis_charge (response.DataDisChargeConfigInfo | None): target discharge settings
+            waves (Sequence[int | None]): systems per wave, None for all remaining,
+                the last size repeats until every system is done
+            concurrency (int | Sequence[int]): concurrent systems, per wave if a sequence
+            max_failure_rate (float): share of failed systems that stops the rollout
+                after a wave
+            checkpoint (str | Path | None): json file of the progress for resuming
+            skip_matching (bool): read the settings first and skip systems that
+                have them already, the api accepts only one update a day
+            verify_attempts (int): read-backs before a differing system counts as failed
+            verify_delay (float): seconds before repeating a differing read-back
+            checkpoint_interval (float): minimum seconds between checkpoint writes
+                within a wave
+        """
+        if charge is None and dis_charge is None:
+            raise ValueError("charge or dis_charge settings are required")
+        self.api = api
+        self.charge = charge
+        self.dis_charge = dis_charge
+        self.waves = list(waves) or [None]
+        self.concurrency = concurrency
+        self.max_failure_rate = max_failure_rate
+        self.checkpoint = Path(checkpoint) if checkpoint is not None else None
+        self.skip_matching = skip_matching
+        self.verify_attempts = max(verify_attempts, 1)
+        self.verify_delay = verify_delay
+        self.checkpoint_interval = checkpoint_interval
+        self.status: dict[str, str] = {}
+        self._saved = 0.0
+
+    def _target(self) -> dict:
+        return {
+            "charge": self.charge.model_dump() if self.charge else None,
+            "dis_charge": self.dis_charge.model_dump() if self.dis_charge else None,
+        }
+
+    def _load(self):
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return
+        with open(self.checkpoint) as file:
+            state = json.load(file)
+        if state["target"] != self._target():
+            raise ValueError(
+                f"checkpoint {self.checkpoint} belongs to a rollout of other settings"
+            )
+        self.status = state["status"]
+
+    def _save(self, force: bool = False):
+        if self.checkpoint is None:
+            return
+        if not force and time.monotonic() - self._saved < self.checkpoint_interval:
+            return
+        temporary = self.checkpoint.with_name(self.checkpoint.name + ".tmp")
+        with open(temporary, "w") as file:
+            json.dump({"target": self._target(), "status": self.status}, file)
+        os.replace(temporary, self.checkpoint)
+        self._saved = time.monotonic()
+
+    async def _read(self, sys_sn: str) -> dict[str, pydantic.BaseModel]:
+        # cached settings may predate the update, always ask the api
+        calls = {}
+        if self.charge is not None:
+            calls["charge"] = self.api.get_charge_config_info(sys_sn, cached=False)
+        if self.dis_charge is not None:
+            calls["dis_charge"] = self.api.get_dis_charge_config_info(
+                sys_sn, cached=False
+            )
+        results = await asyncio.gather(*calls.values())
+        return {part: result.data for part, result in zip(calls, results)}
+
+    def _mismatches(self, current: dict[str, pydantic.BaseModel]) -> list[str]:
+        return [
+            f"{part}.{name}"
+            for part, target in (
+                ("charge", self.charge),
+                ("dis_charge", self.dis_charge),
+            )
+            if target is not None
+            for name in _differences(target, current[part])
+        ]
+
+    async def _apply(self, sys_sn: str) -> str:
+        """Update and verify one system, returns its status."""
+        if self.skip_matching and not self._mismatches(await self._read(sys_sn)):
+            return UNCHANGED
+        updates = []
+        if self.charge is not None:
+            updates.append(
+                self.api.update_charge_config_info(
+                    sys_sn,
+                    self.charge.bat_high_cap,
+                    self.charge.grid_charge,
+                    self.charge.time_chae1,
+                    self.charge.time_chae2,
+                    self.charge.time_chaf1,
+                    self.charge.time_chaf2,
+                )
+            )
+        if self.dis_charge is not None:
+            updates.append(
+                self.api.update_dis_charge_config_info(
+                    self.dis_charge.bat_use_cap,
+                    self.dis_charge.ctr_dis,
+                    self.dis_charge.time_dise1,
+                    self.dis_charge.time_dise2,
+                    self.dis_charge.time_disf1,
+                    self.dis_charge.time_disf2,
+                    sys_sn,
+                )
+            )
+        await asyncio.gather(*updates)
+        for attempt in range(self.verify_attempts):
+            if attempt:
+                await asyncio.sleep(self.verify_delay)
+            mismatches = self._mismatches(await self._read(sys_sn))
+            if not mismatches:
+                return VERIFIED
+        raise ValueError(f"read-back differs in {', '.join(mismatches)}")
+
+    async def _wave(
+        self, number: int, sys_sns: list[str], concurrency: int
+    ) -> WaveReport:
+        report = WaveReport(wave=number, systems=len(sys_sns))
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.monotonic()
+
+        async def apply(sys_sn: str):
+            async with semaphore:
+                try:
+                    status = await self._apply(sys_sn)
+                except Exception as error:  # noqa: BLE001 - reported per system
+                    status = FAILED
+                    report.failures[sys_sn] = f"{type(error).__name__}: {error}"
+            if status == VERIFIED:
+                report.verified += 1
+            elif status == UNCHANGED:
+                report.unchanged += 1
+            self.status[sys_sn] = status
+            self._save()
+
+        await asyncio.gather(*map(apply, sys_sns))
+        report.seconds = time.monotonic() - started
+        self._save(force=True)
+        logger.info(
+            f"Wave {number}: {report.verified} verified, {report.unchanged} unchanged,"
+            f" {len(report.failures)} failed, {report.throughput:.1f} systems/s"
+        )
+        return report
+
+    def _concurrency(self, wave: int) -> int:
+        if isinstance(self.concurrency, int):
+            return self.concurrency
+        return self.concurrency[min(wave, len(self.concurrency) - 1)]
+
+    async def run(self, sys_sns: Iterable[str]) -> RolloutReport:
+        """Roll the settings out to systems, resuming from the checkpoint.
+
+        Args:
+            sys_sns (Iterable[str]): systems to update
+
+        Returns:
+            (RolloutReport): per wave counts, throughput and failures
+        """
+        self._load()
+        sys_sns = list(dict.fromkeys(sys_sns))
+        pending = [sys_sn for sys_sn in sys_sns if self.status.get(sys_sn) not in DONE]
+        report = RolloutReport(skipped=len(sys_sns) - len(pending))
+        wave = 0
+        while pending:
+            size = self.waves[min(wave, len(self.waves) - 1)] or len(pending)
+            batch, pending = pending[:size], pending[size:]
+            result = await self._wave(wave, batch, self._concurrency(wave))
+            report.waves.append(result)
+            wave += 1
+            if pending and result.failure_rate > self.max_failure_rate:
+                logger.warning(
+                    f"Rollout halted after wave {result.wave}:"
+                    f" {result.failure_rate:.0%} of the systems failed"
+                )
+                report.halted = True
+                break
+        return report
@@ -0,0 +1,150 @@
+"""Priority scheduling of requests to the AlphaESS API."""
+
+import asyncio
+import collections
+import contextlib
+import enum
+import logging
+import time
+from typing import AsyncIterator
+
+from alphaessaio import deadline
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    """Request classes, lower values are served first."""
+
+    CONTROL = 0
+    REALTIME = 1
+    CONFIG = 2
+    BULK = 3
+
+
+ENDPOINT_PRIORITIES: dict[str, Priority] = {
+    "remoteControlEvCharger": Priority.CONTROL,
+    "setEvChargerCurrentsBySn": Priority.CONTROL,
+    "updateChargeConfigInfo": Priority.CONTROL,
+    "updateDisChargeConfigInfo": Priority.CONTROL,
+    "bindSn": Priority.CONTROL,
+    "unBindSn": Priority.CONTROL,
+    "getLastPowerData": Priority.REALTIME,
+    "getEvChargerStatusBySn": Priority.REALTIME,
+    "getSumDataForCustomer": Priority.REALTIME,
+    "getEvChargerConfigList": Priority.CONFIG,
+    "getEvChargerCurrentsBySn": Priority.CONFIG,
+    "getChargeConfigInfo": Priority.CONFIG,
+    "getDisChargeConfigInfo": Priority.CONFIG,
+    "getVerificationCode": Priority.CONFIG,
+    "getEssList": Priority.CONFIG,
+    "getOneDayPowerBySn": Priority.BULK,
+    "getOneDateEnergyBySn": Priority.BULK,
+}
+
+
+def endpoint_priority(endpoint: str) -> Priority:
+    """Return the request class of an endpoint, unknown ones count as CONFIG."""
+    return ENDPOINT_PRIORITIES.get(endpoint, Priority.CONFIG)
+
+
+class RequestScheduler:
+    """Limit concurrent requests and serve waiting ones by priority.
+
+    At most max_concurrency requests run at once and each class can be
+    capped further, by default bulk history may only take half of the
+    slots. Free slots always go to the waiting request of the most urgent
+    class that is below its cap. Requests whose deadline (see
+    alphaessaio.deadline) passes while waiting are dropped unsent.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        limits: dict[Priority, int] | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limits = {priority: max_concurrency for priority in Priority}
+        self.limits[Priority.BULK] = max(1, max_concurrency // 2)
+        self.limits.update(limits or {})
+        self.running = {priority: 0 for priority in Priority}
+        self.started = {priority: 0 for priority in Priority}
+        self.dropped = {priority: 0 for priority in Priority}
+        self.wait_time = {priority: 0.0 for priority in Priority}
+        self._total = 0
+        self._queues: dict[Priority, collections.deque] = {
+            priority: collections.deque() for priority in Priority
+        }
+
+    def waiting(self, priority: Priority) -> int:
+        """Return the number of queued requests of a class."""
+        return sum(not fut.done() for fut, _ in self._queues[priority])
+
+    def _can_run(self, priority: Priority) -> bool:
+        return (
+            self._total < self.max_concurrency
+            and self.running[priority] < self.limits[priority]
+        )
+
+    def _dispatch(self):
+        now = time.monotonic()
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and self._can_run(priority):
+                fut, at = queue.popleft()
+                if fut.done():
+                    continue
+                if at is not None and at <= now:
+                    self.dropped[priority] += 1
+                    fut.set_exception(
+                        deadline.AlphaEssDeadlineError(
+                            f"deadline exceeded while queued as {priority.name}"
+                        )
+                    )
+                    continue
+                self.running[priority] += 1
+                self._total += 1
+                fut.set_result(None)
+
+    async def acquire(self, priority: Priority):
+        """Wait for a slot of the given class."""
+        deadline.check()
+        start = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        entry = (fut, deadline.current_deadline())
+        self._queues[priority].append(entry)
+        self._dispatch()
+        try:
+            if not fut.done():
+                done, _ = await asyncio.wait({fut}, timeout=deadline.remaining())
+                if not done:
+                    self.dropped[priority] += 1
+                    raise deadline.AlphaEssDeadlineError(
+                        f"deadline exceeded while queued as {priority.name}"
+                    )
+        except BaseException:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self.release(priority)
+            else:
+                fut.cancel()
+                with contextlib.suppress(ValueError):
+                    self._queues[priority].remove(entry)
+            raise
+        fut.result()
+        self.started[priority] += 1
+        self.wait_time[priority] += time.monotonic() - start
+
+    def release(self, priority: Priority):
+        """Give back a slot of the given class."""
+        self.running[priority] -= 1
+        self._total -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        """Hold a slot of the given class while the block runs."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
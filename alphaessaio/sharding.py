@@ -0,0 +1,334 @@
+"""Poll a fleet from several worker processes without polling a system twice.
+
+Systems are assigned to the live workers with consistent hashing. A worker
+only polls a system while it holds a time limited lease on it in a shared
+sqlite store, so a system moving to another worker is never polled by both.
+
+The store relies on sqlite locking in WAL mode, which only works between
+processes of one host. Do not put it on a network filesystem shared by
+several hosts, leases could be granted twice.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+from alphaessaio.cache import _connect
+from alphaessaio.client import AlphaEssAPI, AlphaEssAuth
+
+logger = logging.getLogger(__name__)
+
+PollFunction = Callable[[AlphaEssAPI, str], Awaitable[object]]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Adding or removing a member only moves the keys of that member.
+    """
+
+    def __init__(self, members: Iterable[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        points = sorted(
+            (_hash(f"{member}#{replica}"), member)
+            for member in set(members)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    @property
+    def members(self) -> set[str]:
+        return set(self._owners)
+
+    def owner(self, key: str) -> str | None:
+        """Return the member responsible for key or None on an empty ring."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class LeaseStore:
+    """Worker membership and leases on systems in a sqlite file of this host."""
+
+    def __init__(self, path: str | Path, lease_seconds: float = 180):
+        """
+        Args:
+            path (str | Path): sqlite database shared by the workers, on a local disk
+            lease_seconds (float): lifetime of heartbeats and leases
+        """
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._connection = _connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " worker_id TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " sys_sn TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def heartbeat(self, worker_id: str):
+        """Register a worker or extend its membership."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO workers VALUES (?, ?)",
+                (worker_id, time.time() + self.lease_seconds),
+            )
+
+    def live_workers(self) -> set[str]:
+        """Return the workers whose heartbeat has not expired."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT worker_id FROM workers WHERE expires > ?", (time.time(),)
+            ).fetchall()
+        return {worker_id for (worker_id,) in rows}
+
+    def acquire(self, sys_sn: str, worker_id: str) -> bool:
+        """Take or extend the lease on sys_sn unless another worker holds it."""
+        return sys_sn in self.acquire_many([sys_sn], worker_id)
+
+    def acquire_many(self, sys_sns: Iterable[str], worker_id: str) -> set[str]:
+        """Take or extend the leases on sys_sns in one transaction.
+
+        Returns:
+            (set[str]): the systems of sys_sns now leased by worker_id
+        """
+        sys_sns = set(sys_sns)
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT (sys_sn) DO UPDATE"
+                    " SET owner = excluded.owner, expires = excluded.expires"
+                    " WHERE leases.owner = excluded.owner OR leases.expires <= ?",
+                    ((sys_sn, worker_id, expires, now) for sys_sn in sys_sns),
+                )
+                rows = self._connection.execute(
+                    "SELECT sys_sn FROM leases WHERE owner = ? AND expires = ?",
+                    (worker_id, expires),
+                ).fetchall()
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return {sys_sn for (sys_sn,) in rows} & sys_sns
+
+    def release(self, sys_sn: str, worker_id: str):
+        """Give up the lease on sys_sn if worker_id holds it."""
+        self.release_many([sys_sn], worker_id)
+
+    def release_many(self, sys_sns: Iterable[str], worker_id: str):
+        """Give up the leases of worker_id on sys_sns in one transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    "DELETE FROM leases WHERE sys_sn = ? AND owner = ?",
+                    ((sys_sn, worker_id) for sys_sn in sys_sns),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def held(self, worker_id: str) -> set[str]:
+        """Return the systems with an unexpired lease of worker_id."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT sys_sn FROM leases WHERE owner = ? AND expires > ?",
+                (worker_id, time.time()),
+            ).fetchall()
+        return {sys_sn for (sys_sn,) in rows}
+
+    def leave(self, worker_id: str):
+        """Drop the membership and all leases of a worker."""
+        with self._lock:
+            self._connection.execute("DELETE FROM leases WHERE owner = ?", (worker_id,))
+            self._connection.execute(
+                "DELETE FROM workers WHERE worker_id = ?", (worker_id,)
+            )
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+
+class ShardedPoller:
+    """Poll the share of the fleet that consistent hashing assigns to a worker."""
+
+    def __init__(
+        self,
+        api: AlphaEssAPI,
+        store: LeaseStore,
+        poll: PollFunction,
+        interval: float = 60,
+        worker_id: str | None = None,
+        sys_sns: Iterable[str] | None = None,
+        fleet_refresh: float = 3600,
+        concurrency: int = 16,
+    ):
+        """
+        Args:
+            api (AlphaEssAPI): client of this worker
+            store (LeaseStore): shared membership and leases, lease_seconds must
+                exceed interval
+            poll (PollFunction): called with api and sys_sn for every owned system
+            interval (float): seconds between polling rounds
+            worker_id (str | None): unique worker name, generated by default
+            sys_sns (Iterable[str] | None): fleet, by default from get_ess_list
+            fleet_refresh (float): seconds between get_ess_list refreshes
+            concurrency (int): maximum concurrent polls of this worker
+        """
+        if store.lease_seconds <= interval:
+            raise ValueError("lease_seconds of the store must exceed interval")
+        self.api = api
+        self.store = store
+        self.poll = poll
+        self.interval = interval
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.fleet_refresh = fleet_refresh
+        self.concurrency = concurrency
+        self.polls = 0
+        self.failures = 0
+        self._fleet = list(sys_sns) if sys_sns is not None else None
+        self._static_fleet = sys_sns is not None
+        self._fleet_fetched = 0.0
+        self._stop = asyncio.Event()
+
+    async def _fleet_sns(self) -> list[str]:
+        if not self._static_fleet and (
+            self._fleet is None
+            or time.monotonic() - self._fleet_fetched > self.fleet_refresh
+        ):
+            ess_list = await self.api.get_ess_list()
+            self._fleet = [system.sys_sn for system in ess_list.data]
+            self._fleet_fetched = time.monotonic()
+        return self._fleet or []
+
+    def _renew(self, fleet: list[str]) -> set[str]:
+        self.store.heartbeat(self.worker_id)
+        ring = HashRing(self.store.live_workers() | {self.worker_id})
+        assigned = {sys_sn for sys_sn in fleet if ring.owner(sys_sn) == self.worker_id}
+        released = self.store.held(self.worker_id) - assigned
+        if released:
+            self.store.release_many(released, self.worker_id)
+        return self.store.acquire_many(assigned, self.worker_id)
+
+    async def rebalance(self) -> set[str]:
+        """Renew membership and leases, returns the systems to poll this round.
+
+        Leases are renewed in a thread with a single write transaction, only
+        systems that moved to other workers are released.
+        """
+        fleet = await self._fleet_sns()
+        return await asyncio.to_thread(self._renew, fleet)
+
+    async def run_once(self) -> set[str]:
+        """Run a single polling round, returns the polled systems."""
+        owned = await self.rebalance()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll(sys_sn: str):
+            async with semaphore:
+                try:
+                    await self.poll(self.api, sys_sn)
+                    self.polls += 1
+                except Exception as error:  # noqa: BLE001 - keep polling the others
+                    self.failures += 1
+                    logger.warning(f"Polling {sys_sn} failed: {error}")
+
+        await asyncio.gather(*(poll(sys_sn) for sys_sn in owned))
+        return owned
+
+    async def run(self):
+        """Poll every interval until stop() is called, then leave the ring."""
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    await self.run_once()
+                except Exception:  # noqa: BLE001 - retried next interval
+                    logger.exception(f"Polling round of {self.worker_id} failed")
+                delay = self.interval - (time.monotonic() - started)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), max(delay, 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.store.leave(self.worker_id)
+
+    def stop(self):
+        self._stop.set()
+
+
+def _worker_main(
+    auth: AlphaEssAuth,
+    store_path: str,
+    lease_seconds: float,
+    poll: PollFunction,
+    interval: float,
+):
+    async def main():
+        store = LeaseStore(store_path, lease_seconds)
+        async with AlphaEssAPI(auth) as api:
+            await ShardedPoller(api, store, poll, interval).run()
+
+    asyncio.run(main())
+
+
+def run_sharded(
+    auth: AlphaEssAuth,
+    store_path: str | Path,
+    poll: PollFunction,
+    workers: int | None = None,
+    interval: float = 60,
+    lease_seconds: float | None = None,
+) -> list[multiprocessing.Process]:
+    """Start worker processes that poll the fleet together.
+
+    Every process runs its own AlphaEssAPI session and ShardedPoller on the
+    same lease store. All workers have to run on this host, see the module
+    docstring.
+
+    Args:
+        auth (AlphaEssAuth): authentication
+        store_path (str | Path): sqlite file of the lease store on a local disk
+        poll (PollFunction): module level coroutine function called per system
+        workers (int | None): number of processes, defaults to the cpu count
+        interval (float): seconds between polling rounds
+        lease_seconds (float | None): lease lifetime, defaults to three intervals
+
+    Returns:
+        (list[multiprocessing.Process]): started processes
+    """
+    processes = [
+        multiprocessing.Process(
+            target=_worker_main,
+            args=(auth, str(store_path), lease_seconds or 3 * interval, poll, interval),
+            daemon=True,
+        )
+        for _ in range(workers or os.cpu_count() or 1)
+    ]
+    for process in processes:
+        process.start()
+    return processes
@@ -0,0 +1,107 @@
+"""Time ordered streams of history across many systems."""
+
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+from typing import AsyncIterator, Iterable, Iterator
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def date_range(start: str, end: str) -> list[str]:
+    """Return all dates from start to end inclusive, Format：yyyy-MM-dd."""
+    first = datetime.date.fromisoformat(start)
+    last = datetime.date.fromisoformat(end)
+    return [
+        (first + datetime.timedelta(days=day)).isoformat()
+        for day in range((last - first).days + 1)
+    ]
+
+
+async def merged_history(
+    api: AlphaEssAPI,
+    sys_sns: Iterable[str],
+    start_date: str,
+    end_date: str | None = None,
+    prefetch: int = 1,
+    concurrency: int = 8,
+) -> AsyncIterator[response.DataOneDayPowerBySn]:
+    """Yield the power data of many systems as one stream ordered by upload_time.
+
+    Every system's days are fetched in date order by its own producer and
+    merged with a heap holding one row per system. Producers run at most
+    prefetch days ahead of the consumer, so memory stays proportional to
+    the number of systems times (1 + prefetch) days.
+
+    Args:
+        api (AlphaEssAPI): client used for fetching
+        sys_sns (Iterable[str]): systems to merge
+        start_date (str): first date，Format：yyyy-MM-dd
+        end_date (str | None): last date, defaults to start_date
+        prefetch (int): days fetched ahead per system
+        concurrency (int): maximum concurrent requests
+
+    Yields:
+        (response.DataOneDayPowerBySn): rows ordered by upload_time
+    """
+    dates = date_range(start_date, end_date or start_date)
+    sys_sns = list(dict.fromkeys(sys_sns))
+    semaphore = asyncio.Semaphore(concurrency)
+    queues = [asyncio.Queue(maxsize=max(prefetch, 1)) for _ in sys_sns]
+
+    async def produce(sys_sn: str, queue: asyncio.Queue):
+        try:
+            for query_date in dates:
+                async with semaphore:
+                    day = await api.get_one_day_power_by_sn(query_date, sys_sn)
+                if day.data:
+                    await queue.put(sorted(day.data, key=lambda row: row.upload_time))
+        except Exception as error:  # noqa: BLE001 - raised by the consumer
+            await queue.put(error)
+        else:
+            await queue.put(_DONE)
+
+    producers = [
+        asyncio.create_task(produce(sys_sn, queue))
+        for sys_sn, queue in zip(sys_sns, queues)
+    ]
+    heap: list = []
+    counter = itertools.count()
+
+    def push(index: int, rows: Iterator[response.DataOneDayPowerBySn]) -> bool:
+        row = next(rows, None)
+        if row is None:
+            return False
+        heapq.heappush(heap, (row.upload_time, index, next(counter), row, rows))
+        return True
+
+    async def advance(index: int):
+        while True:
+            day = await queues[index].get()
+            if day is _DONE:
+                return
+            if isinstance(day, Exception):
+                raise day
+            if push(index, iter(day)):
+                return
+
+    try:
+        # producers run concurrently, waiting for their first days in turn is free
+        for index in range(len(sys_sns)):
+            await advance(index)
+        while heap:
+            _, index, _, row, rows = heapq.heappop(heap)
+            yield row
+            if not push(index, rows):
+                await advance(index)
+    finally:
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
@@ -0,0 +1,249 @@
+"""Columnar store for fetched history, read through memory maps.
+
+Every system and dataset gets a directory with an int64 time index and one
+float64 file per field. Rows newer than the stored ones are appended, older
+ones, e.g. of a backfill or a re-fetched day, are merged in by rewriting
+the directory. Reads map the files and return numpy views, so opening the
+store and scanning it copies nothing. Times are the wall clock
+times reported by the api, counted in seconds since 1970-01-01 as if they
+were UTC.
+
+Requires numpy, install with the "analytics" extra.
+"""
+
+import calendar
+import datetime
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from alphaessaio import response
+
+logger = logging.getLogger(__name__)
+
+POWER_FIELDS = ("ppv", "load", "cbat", "feed_in", "grid_charge", "pcharging_pile")
+ENERGY_FIELDS = (
+    "epv",
+    "e_input",
+    "e_output",
+    "e_charge",
+    "e_discharge",
+    "e_grid_charge",
+    "e_charging_pile",
+)
+
+# dataset name: (time attribute, value fields)
+DATASETS = {
+    "power": ("upload_time", POWER_FIELDS),
+    "energy": ("the_date", ENERGY_FIELDS),
+}
+
+TIME_FILE = "time.i8"
+
+TimeLike = int | str | datetime.date | datetime.datetime
+
+
+def to_epoch(value: TimeLike) -> int:
+    """Convert a date, datetime, api time string or epoch to epoch seconds."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return calendar.timegm(value.replace(tzinfo=None).timetuple())
+
+
+def _map(path: Path, dtype: str, rows: int) -> np.ndarray:
+    if not rows:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+class TimeSeriesStore:
+    """Columnar files of getOneDayPowerBySn and getOneDateEnergyBySn rows."""
+
+    def __init__(self, root: str | Path):
+        """
+        Args:
+            root (str | Path): directory of the store, created on first append
+        """
+        self.root = Path(root)
+        for dataset in DATASETS:
+            for replaced in (self.root / dataset).glob("*.old"):
+                self._recover(replaced.with_suffix(""))
+
+    @staticmethod
+    def _recover(directory: Path):
+        """Finish or roll back a merge that crashed between its renames."""
+        replaced = directory.with_name(directory.name + ".old")
+        if not replaced.is_dir():
+            return
+        if directory.is_dir():
+            shutil.rmtree(replaced)
+            return
+        # the merged files were never moved in, the old ones are still complete
+        os.replace(replaced, directory)
+        logger.warning(f"Restored {directory} left behind by a crashed merge")
+
+    def _directory(self, dataset: str, sys_sn: str) -> Path:
+        if dataset not in DATASETS:
+            raise ValueError(
+                f"unknown dataset {dataset!r}, use one of {list(DATASETS)}"
+            )
+        return self.root / dataset / sys_sn
+
+    def rows(self, dataset: str, sys_sn: str) -> int:
+        """Number of stored rows of a system."""
+        path = self._directory(dataset, sys_sn) / TIME_FILE
+        try:
+            return os.path.getsize(path) // 8
+        except FileNotFoundError:
+            return 0
+
+    def last_time(self, dataset: str, sys_sn: str) -> int | None:
+        """Epoch seconds of the newest stored row or None."""
+        rows = self.rows(dataset, sys_sn)
+        if not rows:
+            return None
+        path = self._directory(dataset, sys_sn) / TIME_FILE
+        return int(_map(path, "<i8", rows)[-1])
+
+    def sys_sns(self, dataset: str) -> list[str]:
+        directory = self.root / dataset
+        if not directory.is_dir():
+            return []
+        return sorted(
+            path.name
+            for path in directory.iterdir()
+            if path.is_dir() and path.suffix not in (".merge", ".old")
+        )
+
+    def append(
+        self,
+        dataset: str,
+        sys_sn: str,
+        rows: Iterable[response.DataOneDayPowerBySn | response.DataOneDateEnergyBySn],
+    ) -> int:
+        """Store rows in time order.
+
+        Rows of times that are stored already are skipped, so appending an
+        overlapping or repeated day is safe. Rows newer than the stored ones
+        are appended, older ones are merged in, which rewrites the files of
+        the system.
+
+        Args:
+            dataset (str): "power" or "energy"
+            sys_sn (str): System S/N
+            rows (Iterable): validated rows of the dataset
+
+        Returns:
+            (int): number of stored rows
+        """
+        directory = self._directory(dataset, sys_sn)
+        self._recover(directory)
+        time_attr, fields = DATASETS[dataset]
+        rows = list(rows)
+        times = np.fromiter(
+            (to_epoch(getattr(row, time_attr)) for row in rows),
+            dtype="<i8",
+            count=len(rows),
+        )
+        values = np.array(
+            [[getattr(row, field) for field in fields] for row in rows],
+            dtype="<f8",
+        ).reshape(len(rows), len(fields))
+
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        keep = np.ones(len(times), dtype=bool)
+        keep[1:] = times[1:] != times[:-1]
+        rows_before = self.rows(dataset, sys_sn)
+        stored = _map(directory / TIME_FILE, "<i8", rows_before)
+        if rows_before and len(times) and times[0] <= stored[-1]:
+            keep &= ~np.isin(times, stored)
+        skipped = len(times) - int(keep.sum())
+        if skipped:
+            logger.debug(f"Skipped {skipped} stored {dataset} rows of {sys_sn}")
+        times, values = times[keep], values[keep]
+        if not len(times):
+            return 0
+        if rows_before and times[0] <= stored[-1]:
+            self._merge(dataset, sys_sn, times, values)
+            return len(times)
+
+        directory.mkdir(parents=True, exist_ok=True)
+        # value columns first: a crash leaves them longer than the time index,
+        # and readers only look at as many rows as the index has
+        for column, field in enumerate(fields):
+            with open(
+                directory / f"{field}.f8", "r+b" if rows_before else "wb"
+            ) as file:
+                file.truncate(rows_before * 8)
+                file.seek(0, os.SEEK_END)
+                file.write(np.ascontiguousarray(values[:, column]).tobytes())
+        with open(directory / TIME_FILE, "ab") as file:
+            file.write(times.tobytes())
+        logger.debug(f"Appended {len(times)} {dataset} rows of {sys_sn}")
+        return len(times)
+
+    def _merge(self, dataset: str, sys_sn: str, times: np.ndarray, values: np.ndarray):
+        """Rewrite the files of a system with sorted new rows merged in.
+
+        The merged files are written to a new directory that replaces the
+        old one, readers keep seeing the old rows until then. A crash between
+        the renames is rolled back when the store is opened or on the next
+        append.
+        """
+        directory = self._directory(dataset, sys_sn)
+        _, fields = DATASETS[dataset]
+        stored = self.read(dataset, sys_sn)
+        merged_times = np.concatenate([stored["time"], times])
+        order = np.argsort(merged_times, kind="stable")
+        merging = directory.with_name(directory.name + ".merge")
+        replaced = directory.with_name(directory.name + ".old")
+        # left over by a merge that crashed before its renames
+        shutil.rmtree(merging, ignore_errors=True)
+        merging.mkdir()
+        for column, field in enumerate(fields):
+            merged = np.concatenate([stored[field], values[:, column]])[order]
+            merged.astype("<f8").tofile(merging / f"{field}.f8")
+        merged_times[order].tofile(merging / TIME_FILE)
+        del stored
+        os.replace(directory, replaced)
+        os.replace(merging, directory)
+        shutil.rmtree(replaced)
+        logger.debug(f"Merged {len(times)} older {dataset} rows of {sys_sn}")
+
+    def read(
+        self,
+        dataset: str,
+        sys_sn: str,
+        start: TimeLike | None = None,
+        end: TimeLike | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Return read-only views of the rows with start <= time < end.
+
+        Args:
+            dataset (str): "power" or "energy"
+            sys_sn (str): System S/N
+            start (TimeLike | None): first time, by default the oldest row
+            end (TimeLike | None): exclusive end, by default after the newest row
+
+        Returns:
+            (dict[str, np.ndarray]): "time" in epoch seconds and one array per field
+        """
+        directory = self._directory(dataset, sys_sn)
+        _, fields = DATASETS[dataset]
+        rows = self.rows(dataset, sys_sn)
+        times = _map(directory / TIME_FILE, "<i8", rows)
+        first = 0 if start is None else int(np.searchsorted(times, to_epoch(start)))
+        stop = rows if end is None else int(np.searchsorted(times, to_epoch(end)))
+        columns = {"time": times[first:stop]}
+        for field in fields:
+            columns[field] = _map(directory / f"{field}.f8", "<f8", rows)[first:stop]
+        return columns
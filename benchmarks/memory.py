@@ -0,0 +1,325 @@
+"""Memory footprint benchmarks of the response models and typical workloads.
+
+Measures with tracemalloc:
+
+- model.<Name>: bytes per instance of every model in alphaessaio.response
+- parse.one_day_power_by_sn: peak bytes of validating a full day of 5 minute rows
+- parse.ess_list: peak bytes of validating a large getEssList response
+- polling.steady_state / polling.growth: bytes a client polling many systems
+  against a local stub server holds on top of its warmed-up state, and their
+  growth over the measured rounds; the stub runs in a child process, so only
+  client allocations are measured
+
+Results are written as json. Metrics exceeding a threshold make the run
+fail with exit code 1:
+
+    python -m benchmarks.memory --threshold model.DataLastPowerData=4000 \
+        --threshold polling.growth=100000 -o memory.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import gc
+import inspect
+import json
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+import types
+import typing
+from typing import Any, Callable
+
+import aiohttp
+import pydantic
+from aiohttp import web
+
+from alphaessaio import response
+from alphaessaio.client import AlphaEssAPI, AlphaEssAuth
+from alphaessaio.fleet import FleetSnapshotStore
+
+API_BASE = "https://openapi.alphaess.com/api/"
+
+
+def _sample_value(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        return _sample_value(next(arg for arg in args if arg is not type(None)))
+    if origin in (list, typing.List):
+        return [_sample_value(args[0])]
+    if origin is dict:
+        return {}
+    if inspect.isclass(annotation) and issubclass(annotation, pydantic.BaseModel):
+        return sample_payload(annotation)
+    if annotation is datetime.datetime:
+        return "2024-06-01 12:00:00"
+    return {float: 1234.5, int: 1, str: "SAMPLE0000000001", bool: True}[annotation]
+
+
+def _input_name(name: str, field: pydantic.fields.FieldInfo) -> str:
+    alias = field.validation_alias or field.alias or name
+    if isinstance(alias, pydantic.AliasChoices):
+        alias = alias.choices[0]
+    return alias
+
+
+def sample_payload(model: type[pydantic.BaseModel]) -> dict:
+    """Build a raw payload with a value for every field of a model."""
+    return {
+        _input_name(name, field): _sample_value(field.annotation)
+        for name, field in model.model_fields.items()
+    }
+
+
+def response_models() -> dict[str, type[pydantic.BaseModel]]:
+    return {
+        name: model
+        for name, model in inspect.getmembers(response, inspect.isclass)
+        if issubclass(model, pydantic.BaseModel)
+        and model is not pydantic.BaseModel
+        and model.__module__ == response.__name__
+    }
+
+
+def _allocated(build: Callable[[], Any]) -> tuple[Any, int, int]:
+    """Run build, returns its result, bytes still held and the peak."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current - before, peak - before
+
+
+def model_sizes(instances: int = 1000) -> dict[str, float]:
+    """Bytes per instance of every response model."""
+    sizes = {}
+    for name, model in response_models().items():
+        payload = sample_payload(model)
+        _, held, _ = _allocated(
+            lambda model=model, payload=payload: [
+                model.model_validate(payload) for _ in range(instances)
+            ]
+        )
+        sizes[f"model.{name}"] = held / instances
+    return sizes
+
+
+def one_day_power_payload(rows: int = 288) -> dict:
+    start = datetime.datetime(2024, 6, 1)
+    row = sample_payload(response.DataOneDayPowerBySn)
+    return {
+        "code": 200,
+        "msg": "Success",
+        "data": [
+            {**row, "uploadTime": str(start + datetime.timedelta(minutes=5 * i))}
+            for i in range(rows)
+        ],
+    }
+
+
+def ess_list_payload(systems: int) -> dict:
+    row = sample_payload(response.DataEssList)
+    return {
+        "code": 200,
+        "msg": "Success",
+        "data": [{**row, "sysSn": f"SN{i:08d}"} for i in range(systems)],
+    }
+
+
+def parse_peaks(ess_list_systems: int = 10000) -> dict[str, float]:
+    """Peak bytes of validating large responses, raw payload excluded."""
+    results = {}
+    for name, model, payload in (
+        (
+            "parse.one_day_power_by_sn",
+            response.OneDayPowerBySn,
+            one_day_power_payload(),
+        ),
+        (
+            "parse.ess_list",
+            response.EssList,
+            ess_list_payload(ess_list_systems),
+        ),
+    ):
+        _, _, peak = _allocated(
+            lambda model=model, payload=payload: model.model_validate(payload)
+        )
+        results[name] = peak
+    return results
+
+
+class _StubSession:
+    """Sends the requests of AlphaEssAPI to a local server instead."""
+
+    def __init__(self, session, base: str):
+        self.session = session
+        self.base = base
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url.replace(API_BASE, self.base), **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.session.post(url.replace(API_BASE, self.base), **kwargs)
+
+
+async def _serve_stub(connection):
+    payload = {
+        "code": 200,
+        "msg": "Success",
+        "data": sample_payload(response.DataLastPowerData),
+    }
+
+    async def last_power_data(request: web.Request) -> web.Response:
+        return web.json_response(payload)
+
+    app = web.Application()
+    app.router.add_get("/api/getLastPowerData", last_power_data)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    connection.send(runner.addresses[0][1])
+    await asyncio.Event().wait()
+
+
+def _stub_main(connection):
+    asyncio.run(_serve_stub(connection))
+
+
+async def _polling(
+    systems: int, rounds: int, concurrency: int, port: int
+) -> dict[str, float]:
+    sys_sns = [f"SN{i:08d}" for i in range(systems)]
+    store = FleetSnapshotStore(systems)
+    semaphore = asyncio.Semaphore(concurrency)
+    held = []
+    async with aiohttp.ClientSession() as session:
+        api = AlphaEssAPI(
+            AlphaEssAuth(appid="benchmark", appsecret="benchmark"),
+            session=_StubSession(session, f"http://127.0.0.1:{port}/api/"),
+        )
+
+        async def poll(sys_sn: str):
+            async with semaphore:
+                store.update(sys_sn, await api.get_last_power_data(sys_sn))
+
+        # warm-up fills connection pool, caches and the store
+        await asyncio.gather(*map(poll, sys_sns))
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            for _ in range(rounds):
+                await asyncio.gather(*map(poll, sys_sns))
+                gc.collect()
+                held.append(tracemalloc.get_traced_memory()[0] - baseline)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+    return {
+        "polling.steady_state": held[-1],
+        "polling.growth": held[-1] - held[0],
+        "polling.peak": peak,
+    }
+
+
+def polling(systems: int = 1000, rounds: int = 5, concurrency: int = 50) -> dict:
+    """Memory of a client polling systems against a stub server in a child process."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=_stub_main, args=(sender,), daemon=True)
+    server.start()
+    try:
+        if not receiver.poll(30):
+            raise RuntimeError("stub server did not start")
+        port = receiver.recv()
+        return asyncio.run(_polling(systems, rounds, concurrency, port))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def run(
+    model_instances: int = 1000,
+    ess_list_systems: int = 10000,
+    systems: int = 1000,
+    rounds: int = 5,
+) -> dict[str, float]:
+    metrics = {}
+    metrics.update(model_sizes(model_instances))
+    metrics.update(parse_peaks(ess_list_systems))
+    metrics.update(polling(systems, rounds))
+    return metrics
+
+
+def check(metrics: dict[str, float], thresholds: dict[str, float]) -> dict[str, dict]:
+    """Return the metrics above their threshold, unknown names count as failed."""
+    return {
+        name: {"value": metrics.get(name), "threshold": limit}
+        for name, limit in thresholds.items()
+        if name not in metrics or metrics[name] > limit
+    }
+
+
+def _threshold(value: str) -> tuple[str, float]:
+    name, _, limit = value.partition("=")
+    if not limit:
+        raise argparse.ArgumentTypeError(f"expected name=bytes, got {value!r}")
+    return name, float(limit)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--threshold",
+        type=_threshold,
+        action="append",
+        default=[],
+        help="fail if metric exceeds bytes, name=bytes, repeatable",
+    )
+    parser.add_argument("--thresholds", help="json file of {metric: bytes}")
+    parser.add_argument("--model-instances", type=int, default=1000)
+    parser.add_argument("--ess-list-systems", type=int, default=10000)
+    parser.add_argument("--systems", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write json to file")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds) as file:
+            thresholds.update(json.load(file))
+    thresholds.update(args.threshold)
+
+    metrics = run(
+        args.model_instances, args.ess_list_systems, args.systems, args.rounds
+    )
+    failures = check(metrics, thresholds)
+    result = {
+        "python": sys.version.split()[0],
+        "pydantic": pydantic.VERSION,
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "metrics": metrics,
+        "thresholds": thresholds,
+        "failures": failures,
+    }
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Stubs and payloads shared by the test modules."""
+
+import datetime
+
+from alphaessaio import response
+
+RAW_LAST_POWER_DATA = {
+    "code": 200,
+    "msg": "Success",
+    "data": {
+        "ppv": 1200.0,
+        "ppvDetail": {
+            "ppv1": 600.0,
+            "ppv2": 600.0,
+            "ppv3": 0.0,
+            "ppv4": 0.0,
+            "pmeterDc": 0.0,
+        },
+        "pload": 800.0,
+        "soc": 55.5,
+        "pgrid": -400.0,
+        "pgridDetail": {"pmeterL1": -100.0, "pmeterL2": -150.0, "pmeterL3": -150.0},
+        "pbat": 0.0,
+        "prealL1": 300.0,
+        "prealL2": 250.0,
+        "prealL3": 250.0,
+        "pev": 0.0,
+        "pevDetail": {
+            "ev1Power": 0.0,
+            "ev2Power": 0.0,
+            "ev3Power": 0.0,
+            "ev4Power": 0.0,
+        },
+    },
+}
+
+
+class MockResponse:
+    """Stands in for the response of aiohttp.ClientSession.get and post."""
+
+    def __init__(
+        self, data: dict | None = None, status: int = 200, headers: dict | None = None
+    ):
+        self._data = (
+            {"code": 200, "msg": "Success", "data": []} if data is None else data
+        )
+        self.status = status
+        self.url = "mocked"
+        self.headers = dict(headers or {})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def json(self):
+        return self._data
+
+
+def power_row(upload_time: str, ppv: float = 100.0) -> dict:
+    return {
+        "cbat": 50.0,
+        "feedIn": 0.0,
+        "gridCharge": 0.0,
+        "load": 200.0,
+        "pchargingPile": 0.0,
+        "ppv": ppv,
+        "sysSn": "SN1",
+        "uploadTime": upload_time,
+    }
+
+
+def power_day(query_date: str, skip=(), extra=()) -> dict:
+    start = datetime.datetime.fromisoformat(query_date)
+    rows = [
+        power_row(str(start + datetime.timedelta(minutes=5 * i)))
+        for i in range(288)
+        if i not in skip
+    ]
+    return {"code": 200, "msg": "Success", "data": rows + list(extra)}
+
+
+def power_models(raw: dict) -> list[response.DataOneDayPowerBySn]:
+    return response.OneDayPowerBySn(**raw).data
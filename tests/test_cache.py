@@ -0,0 +1,226 @@
+import asyncio
+import datetime
+
+import pytest
+
+from alphaessaio import cache, client
+
+TODAY = datetime.date(2024, 6, 15)
+DAY_RESPONSE = {
+    "code": 200,
+    "msg": "Success",
+    "data": [
+        {
+            "cbat": 50.0,
+            "feedIn": 0.0,
+            "gridCharge": 100.0,
+            "load": 300.0,
+            "pchargingPile": 0.0,
+            "ppv": 0.0,
+            "sysSn": "SN1",
+            "uploadTime": "2024-06-14 00:00:00",
+        }
+    ],
+}
+
+
+@pytest.fixture
+def history_cache(tmp_path) -> cache.HistoryCache:
+    history_cache = cache.HistoryCache(tmp_path / "history.db", today=lambda: TODAY)
+    yield history_cache
+    history_cache.close()
+
+
+def test_past_day_is_cached(history_cache):
+    assert history_cache.get("getOneDayPowerBySn", "SN1", "2024-06-14") is None
+    assert history_cache.put("getOneDayPowerBySn", "SN1", "2024-06-14", DAY_RESPONSE)
+    assert history_cache.get("getOneDayPowerBySn", "SN1", "2024-06-14") == DAY_RESPONSE
+    assert history_cache.stats.hits == 1
+    assert history_cache.stats.misses == 1
+
+
+@pytest.mark.parametrize(
+    "endpoint,query_date",
+    [
+        ("getOneDayPowerBySn", "2024-06-15"),
+        ("getOneDayPowerBySn", "2024-06-16"),
+        ("getOneDayPowerBySn", "not a date"),
+        ("getLastPowerData", "2024-06-14"),
+    ],
+)
+def test_not_cacheable(history_cache, endpoint, query_date):
+    assert not history_cache.put(endpoint, "SN1", query_date, DAY_RESPONSE)
+    assert history_cache.get(endpoint, "SN1", query_date) is None
+    assert len(history_cache) == 0
+
+
+def test_shared_between_connections(history_cache):
+    history_cache.put("getOneDayPowerBySn", "SN1", "2024-06-14", DAY_RESPONSE)
+    other = cache.HistoryCache(history_cache.path, today=lambda: TODAY)
+    assert other.get("getOneDayPowerBySn", "SN1", "2024-06-14") == DAY_RESPONSE
+    other.close()
+
+
+@pytest.mark.asyncio
+async def test_api_uses_history_cache(history_cache, mocker):
+    auth = client.AlphaEssAuth(appid="appid", appsecret="secret")
+    api = client.AlphaEssAPI(auth, history_cache=history_cache)
+    mocked_get = mocker.patch.object(api, "_get", return_value=DAY_RESPONSE)
+
+    for _ in range(3):
+        result = await api.get_one_day_power_by_sn("2024-06-14", "SN1")
+
+    assert result.data[0].sys_sn == "SN1"
+    mocked_get.assert_called_once()
+
+
+@pytest.fixture
+def shared_caches(tmp_path):
+    caches = [
+        cache.SharedResponseCache(tmp_path / "shared.db", poll_interval=0.01)
+        for _ in range(3)
+    ]
+    yield caches
+    for shared_cache in caches:
+        shared_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_fetches(shared_caches):
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.05)
+        return {"code": 200, "data": {"soc": 50}}
+
+    results = await asyncio.gather(
+        *(
+            shared_cache.get_or_fetch("getLastPowerData", {"sysSn": "SN1"}, fetch)
+            for shared_cache in shared_caches
+            for _ in range(2)
+        )
+    )
+
+    assert fetches == 1
+    assert all(result == {"code": 200, "data": {"soc": 50}} for result in results)
+    assert sum(shared_cache.stats.lock_waits for shared_cache in shared_caches) == 2
+    assert sum(shared_cache.stats.hits for shared_cache in shared_caches) == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried_by_waiting_worker(shared_caches):
+    first, second, _ = shared_caches
+
+    async def failing_fetch():
+        await asyncio.sleep(0.05)
+        raise client.AlphaEssRequestError({"code": 6026})
+
+    async def fetch():
+        return {"code": 200, "data": []}
+
+    failing = asyncio.create_task(first.get_or_fetch("getEssList", {}, failing_fetch))
+    # lets the first worker claim the fetch lock
+    await asyncio.sleep(0.02)
+    results = await asyncio.gather(
+        failing,
+        second.get_or_fetch("getEssList", {}, fetch),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], client.AlphaEssRequestError)
+    assert results[1] == {"code": 200, "data": []}
+
+
+@pytest.mark.asyncio
+async def test_uncached_endpoints_and_expiry(shared_caches):
+    shared_cache = shared_caches[0]
+    shared_cache.ttls["getLastPowerData"] = 0.01
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return {"code": 200, "data": len(calls)}
+
+    await shared_cache.get_or_fetch("remoteControlEvCharger", {}, fetch)
+    await shared_cache.get_or_fetch("remoteControlEvCharger", {}, fetch)
+    await shared_cache.get_or_fetch("getLastPowerData", {}, fetch)
+    await asyncio.sleep(0.02)
+    await shared_cache.get_or_fetch("getLastPowerData", {}, fetch)
+
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_responses_are_not_shared_between_accounts(shared_caches):
+    first, second, _ = shared_caches
+
+    async def fetch_a():
+        return {"code": 200, "data": [{"sysSn": "ACCOUNT_A_SN"}]}
+
+    async def fetch_b():
+        return {"code": 200, "data": [{"sysSn": "ACCOUNT_B_SN"}]}
+
+    await first.get_or_fetch("getEssList", {}, fetch_a, account="appid-a")
+    result = await second.get_or_fetch("getEssList", {}, fetch_b, account="appid-b")
+
+    assert result["data"][0]["sysSn"] == "ACCOUNT_B_SN"
+
+
+@pytest.mark.asyncio
+async def test_busy_database_does_not_block_the_loop(tmp_path):
+    shared_cache = cache.SharedResponseCache(
+        tmp_path / "shared.db", poll_interval=0.01, busy_timeout=0.2
+    )
+    blocker = cache._connect(tmp_path / "shared.db")
+    blocker.execute("BEGIN IMMEDIATE")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def fetch():
+        return {"code": 200, "data": {"soc": 50}}
+
+    ticking = asyncio.create_task(ticker())
+    lookup = asyncio.create_task(
+        shared_cache.get_or_fetch("getLastPowerData", {"sysSn": "SN1"}, fetch)
+    )
+    await asyncio.sleep(0.3)
+    ticking.cancel()
+    assert not lookup.done()
+    assert ticks > 10
+
+    blocker.execute("COMMIT")
+    assert await lookup == {"code": 200, "data": {"soc": 50}}
+    blocker.close()
+    shared_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_api_keys_shared_cache_by_appid(shared_caches, mocker):
+    apis = [
+        client.AlphaEssAPI(
+            client.AlphaEssAuth(appid=appid, appsecret="secret"),
+            shared_cache=shared_caches[0],
+        )
+        for appid in ("appid-a", "appid-b")
+    ]
+    for api, sys_sn in zip(apis, ("ACCOUNT_A_SN", "ACCOUNT_B_SN")):
+        mocker.patch.object(
+            api, "_request", return_value={"code": 200, "data": [{"sysSn": sys_sn}]}
+        )
+
+    results = [
+        await api._get("https://openapi.alphaess.com/api/getEssList", {})
+        for api in apis
+    ]
+
+    assert [result["data"][0]["sysSn"] for result in results] == [
+        "ACCOUNT_A_SN",
+        "ACCOUNT_B_SN",
+    ]
@@ -0,0 +1,51 @@
+import gzip
+
+import pytest
+
+from alphaessaio import cassette, client
+from tests.conftest import MockResponse
+
+SECRET = "c2d2ef6c047c49678e2c332fb2d74c3c"
+ESS_LIST = {"code": 200, "msg": "Success", "data": []}
+
+
+@pytest.fixture
+def auth() -> client.AlphaEssAuth:
+    return client.AlphaEssAuth(appid="alphaef7900ee81dbbce9", appsecret=SECRET)
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(auth, tmp_path, mocker):
+    path = tmp_path / "fleet.jsonl.gz"
+    get = mocker.patch.object(
+        client.aiohttp.ClientSession, "get", return_value=MockResponse(ESS_LIST)
+    )
+
+    with cassette.Cassette(path, mode="record") as recorder:
+        api = client.AlphaEssAPI(auth, cassette=recorder)
+        recorded = await api.get_ess_list()
+    assert recorder.recorded == 1
+
+    content = gzip.decompress(path.read_bytes()).decode()
+    assert SECRET not in content
+    assert cassette.REDACTED in content
+
+    get.reset_mock()
+    player = cassette.Cassette(path, mode="replay")
+    api = client.AlphaEssAPI(auth, cassette=player)
+    assert await api.get_ess_list() == recorded
+    get.assert_not_called()
+
+    with pytest.raises(cassette.CassetteMissError):
+        await api.get_ess_list()
+
+
+@pytest.mark.asyncio
+async def test_replayed_errors_are_raised(auth, tmp_path):
+    path = tmp_path / "errors.jsonl.gz"
+    with cassette.Cassette(path, mode="record") as recorder:
+        recorder.record("GET", "url", {}, {}, 200, {"code": 6007, "msg": "x"}, 0.1)
+
+    api = client.AlphaEssAPI(auth, cassette=cassette.Cassette(path))
+    with pytest.raises(client.AlphaEssAuthError):
+        await api._get("url", {})
@@ -0,0 +1,123 @@
+import io
+import json
+
+import pytest
+
+from alphaessaio import cli, client, response
+from tests.conftest import RAW_LAST_POWER_DATA
+
+
+def _args(*argv: str):
+    return cli.build_parser().parse_args(
+        ["--appid", "appid", "--appsecret", "secret", "-q", *argv]
+    )
+
+
+@pytest.mark.asyncio
+async def test_backfill_streams_json_lines(mocker):
+    async def get(url, params):
+        if params["sysSn"] == "BAD":
+            raise client.AlphaEssRequestError({"code": 6002})
+        return {"code": 200, "msg": "Success", "data": []}
+
+    mocker.patch.object(client.AlphaEssAPI, "_get", side_effect=get)
+    output = io.StringIO()
+
+    exit_code = await cli.run(
+        _args(
+            "backfill",
+            "--sn",
+            "SN1",
+            "--sn",
+            "BAD",
+            "--start",
+            "2024-06-01",
+            "--end",
+            "2024-06-02",
+        ),
+        output,
+    )
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert exit_code == 1
+    assert len(lines) == 4
+    assert {"sys_sn": "SN1", "query_date": "2024-06-01", "data": []} in lines
+    assert sum("error" in line for line in lines) == 2
+
+
+@pytest.mark.asyncio
+async def test_snapshot_defaults_to_all_systems(mocker):
+    get_ess_list = mocker.patch.object(
+        client.AlphaEssAPI, "get_ess_list", new_callable=mocker.AsyncMock
+    )
+    get_ess_list.return_value.data = [mocker.Mock(sys_sn="A"), mocker.Mock(sys_sn="B")]
+    get_last_power_data = mocker.patch.object(
+        client.AlphaEssAPI, "get_last_power_data", new_callable=mocker.AsyncMock
+    )
+    get_last_power_data.return_value = response.LastPowerData(**RAW_LAST_POWER_DATA)
+    output = io.StringIO()
+
+    assert await cli.run(_args("snapshot"), output) == 0
+    assert get_last_power_data.call_count == 2
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line["sys_sn"] for line in lines] == ["A", "B"]
+    assert lines[0]["data"]["soc"] == 55.5
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_calls(mocker):
+    sleep = mocker.patch("alphaessaio.cli.asyncio.sleep")
+    limiter = cli.RateLimiter(rate=10)
+    for _ in range(3):
+        await limiter.wait()
+    assert sleep.call_count == 2
+
+
+def test_sn_file_from_stdin_stays_open(mocker):
+    stdin = io.StringIO("SN1\n\nSN2\nSN1\n")
+    mocker.patch.object(cli.sys, "stdin", stdin)
+
+    assert cli._read_sns(_args("snapshot", "--sn", "SN0", "--sn-file", "-")) == [
+        "SN0",
+        "SN1",
+        "SN2",
+    ]
+    assert not stdin.closed
+
+
+SET_DISCHARGE = (
+    "discharge-config",
+    "set",
+    "--bat-use-cap=10",
+    "--ctr-dis=1",
+    "--time-disf1=17:00",
+    "--time-dise1=22:00",
+    "--time-disf2=00:00",
+    "--time-dise2=00:00",
+)
+
+
+@pytest.mark.asyncio
+async def test_set_requires_explicit_systems(mocker, tmp_path):
+    get_ess_list = mocker.patch.object(
+        client.AlphaEssAPI, "get_ess_list", new_callable=mocker.AsyncMock
+    )
+    empty = tmp_path / "systems.txt"
+    empty.write_text("\n")
+
+    with pytest.raises(SystemExit):
+        cli.main(["--appid", "appid", "--appsecret", "secret", *SET_DISCHARGE])
+    with pytest.raises(ValueError):
+        await cli.run(_args(*SET_DISCHARGE, "--sn-file", str(empty)), io.StringIO())
+    get_ess_list.assert_not_called()
+
+    get_ess_list.return_value.data = [mocker.Mock(sys_sn="A")]
+    update = mocker.patch.object(
+        client.AlphaEssAPI,
+        "update_dis_charge_config_info",
+        new_callable=mocker.AsyncMock,
+    )
+    update.return_value = mocker.Mock()
+    update.return_value.model_dump.return_value = {"data": None}
+    assert await cli.run(_args(*SET_DISCHARGE, "--all"), io.StringIO()) == 0
+    assert update.call_args.args[-1] == "A"
@@ -1,6 +1,10 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from unittest import mock
 import pytest
-from alphaessaio import client
+from alphaessaio import client, response
+from tests.conftest import RAW_LAST_POWER_DATA
 
 # values taken from docs
 MY_TEST_SECRET = "c2d2ef6c047c49678e2c332fb2d74c3c"
@@ -74,6 +78,7 @@ async def test_get_called_correctly(alphaess_api, mocker):
             self.url = url
             self._text = text
             self.status = status
+            self.headers = {}
 
         async def text(self):
             return self._text
@@ -98,3 +103,139 @@ async def test_get_called_correctly(alphaess_api, mocker):
 
 def test_post_called_correctly():
     pass
+
+
+def _ess_list_response(items: int) -> dict:
+    return {
+        "code": 200,
+        "msg": "Success",
+        "data": [
+            {
+                "cobat": 10.0,
+                "emsStatus": "Normal",
+                "mbat": "M",
+                "minv": "I",
+                "poinv": 5.0,
+                "popv": 6.0,
+                "surplusCobat": 4.0,
+                "sysSn": f"SN{i}",
+                "usCapacity": 90.0,
+            }
+            for i in range(items)
+        ],
+    }
+
+
+@pytest.mark.parametrize("executor_type", ["thread", "process"])
+@pytest.mark.asyncio
+async def test_large_payloads_parsed_in_executor(auth, mocker, executor_type):
+    executor_class = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+    with executor_class[executor_type](max_workers=1) as executor:
+        api = client.AlphaEssAPI(auth, parse_executor=executor, offload_min_items=10)
+        spy = mocker.spy(executor, "submit")
+
+        mocker.patch.object(api, "_get", return_value=_ess_list_response(3))
+        small = await api.get_ess_list()
+        assert spy.call_count == 0
+
+        mocker.patch.object(api, "_get", return_value=_ess_list_response(20))
+        large = await api.get_ess_list()
+        assert spy.call_count == 1
+
+    assert len(small.data) == 3
+    assert large.data[19].sys_sn == "SN19"
+
+
+@pytest.mark.asyncio
+async def test_system_snapshot_runs_parts_concurrently(alphaess_api, mocker):
+    sessions = []
+
+    def delayed(result):
+        async def call(*args):
+            sessions.append(client._scoped_session.get())
+            await asyncio.sleep(0.1)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return call
+
+    mocker.patch.object(
+        alphaess_api,
+        "get_last_power_data",
+        side_effect=delayed(response.LastPowerData(**RAW_LAST_POWER_DATA)),
+    )
+    mocker.patch.object(
+        alphaess_api,
+        "get_sum_data_for_customer",
+        side_effect=delayed(client.AlphaEssRequestError({"code": 500})),
+    )
+    mocker.patch.object(
+        alphaess_api,
+        "get_ev_charger_config_list",
+        side_effect=delayed(
+            response.EvChargerConfigList(
+                code=200,
+                msg="Success",
+                data=[{"evchargerSn": "EV1", "evchargerModel": "M"}],
+            )
+        ),
+    )
+    mocker.patch.object(
+        alphaess_api,
+        "get_ev_charger_status_by_sn",
+        side_effect=delayed(
+            response.EvChargerStatusBySn(
+                code=200, msg="Success", data=[{"evchargerStatus": 3}]
+            )
+        ),
+    )
+
+    started = time.monotonic()
+    snapshot = await alphaess_api.get_system_snapshot(
+        "SN1", parts=("last_power_data", "sum_data", "ev_chargers")
+    )
+
+    # ev chargers need two round trips, the other parts run next to them
+    assert time.monotonic() - started < 0.3
+    assert snapshot.last_power_data.soc == RAW_LAST_POWER_DATA["data"]["soc"]
+    assert snapshot.sum_data is None
+    assert list(snapshot.errors) == ["sum_data"]
+    assert snapshot.ev_chargers[0].evcharger_status == 3
+    assert snapshot.charge_config is None
+    assert len(set(map(id, sessions))) == 1 and sessions[0] is not None
+    assert client._scoped_session.get() is None
+
+
+@pytest.mark.asyncio
+async def test_system_snapshot_reports_failed_chargers_in_rows(alphaess_api, mocker):
+    async def get(url, params):
+        if url.endswith("getEvChargerConfigList"):
+            return {
+                "code": 200,
+                "msg": "Success",
+                "data": [
+                    {"evchargerSn": "EV1", "evchargerModel": "M"},
+                    {"evchargerSn": "EV2", "evchargerModel": "M"},
+                ],
+            }
+        if params["evchargerSn"] == "EV2":
+            raise client.AlphaEssRequestError({"code": 6002})
+        return {"code": 200, "msg": "Success", "data": [{"evchargerStatus": 3}]}
+
+    mocker.patch.object(alphaess_api, "_get", side_effect=get)
+    snapshot = await alphaess_api.get_system_snapshot("SN1", parts=("ev_chargers",))
+
+    assert snapshot.ev_chargers[0] == response.EvChargerStatusRow(
+        sys_sn="SN1", evcharger_sn="EV1", evcharger_model="M", evcharger_status=3
+    )
+    assert snapshot.ev_chargers[1].evcharger_status is None
+    assert snapshot.ev_chargers[1].error.startswith("AlphaEssRequestError")
+    assert not snapshot.errors
+    assert not snapshot.complete
+
+
+@pytest.mark.asyncio
+async def test_system_snapshot_rejects_unknown_parts(alphaess_api):
+    with pytest.raises(ValueError):
+        await alphaess_api.get_system_snapshot("SN1", parts=("weather",))
@@ -0,0 +1,74 @@
+import email.utils
+
+import pytest
+
+from alphaessaio import client, clock
+from tests.conftest import MockResponse
+
+SENT = 1_700_000_000.0
+
+
+def _date(timestamp: float) -> str:
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def test_offset_is_smoothed():
+    server_clock = clock.ServerClock(smoothing=0.5)
+    assert server_clock.observe(_date(SENT + 100), SENT, SENT + 0.2)
+    assert server_clock.offset == pytest.approx(100.4)
+
+    server_clock.observe(_date(SENT + 110), SENT + 10, SENT + 10.2)
+    assert server_clock.offset == pytest.approx(100.4)
+
+    server_clock.observe(_date(SENT + 30), SENT + 20, SENT + 20.2)
+    assert server_clock.offset == pytest.approx(55.4)
+
+
+def test_resync_replaces_estimate():
+    server_clock = clock.ServerClock()
+    server_clock.observe(_date(SENT), SENT, SENT)
+    server_clock.observe(_date(SENT - 60), SENT, SENT, resync=True)
+    assert server_clock.offset == pytest.approx(-59.5)
+    assert server_clock.resyncs == 1
+
+
+@pytest.mark.parametrize("header", [None, "", "not a date"])
+def test_unusable_headers_are_ignored(header):
+    server_clock = clock.ServerClock()
+    assert not server_clock.observe(header, SENT, SENT)
+    assert server_clock.offset == 0
+
+
+def test_offset_applied_to_signature(mocker):
+    mocker.patch("alphaessaio.client.time.time", return_value=SENT)
+    auth = client.AlphaEssAuth(appid="appid", appsecret="secret")
+    headers = auth.create_headers(offset=120.4)
+    assert headers["timeStamp"] == str(int(SENT) + 120)
+    assert headers["sign"] == auth._get_signature(headers["timeStamp"])
+
+
+@pytest.mark.asyncio
+async def test_timestamp_rejection_resyncs_and_retries(mocker):
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+    server_time = client.time.time() + 3600
+    get = mocker.patch.object(
+        client.aiohttp.ClientSession,
+        "get",
+        side_effect=[
+            MockResponse(
+                {"code": 6006, "msg": "timestamp error"},
+                headers={"Date": _date(server_time)},
+            ),
+            MockResponse(
+                {"code": 200, "msg": "Success", "data": []},
+                headers={"Date": _date(server_time)},
+            ),
+        ],
+    )
+
+    await api.get_ess_list()
+
+    assert get.call_count == 2
+    assert api.clock.offset == pytest.approx(3600, abs=2)
+    retried_at = int(get.call_args.kwargs["headers"]["timeStamp"])
+    assert retried_at == pytest.approx(server_time, abs=2)
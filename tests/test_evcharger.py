@@ -0,0 +1,66 @@
+import pytest
+
+from alphaessaio import client, evcharger, response
+
+
+def _config_list(sys_sn: str) -> dict:
+    return {
+        "code": 200,
+        "msg": "Success",
+        "data": [
+            {"evchargerSn": f"{sys_sn}-EV{i}", "evchargerModel": "SMILE-EVCT11"}
+            for i in range(2)
+        ],
+    }
+
+
+@pytest.fixture
+def api(mocker) -> client.AlphaEssAPI:
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+
+    async def get(url, params):
+        if url.endswith("getEvChargerConfigList"):
+            return _config_list(params["sysSn"])
+        if params["evchargerSn"] == "B-EV1":
+            raise client.AlphaEssRequestError({"code": 6002})
+        return {"code": 200, "msg": "Success", "data": [{"evchargerStatus": 3}]}
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    return api
+
+
+@pytest.mark.asyncio
+async def test_sweep_returns_flat_table(api):
+    inventory = evcharger.EvChargerInventory(api)
+    rows = await inventory.sweep(["A", "B"])
+
+    assert len(rows) == 4
+    assert rows[0] == response.EvChargerStatusRow(
+        sys_sn="A",
+        evcharger_sn="A-EV0",
+        evcharger_model="SMILE-EVCT11",
+        evcharger_status=3,
+    )
+    failed = [row for row in rows if row.error]
+    assert [row.evcharger_sn for row in failed] == ["B-EV1"]
+    assert failed[0].evcharger_status is None
+
+
+@pytest.mark.asyncio
+async def test_topology_is_cached(api):
+    inventory = evcharger.EvChargerInventory(api)
+    await inventory.sweep(["A"])
+    await inventory.sweep(["A"])
+
+    urls = [call.args[0] for call in api._get.call_args_list]
+    assert sum(url.endswith("getEvChargerConfigList") for url in urls) == 1
+    assert sum(url.endswith("getEvChargerStatusBySn") for url in urls) == 4
+
+
+@pytest.mark.asyncio
+async def test_stale_topology_is_refreshed(api):
+    inventory = evcharger.EvChargerInventory(api, topology_ttl=0)
+    await inventory.discover(["A"])
+    await inventory.discover(["A"])
+
+    assert api._get.call_count == 2
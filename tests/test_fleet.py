@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from alphaessaio import fleet, response
+from tests.conftest import RAW_LAST_POWER_DATA
+
+
+@pytest.fixture
+def last_power_data() -> response.LastPowerData:
+    return response.LastPowerData(**RAW_LAST_POWER_DATA)
+
+
+def test_update_and_get(last_power_data):
+    store = fleet.FleetSnapshotStore(capacity=2)
+    store.update("SN1", last_power_data, timestamp=10.0)
+
+    values = store.get("SN1")
+    assert values["soc"] == 55.5
+    assert values["pmeter_l2"] == -150.0
+    assert store.updated_at("SN1") == 10.0
+    assert "SN1" in store and len(store) == 1
+
+
+def test_raw_and_model_flatten_equal(last_power_data):
+    assert fleet.flatten_raw_last_power_data(
+        RAW_LAST_POWER_DATA
+    ) == fleet.flatten_last_power_data(last_power_data)
+
+
+def test_grow_and_column(last_power_data):
+    store = fleet.FleetSnapshotStore(capacity=1)
+    for i in range(5):
+        store.update_raw(f"SN{i}", RAW_LAST_POWER_DATA)
+        store._columns["soc"][store._index[f"SN{i}"]] = i
+
+    assert store.capacity >= 5
+    assert list(store.column("soc")) == [0, 1, 2, 3, 4]
+
+
+def test_remove_moves_last_row(last_power_data):
+    store = fleet.FleetSnapshotStore()
+    for sys_sn in ("A", "B", "C"):
+        store.update(sys_sn, last_power_data)
+    store._columns["soc"][store._index["C"]] = 99.0
+
+    store.remove("A")
+
+    assert store.sys_sns == ["C", "B"]
+    assert store.value("C", "soc") == 99.0
+    with pytest.raises(KeyError):
+        store.get("A")
+
+
+def test_missing_raw_values_are_nan():
+    values = fleet.flatten_raw_last_power_data({"ppv": 1.0})
+    assert values[0] == 1.0
+    assert math.isnan(values[1])
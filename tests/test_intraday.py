@@ -0,0 +1,150 @@
+import datetime
+
+import pytest
+
+from alphaessaio import client, intraday
+from tests.conftest import power_row
+
+
+def _upload(query_date: str, index: int) -> str:
+    start = datetime.datetime.fromisoformat(query_date)
+    return str(start + datetime.timedelta(minutes=5 * index))
+
+
+@pytest.fixture
+def api() -> client.AlphaEssAPI:
+    return client.AlphaEssAPI(client.AlphaEssAuth(appid="id", appsecret="secret"))
+
+
+@pytest.mark.asyncio
+async def test_only_new_rows_are_validated_and_emitted(api, mocker):
+    uploaded = {"2024-06-01": 100}
+
+    async def get(url, params):
+        day = params["queryDate"]
+        rows = [power_row(_upload(day, i)) for i in range(uploaded.get(day, 0))]
+        return {"code": 200, "msg": "Success", "data": rows[::-1]}
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    tracker = intraday.IntradayTracker(api, today=lambda: datetime.date(2024, 6, 1))
+    emitted = []
+    tracker.add_listener(lambda sys_sn, rows: emitted.append((sys_sn, len(rows))))
+
+    assert len(await tracker.update("SN1")) == 100
+    uploaded["2024-06-01"] = 102
+    new_rows = await tracker.update("SN1")
+    assert await tracker.update("SN1") == []
+
+    assert [str(row.upload_time) for row in new_rows] == [
+        _upload("2024-06-01", 100),
+        _upload("2024-06-01", 101),
+    ]
+    assert tracker.validated == 102
+    assert len(tracker.series("SN1").rows) == 102
+    assert emitted == [("SN1", 100), ("SN1", 2)]
+
+
+@pytest.mark.asyncio
+async def test_midnight_rollover_finishes_previous_day(api, mocker):
+    uploaded = {"2024-06-01": 286}
+
+    async def get(url, params):
+        day = params["queryDate"]
+        rows = [power_row(_upload(day, i)) for i in range(uploaded.get(day, 0))]
+        return {"code": 200, "msg": "Success", "data": rows}
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    today = datetime.date(2024, 6, 1)
+    tracker = intraday.IntradayTracker(api, today=lambda: today)
+    await tracker.update("SN1")
+
+    uploaded.update({"2024-06-01": 288, "2024-06-02": 1})
+    today = datetime.date(2024, 6, 2)
+    new_rows = await tracker.update("SN1")
+
+    assert [str(row.upload_time) for row in new_rows] == [
+        _upload("2024-06-01", 286),
+        _upload("2024-06-01", 287),
+        _upload("2024-06-02", 0),
+    ]
+    assert tracker.series("SN1").query_date == "2024-06-02"
+    assert len(tracker.series("SN1").rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_all_skips_failed_systems(api, mocker):
+    async def get(url, params):
+        if params["sysSn"] == "SN2":
+            raise client.AlphaEssRequestError({"code": 500})
+        return {
+            "code": 200,
+            "msg": "Success",
+            "data": [power_row("2024-06-01 00:00:00")],
+        }
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    tracker = intraday.IntradayTracker(api, today=lambda: datetime.date(2024, 6, 1))
+
+    results = await tracker.update_all(["SN1", "SN2"])
+
+    assert list(results) == ["SN1"]
+    assert len(results["SN1"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_upload_times_are_compared_as_datetimes(api, mocker):
+    data = [power_row("2024-06-01 10:00:00")]
+
+    async def get(url, params):
+        return {"code": 200, "msg": "Success", "data": data}
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    tracker = intraday.IntradayTracker(api, today=lambda: datetime.date(2024, 6, 1))
+    await tracker.update("SN1")
+
+    # differs from "2024-06-01 10:00:00" as text but is the same upload
+    data.append(power_row("2024-06-01T10:00:00"))
+    assert await tracker.update("SN1") == []
+
+    # sorts after "2024-06-01 10:00:00" as text but is older
+    data.append(power_row("2024-06-01T09:55:00"))
+    late_rows = await tracker.update("SN1")
+    assert [str(row.upload_time) for row in late_rows] == ["2024-06-01 09:55:00"]
+    assert await tracker.update("SN1") == []
+
+    data.append(power_row("2024-06-01 10:5:00"))
+    with pytest.raises(ValueError):
+        await tracker.update("SN1")
+
+
+@pytest.mark.asyncio
+async def test_late_rows_fill_gaps(api, mocker):
+    uploaded = [0, 1, 4, 5]
+
+    async def get(url, params):
+        rows = [power_row(_upload("2024-06-01", i)) for i in uploaded]
+        return {"code": 200, "msg": "Success", "data": rows}
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    tracker = intraday.IntradayTracker(api, today=lambda: datetime.date(2024, 6, 1))
+    emitted = []
+    tracker.add_listener(lambda sys_sn, rows: emitted.extend(rows))
+    await tracker.update("SN1")
+
+    # the inverter reconnected and uploaded the missing intervals
+    uploaded[2:2] = [2, 3]
+    late_rows = await tracker.update("SN1")
+
+    assert [str(row.upload_time) for row in late_rows] == [
+        _upload("2024-06-01", 2),
+        _upload("2024-06-01", 3),
+    ]
+    assert len(emitted) == 6
+    series = tracker.series("SN1")
+    assert [str(row.upload_time) for row in series.rows] == [
+        _upload("2024-06-01", i) for i in range(6)
+    ]
+    assert series.last_upload == datetime.datetime.fromisoformat(
+        _upload("2024-06-01", 5)
+    )
+    assert tracker.validated == 6
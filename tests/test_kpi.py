@@ -0,0 +1,101 @@
+import math
+import time
+
+import numpy as np
+import pytest
+
+from alphaessaio import kpi, response
+
+
+def _sum_data(epvtoday: float, sufficiency: float) -> response.DataSumDataForCustomer:
+    return response.DataSumDataForCustomer(
+        epvtoday=epvtoday,
+        epvtotal=1000.0,
+        eload=10.0,
+        eoutput=1.0,
+        einput=2.0,
+        echarge=3.0,
+        edischarge=3.0,
+        todayIncome=1.0,
+        totalIncome=100.0,
+        eselfConsumption=80.0,
+        eselfSufficiency=sufficiency,
+        treeNum=1.0,
+        carbonNum=1.0,
+        moneyType="EUR",
+    )
+
+
+def _ess_list(popvs: dict[str, float]) -> response.EssList:
+    return response.EssList(
+        code=200,
+        msg="Success",
+        data=[
+            {
+                "cobat": 10.0,
+                "emsStatus": "Normal",
+                "mbat": "M",
+                "minv": "I",
+                "poinv": 5.0,
+                "popv": popv,
+                "surplusCobat": 4.0,
+                "sysSn": sys_sn,
+                "usCapacity": 90.0,
+            }
+            for sys_sn, popv in popvs.items()
+        ],
+    )
+
+
+def test_specific_yield_ranking_and_missing_values():
+    kpis = kpi.FleetKpis(capacity=2)
+    kpis.update_ess_list(_ess_list({"A": 10.0, "B": 5.0, "C": 0.0, "D": 8.0}))
+    kpis.update_sum_data("A", _sum_data(30.0, 50.0))
+    kpis.update_sum_data("B", _sum_data(30.0, 60.0))
+    kpis.update_sum_data("C", _sum_data(30.0, 70.0))
+
+    assert kpis.top("specific_yield", 2) == [("B", 6.0), ("A", 3.0)]
+    assert kpis.bottom("specific_yield", 5) == [("A", 3.0), ("B", 6.0)]
+    assert kpis.percentiles("self_sufficiency", (0, 50, 100)) == {
+        0: 50.0,
+        50: 60.0,
+        100: 70.0,
+    }
+    assert math.isnan(kpis.metric("self_sufficiency")[kpis.sys_sns.index("D")])
+
+
+def test_incremental_update_and_remove():
+    kpis = kpi.FleetKpis()
+    kpis.update_ess_list(_ess_list({"A": 10.0, "B": 10.0}))
+    kpis.update_sum_data("A", _sum_data(10.0, 50.0))
+    kpis.update_sum_data("B", _sum_data(20.0, 50.0))
+
+    kpis.update_sum_data("A", _sum_data(40.0, 50.0))
+    assert kpis.top("specific_yield", 1) == [("A", 4.0)]
+
+    kpis.remove("A")
+    assert kpis.sys_sns == ["B"]
+    assert kpis.top("specific_yield", 1) == [("B", 2.0)]
+    assert "A" not in kpis
+
+
+def test_outliers_and_overview_of_large_fleet():
+    generator = np.random.default_rng(1)
+    sys_sns = [f"SN{i}" for i in range(10_000)]
+    kpis = kpi.FleetKpis()
+    kpis.update_ess_list(_ess_list(dict.fromkeys(sys_sns, 10.0)))
+    for sys_sn, epvtoday in zip(sys_sns, generator.normal(40, 2, len(sys_sns))):
+        kpis.update_sum_data(sys_sn, _sum_data(float(epvtoday), 50.0))
+    kpis.update_sum_data("SN7", _sum_data(0.0, 50.0))
+
+    started = time.perf_counter()
+    overview = kpis.overview(k=5)
+    elapsed = time.perf_counter() - started
+
+    assert "SN7" in overview["specific_yield"]["outliers"]
+    assert overview["specific_yield"]["bottom"][0] == ("SN7", 0.0)
+    assert overview["self_sufficiency"]["outliers"] == []
+    assert len(overview["us_capacity"]["top"]) == 5
+    assert elapsed < 0.5
+    with pytest.raises(ValueError):
+        kpis.metric("weather")
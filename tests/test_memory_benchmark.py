@@ -0,0 +1,30 @@
+import json
+
+from benchmarks import memory
+
+
+def test_every_response_model_gets_a_sample():
+    for model in memory.response_models().values():
+        model.model_validate(memory.sample_payload(model))
+
+
+def test_small_run_writes_json_and_checks_thresholds(tmp_path):
+    output = tmp_path / "memory.json"
+
+    code = memory.main(
+        [
+            "--model-instances=10",
+            "--ess-list-systems=100",
+            "--systems=20",
+            "--rounds=2",
+            "--threshold=model.DataEssList=1e9",
+            "--threshold=parse.ess_list=1",
+            "-o",
+            str(output),
+        ]
+    )
+
+    result = json.loads(output.read_text())
+    assert code == 1
+    assert list(result["failures"]) == ["parse.ess_list"]
+    assert {"model.LastPowerData", "polling.growth"} <= set(result["metrics"])
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from alphaessaio import client, push, response
+from tests.conftest import RAW_LAST_POWER_DATA
+
+
+@pytest.fixture
+def api(mocker) -> client.AlphaEssAPI:
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="id", appsecret="secret"))
+    mocker.patch.object(
+        api,
+        "get_last_power_data",
+        new_callable=mocker.AsyncMock,
+        return_value=response.LastPowerData(**RAW_LAST_POWER_DATA),
+    )
+    return api
+
+
+def test_hub_filters_by_sn_and_replays_latest():
+    hub = push.PushHub()
+    everything = hub.subscribe()
+    only_b = hub.subscribe(["B"])
+
+    hub.publish("A", "a1")
+    hub.publish("B", "b1")
+    late = hub.subscribe(["A"])
+
+    assert [everything.queue.get_nowait() for _ in range(2)] == ["a1", "b1"]
+    assert only_b.queue.get_nowait() == "b1"
+    assert only_b.queue.empty()
+    assert late.queue.get_nowait() == "a1"
+
+
+def test_hub_drops_slow_subscriber():
+    hub = push.PushHub(queue_size=2)
+    slow = hub.subscribe()
+    fast = hub.subscribe()
+
+    for i in range(3):
+        hub.publish("A", f"a{i}")
+        fast.queue.get_nowait()
+
+    assert slow.dropped
+    assert slow.queue.get_nowait() is None
+    assert hub.subscribers == {fast}
+    assert hub.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_polled_once_for_all_subscribers(api):
+    server = push.PushServer(api, sys_sns=["SN1", "SN2"])
+    subscribers = [server.hub.subscribe() for _ in range(50)]
+
+    await server.poll_once()
+    await server.poll_once()
+
+    assert api.get_last_power_data.await_count == 4
+    # unchanged values are not pushed again
+    assert all(subscriber.queue.qsize() == 2 for subscriber in subscribers)
+
+
+@pytest.mark.asyncio
+async def test_sse_and_websocket_receive_filtered_updates(api):
+    server = push.PushServer(api, sys_sns=["SN1", "SN2"], interval=3600)
+    async with TestClient(TestServer(server.app())) as http:
+        while len(server.hub.latest) < 2:
+            await asyncio.sleep(0.01)
+
+        async with http.get("/events?sn=SN2") as events:
+            line = await events.content.readline()
+        assert json.loads(line.decode().removeprefix("data: "))["sys_sn"] == "SN2"
+
+        async with http.ws_connect("/ws?sn=SN1,SN2") as socket:
+            received = {json.loads(await socket.receive_str())["sys_sn"] for _ in "12"}
+        assert received == {"SN1", "SN2"}
+
+    assert api.get_last_power_data.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_poller_survives_failed_rounds(api, mocker, caplog):
+    ess_list = response.EssList(code=200, msg="Success", data=[])
+    mocker.patch.object(
+        api,
+        "get_ess_list",
+        new_callable=mocker.AsyncMock,
+        side_effect=[client.AlphaEssRequestError({"code": 6026}), ess_list],
+    )
+    server = push.PushServer(api, interval=0.01)
+
+    poller = asyncio.create_task(server._poll_forever())
+    await asyncio.sleep(0.05)
+    poller.cancel()
+
+    assert server.sys_sns == []
+    assert "Polling round failed" in caplog.text
+
+
+def test_replay_of_large_fleet_does_not_drop_new_subscriber():
+    hub = push.PushHub(queue_size=10)
+    for i in range(25):
+        hub.publish(f"SN{i}", f"m{i}")
+
+    subscriber = hub.subscribe()
+    hub.publish("SN0", "m0-new")
+
+    assert not subscriber.dropped
+    assert hub.subscribers == {subscriber}
+    assert hub.dropped == 0
+    messages = [subscriber.queue.get_nowait() for _ in range(26)]
+    assert messages[0] == "m0" and messages[-1] == "m0-new"
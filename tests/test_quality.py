@@ -0,0 +1,100 @@
+import dataclasses
+import datetime
+import json
+
+import pytest
+
+from alphaessaio import client, quality
+from tests.conftest import power_day, power_models, power_row
+
+
+def test_complete_day():
+    report = quality.check_day(
+        "SN1", "2024-06-14", power_models(power_day("2024-06-14"))
+    )
+    assert report.complete
+    assert report.rows == report.expected_rows == 288
+
+
+def test_detects_problems():
+    raw = power_day(
+        "2024-06-14",
+        skip=(10, 11),
+        extra=[
+            power_row("2024-06-14 00:00:00"),
+            power_row("2024-06-15 00:00:00", ppv=-5),
+        ],
+    )
+    report = quality.check_day("SN1", "2024-06-14", power_models(raw))
+
+    assert not report.complete
+    assert report.missing_intervals == 2
+    assert report.out_of_order == 1
+    assert report.outside_day == 1
+    assert report.invalid_values == 1
+    # plain ints, reports are written as json
+    assert json.loads(json.dumps(dataclasses.asdict(report)))["missing_intervals"] == 2
+
+
+def test_current_day_only_expects_past_intervals():
+    raw = power_day("2024-06-14")
+    raw["data"] = raw["data"][:120]
+    report = quality.check_day(
+        "SN1",
+        "2024-06-14",
+        power_models(raw),
+        until=datetime.datetime(2024, 6, 14, 10, 3),
+    )
+    assert report.complete
+
+
+@pytest.mark.asyncio
+async def test_fetch_checked_refetches_incomplete_days_only(mocker):
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+    responses = {
+        "2024-06-13": [power_day("2024-06-13")],
+        "2024-06-14": [power_day("2024-06-14", skip=(5,)), power_day("2024-06-14")],
+    }
+
+    async def get(url, params):
+        return responses[params["queryDate"]].pop(0)
+
+    mocked_get = mocker.patch.object(api, "_get", side_effect=get)
+    results = await quality.fetch_checked(
+        api, [("SN1", "2024-06-13"), ("SN1", "2024-06-14")]
+    )
+
+    assert mocked_get.call_count == 3
+    assert all(report.complete for _, report in results.values())
+
+
+@pytest.mark.asyncio
+async def test_fetch_checked_retries_failed_days(mocker):
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+    responses = {
+        "2024-06-13": [power_day("2024-06-13")],
+        "2024-06-14": [
+            client.AlphaEssRequestError({"code": 6002}),
+            power_day("2024-06-14"),
+        ],
+        "2024-06-15": [client.AlphaEssRequestError({"code": 6002})] * 3,
+    }
+
+    async def get(url, params):
+        result = responses[params["queryDate"]].pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    results = await quality.fetch_checked(
+        api, [("SN1", "2024-06-13"), ("SN1", "2024-06-14"), ("SN1", "2024-06-15")]
+    )
+
+    assert results[("SN1", "2024-06-13")][1].complete
+    assert results[("SN1", "2024-06-14")][1].complete
+    day, report = results[("SN1", "2024-06-15")]
+    assert day is None
+    assert not report.complete
+    assert report.error.startswith("AlphaEssRequestError")
+    assert not responses["2024-06-15"]
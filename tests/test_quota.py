@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+
+from alphaessaio import client, quota
+from alphaessaio.cache import _connect
+from tests.conftest import MockResponse
+
+
+class Clock:
+    def __init__(self, now: datetime.datetime):
+        self.now = now
+
+    def __call__(self) -> datetime.datetime:
+        return self.now
+
+
+def test_counts_persist_per_day_account_and_endpoint(tmp_path):
+    clock = Clock(datetime.datetime(2024, 6, 1, 12))
+    ledger = quota.QuotaLedger(tmp_path / "quota.db", now=clock)
+    ledger.record("app1", "getLastPowerData")
+    ledger.record("app1", "getLastPowerData")
+    ledger.record("app1", "getEssList")
+    ledger.record("app2", "getEssList")
+    ledger.close()
+
+    ledger = quota.QuotaLedger(tmp_path / "quota.db", now=clock)
+    assert ledger.usage("app1") == 3
+    assert ledger.usage("app1", "getEssList") == 1
+    assert ledger.usage_by_endpoint("app1") == {"getEssList": 1, "getLastPowerData": 2}
+
+    clock.now = datetime.datetime(2024, 6, 2, 0, 1)
+    assert ledger.usage("app1") == 0
+    assert ledger.usage("app1", day="2024-06-01") == 3
+
+
+def test_projection_and_pacing(tmp_path):
+    clock = Clock(datetime.datetime(2024, 6, 1, 6))
+    ledger = quota.QuotaLedger(
+        tmp_path / "quota.db",
+        daily_limit=1000,
+        endpoint_limits={"getOneDayPowerBySn": 100},
+        now=clock,
+    )
+    ledger.record("app1", "getLastPowerData", 200)
+
+    # a quarter of the day is over, 200 calls project to 800
+    assert ledger.projected("app1") == pytest.approx(800)
+    assert ledger.pace_delay("app1") == 0
+
+    ledger.record("app1", "getOneDayPowerBySn", 50)
+    status = ledger.status("app1", "getOneDayPowerBySn")
+    assert status.projected == pytest.approx(200)
+    assert status.remaining == 50
+    # the remaining 50 calls are spread over the remaining 18 hours
+    assert status.pace_delay == pytest.approx(18 * 3600 / 50)
+
+
+@pytest.mark.asyncio
+async def test_client_records_every_sent_request(tmp_path, mocker):
+    ledger = quota.QuotaLedger(tmp_path / "quota.db")
+    api = client.AlphaEssAPI(
+        client.AlphaEssAuth(appid="app1", appsecret="secret"), quota=ledger
+    )
+    mocker.patch.object(
+        client.aiohttp.ClientSession, "get", return_value=MockResponse()
+    )
+
+    await api.get_ess_list()
+    await api.get_ess_list()
+
+    assert ledger.usage_by_endpoint("app1") == {"getEssList": 2}
+
+
+def test_rate_covers_all_processes_sharing_the_file(tmp_path):
+    clock = Clock(datetime.datetime(2024, 6, 1, 12))
+    ledgers = [
+        quota.QuotaLedger(tmp_path / "quota.db", rate_window=600, now=clock)
+        for _ in range(4)
+    ]
+    ledgers[0].record("app1", "getLastPowerData")
+
+    clock.now += datetime.timedelta(minutes=15)
+    for ledger in ledgers:
+        ledger.record("app1", "getLastPowerData", 150)
+
+    # 600 calls of all four ledgers within the 10 minute window
+    assert all(ledger.rate("app1") == pytest.approx(1.0) for ledger in ledgers)
+    assert ledgers[1].rate("app1", "getEssList") == 0
+
+
+def test_locked_database_is_logged_not_waited_for(tmp_path, caplog):
+    ledger = quota.QuotaLedger(tmp_path / "quota.db", busy_timeout=0.05)
+    blocker = _connect(tmp_path / "quota.db")
+    blocker.execute("BEGIN IMMEDIATE")
+
+    assert not ledger.record("app1", "getEssList")
+    assert "not counted" in caplog.text
+
+    blocker.execute("COMMIT")
+    assert ledger.record("app1", "getEssList")
+    assert ledger.usage("app1") == 1
+    blocker.close()
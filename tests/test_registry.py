@@ -0,0 +1,71 @@
+import pytest
+
+from alphaessaio import client, registry, response
+
+
+def _system(sys_sn: str, ems_status: str = "Normal", surplus: float = 4.0) -> dict:
+    return {
+        "cobat": 10.0,
+        "emsStatus": ems_status,
+        "mbat": "M",
+        "minv": "I",
+        "poinv": 5.0,
+        "popv": 6.0,
+        "surplusCobat": surplus,
+        "sysSn": sys_sn,
+        "usCapacity": 90.0,
+    }
+
+
+def _ess_list(*systems: dict) -> response.EssList:
+    return response.EssList(code=200, msg="Success", data=list(systems))
+
+
+def test_diff_reports_added_changed_and_removed():
+    fleet = registry.FleetRegistry()
+    received = []
+    fleet.add_listener(received.append)
+
+    first = fleet.update(_ess_list(_system("A"), _system("B")))
+    assert [(event.kind, event.sys_sn) for event in first] == [
+        ("added", "A"),
+        ("added", "B"),
+    ]
+
+    assert fleet.update(_ess_list(_system("A"), _system("B"))) == []
+
+    events = fleet.update(_ess_list(_system("B", "Fault", 2.5), _system("C")))
+    assert [(event.kind, event.sys_sn) for event in events] == [
+        ("changed", "B"),
+        ("added", "C"),
+        ("removed", "A"),
+    ]
+    assert events[0].changes == {
+        "ems_status": ("Normal", "Fault"),
+        "surplus_cobat": (4.0, 2.5),
+    }
+    assert events[2].system.sys_sn == "A"
+    assert len(received) == 2
+    assert "A" not in fleet and len(fleet) == 2
+
+
+def test_ignored_fields_are_not_reported():
+    fleet = registry.FleetRegistry(ignore=("surplus_cobat",))
+    fleet.update(_ess_list(_system("A")))
+
+    assert fleet.update(_ess_list(_system("A", surplus=1.0))) == []
+    assert fleet.systems["A"].surplus_cobat == 1.0
+
+
+@pytest.mark.asyncio
+async def test_refresh_fetches_ess_list(mocker):
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="id", appsecret="secret"))
+    mocker.patch.object(
+        api,
+        "_get",
+        return_value={"code": 200, "msg": "Success", "data": [_system("A")]},
+    )
+
+    events = await registry.FleetRegistry().refresh(api)
+
+    assert [event.kind for event in events] == ["added"]
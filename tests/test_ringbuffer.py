@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from alphaessaio import fleet, response, ringbuffer
+from tests.conftest import RAW_LAST_POWER_DATA
+
+
+def _samples(count: int, width: int, seed: int = 1):
+    generator = random.Random(seed)
+    timestamp = 1_700_000_000
+    values = [float(generator.randint(0, 5000)) for _ in range(width)]
+    for _ in range(count):
+        timestamp += generator.choice((60, 60, 60, 61, 59, 300, 100_000))
+        field = generator.randrange(width)
+        values[field] = generator.choice(
+            (values[field] + generator.uniform(-50, 50), 0.0, math.pi, -1.5e300)
+        )
+        yield timestamp, list(values)
+
+
+def test_round_trip_is_lossless():
+    ring = ringbuffer.SampleRing(width=5, retention=10**9, block_size=50)
+    samples = list(_samples(333, 5))
+    for timestamp, values in samples:
+        ring.append(timestamp, values)
+
+    times, values = ring.window()
+
+    assert len(ring) == 333
+    assert times.tolist() == [timestamp for timestamp, _ in samples]
+    assert values.tolist() == [values for _, values in samples]
+
+
+def test_window_and_retention():
+    ring = ringbuffer.SampleRing(width=2, retention=3600, block_size=10)
+    for minute in range(180):
+        ring.append(minute * 60, [float(minute), 1.0])
+
+    times, values = ring.window(start=150 * 60, end=160 * 60)
+    assert times.tolist() == [minute * 60 for minute in range(150, 160)]
+    assert values[:, 0].tolist() == [float(minute) for minute in range(150, 160)]
+
+    # blocks of ten minutes are kept while their last sample is within the hour
+    first, _ = ring.window()
+    assert first[0] == 110 * 60
+
+    with pytest.raises(ValueError):
+        ring.append(0, [0.0, 0.0])
+
+
+def test_live_buffer_compresses_last_power_data():
+    buffer = ringbuffer.LiveSampleBuffer()
+    model = response.LastPowerData(**RAW_LAST_POWER_DATA)
+    for minute in range(24 * 60):
+        raw = {**RAW_LAST_POWER_DATA["data"], "ppv": float(minute % 97)}
+        buffer.append("SN1", raw if minute % 2 else model, timestamp=minute * 60)
+
+    columns = buffer.window("SN1", start=60 * 60)
+
+    assert len(columns["time"]) == 23 * 60
+    assert np.all(np.diff(columns["time"]) == 60)
+    assert columns["soc"][0] == RAW_LAST_POWER_DATA["data"]["soc"]
+    assert set(columns) == {"time", *fleet.FIELD_NAMES}
+    raw_size = 24 * 60 * (8 + 8 * len(fleet.FIELD_NAMES))
+    assert buffer.nbytes < raw_size / 10
+    assert len(buffer.window("SN2")["time"]) == 0
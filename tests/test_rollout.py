@@ -0,0 +1,160 @@
+import json
+
+import pytest
+
+from alphaessaio import cache, client, response, rollout
+
+CHARGE = response.DataChargeConfigInfo(
+    batHighCap=90.0,
+    gridCharge=1,
+    timeChae1="05:00",
+    timeChae2="00:00",
+    timeChaf1="02:00",
+    timeChaf2="00:00",
+)
+DIS_CHARGE = response.DataDisChargeConfigInfo(
+    batUseCap=10.0,
+    ctrDis=1,
+    timeDise1="22:00",
+    timeDise2="00:00",
+    timeDisf1="17:00",
+    timeDisf2="00:00",
+)
+
+
+class FakeApi:
+    """Stores settings per system, updates of broken systems are lost."""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.charge = {}
+        self.dis_charge = {}
+        self.updates = []
+
+    def _default(self, model, target):
+        return model(**{**target.model_dump(by_alias=True), **self._old(model)})
+
+    @staticmethod
+    def _old(model):
+        if model is response.DataChargeConfigInfo:
+            return {"batHighCap": 100.0}
+        return {"batUseCap": 5.0}
+
+    async def get_charge_config_info(self, sys_sn, cached=True):
+        data = self.charge.get(sys_sn) or self._default(
+            response.DataChargeConfigInfo, CHARGE
+        )
+        return response.ChargeConfigInfo(code=200, msg="Success", data=data)
+
+    async def get_dis_charge_config_info(self, sys_sn, cached=True):
+        data = self.dis_charge.get(sys_sn) or self._default(
+            response.DataDisChargeConfigInfo, DIS_CHARGE
+        )
+        return response.DisChargeConfigInfo(code=200, msg="Success", data=data)
+
+    async def update_charge_config_info(self, sys_sn, *values):
+        self.updates.append(("charge", sys_sn))
+        if sys_sn not in self.broken:
+            fields = response.DataChargeConfigInfo.model_fields
+            self.charge[sys_sn] = response.DataChargeConfigInfo.model_validate(
+                dict(zip(fields, values)), by_name=True
+            )
+
+    async def update_dis_charge_config_info(self, *values):
+        *values, sys_sn = values
+        self.updates.append(("dis_charge", sys_sn))
+        if sys_sn not in self.broken:
+            fields = response.DataDisChargeConfigInfo.model_fields
+            self.dis_charge[sys_sn] = response.DataDisChargeConfigInfo.model_validate(
+                dict(zip(fields, values)), by_name=True
+            )
+
+
+@pytest.mark.asyncio
+async def test_waves_update_and_verify_every_system():
+    api = FakeApi()
+    sys_sns = [f"SN{i}" for i in range(25)]
+
+    report = await rollout.ConfigRollout(
+        api, CHARGE, DIS_CHARGE, waves=(2, 5), verify_delay=0
+    ).run(sys_sns)
+
+    assert [wave.systems for wave in report.waves] == [2, 5, 5, 5, 5, 3]
+    assert sum(wave.verified for wave in report.waves) == 25
+    assert not report.failures and not report.halted
+    assert api.charge["SN24"] == CHARGE
+    assert api.dis_charge["SN24"] == DIS_CHARGE
+
+
+@pytest.mark.asyncio
+async def test_failing_wave_halts_and_resume_skips_done_systems(tmp_path):
+    checkpoint = tmp_path / "rollout.json"
+    sys_sns = [f"SN{i}" for i in range(20)]
+    api = FakeApi(broken={"SN1"})
+
+    report = await rollout.ConfigRollout(
+        api, charge=CHARGE, waves=(4, None), checkpoint=checkpoint, verify_delay=0
+    ).run(sys_sns)
+
+    assert report.halted
+    assert list(report.failures) == ["SN1"]
+    assert "read-back differs in charge.bat_high_cap" in report.failures["SN1"]
+    assert json.loads(checkpoint.read_text())["status"]["SN1"] == "failed"
+
+    api.broken.clear()
+    api.updates.clear()
+    resumed = await rollout.ConfigRollout(
+        api, charge=CHARGE, waves=(4, None), checkpoint=checkpoint, verify_delay=0
+    ).run(sys_sns)
+
+    assert resumed.skipped == 3
+    assert [wave.systems for wave in resumed.waves] == [4, 13]
+    assert ("charge", "SN0") not in api.updates
+    assert not resumed.failures
+
+
+@pytest.mark.asyncio
+async def test_matching_systems_are_not_updated(tmp_path):
+    api = FakeApi()
+    api.charge["SN0"] = CHARGE
+
+    report = await rollout.ConfigRollout(api, charge=CHARGE, waves=(None,)).run(
+        ["SN0", "SN1"]
+    )
+
+    assert (report.waves[0].unchanged, report.waves[0].verified) == (1, 1)
+    assert api.updates == [("charge", "SN1")]
+
+
+def test_settings_are_required():
+    with pytest.raises(ValueError):
+        rollout.ConfigRollout(FakeApi())
+
+
+@pytest.mark.asyncio
+async def test_verification_bypasses_shared_cache(tmp_path, mocker):
+    shared_cache = cache.SharedResponseCache(tmp_path / "shared.db")
+    api = client.AlphaEssAPI(
+        client.AlphaEssAuth(appid="appid", appsecret="secret"),
+        shared_cache=shared_cache,
+    )
+    settings = {"SN1": {**CHARGE.model_dump(by_alias=True), "batHighCap": 100.0}}
+
+    async def request(method, url, params):
+        if url.endswith("updateChargeConfigInfo"):
+            settings[params["sysSn"]] = {
+                key: value for key, value in params.items() if key != "sysSn"
+            }
+        return {"code": 200, "msg": "Success", "data": settings[params["sysSn"]]}
+
+    mocker.patch.object(api, "_request", side_effect=request)
+    # the pre-update settings are in the shared cache
+    await api.get_charge_config_info("SN1")
+
+    report = await rollout.ConfigRollout(api, CHARGE, verify_delay=0).run(["SN1"])
+
+    assert report.waves[0].verified == 1
+    assert not report.failures
+    cached = await api.get_charge_config_info("SN1")
+    assert cached.data.bat_high_cap == 90.0
+    shared_cache.close()
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from alphaessaio import client, deadline, scheduler
+from alphaessaio.scheduler import Priority
+
+
+@pytest.mark.asyncio
+async def test_free_slots_go_to_most_urgent_class():
+    request_scheduler = scheduler.RequestScheduler(max_concurrency=1)
+    order = []
+
+    async def run(priority, name):
+        async with request_scheduler.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await request_scheduler.acquire(Priority.BULK)
+    tasks = [
+        asyncio.create_task(run(Priority.BULK, "bulk")),
+        asyncio.create_task(run(Priority.REALTIME, "realtime")),
+        asyncio.create_task(run(Priority.CONTROL, "control")),
+    ]
+    await asyncio.sleep(0)
+    request_scheduler.release(Priority.BULK)
+    await asyncio.gather(*tasks)
+
+    assert order == ["control", "realtime", "bulk"]
+
+
+@pytest.mark.asyncio
+async def test_class_limit_leaves_room_for_others():
+    request_scheduler = scheduler.RequestScheduler(
+        max_concurrency=2, limits={Priority.BULK: 1}
+    )
+    await request_scheduler.acquire(Priority.BULK)
+
+    waiting_bulk = asyncio.create_task(request_scheduler.acquire(Priority.BULK))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(request_scheduler.acquire(Priority.CONTROL), 1)
+
+    assert not waiting_bulk.done()
+    request_scheduler.release(Priority.BULK)
+    await waiting_bulk
+
+
+@pytest.mark.asyncio
+async def test_expired_requests_are_dropped():
+    request_scheduler = scheduler.RequestScheduler(max_concurrency=1)
+    await request_scheduler.acquire(Priority.CONFIG)
+
+    with deadline.deadline(0.01), pytest.raises(deadline.AlphaEssDeadlineError):
+        await request_scheduler.acquire(Priority.BULK)
+
+    assert request_scheduler.dropped[Priority.BULK] == 1
+    assert request_scheduler.waiting(Priority.BULK) == 0
+
+
+@pytest.mark.asyncio
+async def test_api_drops_expired_request(mocker):
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+    send = mocker.patch.object(api, "_send")
+
+    with deadline.deadline(-1), pytest.raises(deadline.AlphaEssDeadlineError):
+        await api.get_ess_list()
+
+    send.assert_not_called()
+
+
+def test_nested_deadline_does_not_extend():
+    with deadline.deadline(1) as outer, deadline.deadline(10) as inner:
+        assert inner == outer
+    assert deadline.remaining() is None
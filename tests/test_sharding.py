@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from alphaessaio import client, response, sharding
+
+SYS_SNS = [f"SN{i}" for i in range(200)]
+
+
+@pytest.fixture
+def api() -> client.AlphaEssAPI:
+    return client.AlphaEssAPI(client.AlphaEssAuth(appid="id", appsecret="secret"))
+
+
+def test_hash_ring_moves_only_keys_of_new_member():
+    before = sharding.HashRing(["a", "b", "c"])
+    after = sharding.HashRing(["a", "b", "c", "d"])
+
+    moved = [sn for sn in SYS_SNS if before.owner(sn) != after.owner(sn)]
+
+    assert {after.owner(sn) for sn in moved} == {"d"}
+    assert {before.owner(sn) for sn in SYS_SNS} == {"a", "b", "c"}
+    assert sharding.HashRing().owner("SN0") is None
+
+
+def test_lease_blocks_other_workers_until_released(tmp_path):
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=60)
+
+    assert store.acquire("SN0", "a")
+    assert store.acquire("SN0", "a")
+    assert not store.acquire("SN0", "b")
+
+    store.release("SN0", "a")
+    assert store.acquire("SN0", "b")
+    assert store.held("b") == {"SN0"}
+
+    store.leave("b")
+    assert store.held("b") == set()
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=-1)
+
+    assert store.acquire("SN0", "a")
+    assert store.acquire("SN0", "b")
+
+
+@pytest.mark.asyncio
+async def test_workers_split_fleet_without_double_polling(api, tmp_path):
+    path = tmp_path / "leases.db"
+    polled: dict[str, list[str]] = {}
+
+    def poller(worker_id: str) -> sharding.ShardedPoller:
+        async def poll(api, sys_sn):
+            polled.setdefault(sys_sn, []).append(worker_id)
+
+        store = sharding.LeaseStore(path, lease_seconds=120)
+        return sharding.ShardedPoller(
+            api, store, poll, worker_id=worker_id, sys_sns=SYS_SNS
+        )
+
+    first = poller("first")
+    assert await first.run_once() == set(SYS_SNS)
+
+    # a joining worker gets nothing until the owner released its share
+    second = poller("second")
+    polled.clear()
+    assert await second.run_once() == set()
+
+    polled.clear()
+    first_share = await first.run_once()
+    second_share = await second.run_once()
+
+    assert first_share and second_share
+    assert first_share | second_share == set(SYS_SNS)
+    assert all(len(workers) == 1 for workers in polled.values())
+
+    # leaving hands the share back on the next round
+    first.store.leave("first")
+    assert await second.run_once() == set(SYS_SNS)
+
+
+@pytest.mark.asyncio
+async def test_poll_failures_are_counted(api, tmp_path):
+    async def poll(api, sys_sn):
+        raise client.AlphaEssRequestError("boom")
+
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=120)
+    poller = sharding.ShardedPoller(api, store, poll, sys_sns=SYS_SNS[:3])
+
+    await poller.run_once()
+
+    assert (poller.polls, poller.failures) == (0, 3)
+
+
+def test_lease_must_outlive_interval(api, tmp_path):
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=30)
+
+    with pytest.raises(ValueError):
+        sharding.ShardedPoller(api, store, lambda api, sn: None, interval=60)
+
+
+def test_leases_are_taken_and_released_in_batches(tmp_path):
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=60)
+    assert store.acquire("SN0", "b")
+
+    assert store.acquire_many(SYS_SNS[:3], "a") == {"SN1", "SN2"}
+    assert store.acquire_many(SYS_SNS[:3], "a") == {"SN1", "SN2"}
+
+    store.release_many(SYS_SNS[:2], "a")
+    assert store.held("a") == {"SN2"}
+    assert store.held("b") == {"SN0"}
+
+
+@pytest.mark.asyncio
+async def test_run_survives_failed_rounds(api, tmp_path, mocker, caplog):
+    polled = []
+
+    async def poll(api, sys_sn):
+        polled.append(sys_sn)
+        poller.stop()
+
+    mocker.patch.object(
+        api,
+        "get_ess_list",
+        new_callable=mocker.AsyncMock,
+        side_effect=[
+            client.AlphaEssRequestError({"code": 6026}),
+            response.EssList(
+                code=200,
+                msg="Success",
+                data=[
+                    response.DataEssList(
+                        cobat=10.0,
+                        emsStatus="Normal",
+                        mbat="M",
+                        minv="I",
+                        poinv=5.0,
+                        popv=6.0,
+                        surplusCobat=4.0,
+                        sysSn="SN1",
+                        usCapacity=90.0,
+                    )
+                ],
+            ),
+        ],
+    )
+    store = sharding.LeaseStore(tmp_path / "leases.db", lease_seconds=1)
+    poller = sharding.ShardedPoller(api, store, poll, interval=0.01)
+
+    await asyncio.wait_for(poller.run(), 5)
+
+    assert polled == ["SN1"]
+    assert "Polling round" in caplog.text
@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+from alphaessaio import client, stream
+
+
+def _day(sys_sn: str, query_date: str, minutes: list[int]) -> dict:
+    start = datetime.datetime.fromisoformat(query_date)
+    return {
+        "code": 200,
+        "msg": "Success",
+        "data": [
+            {
+                "cbat": 50.0,
+                "feedIn": 0.0,
+                "gridCharge": 0.0,
+                "load": 200.0,
+                "pchargingPile": 0.0,
+                "ppv": 100.0,
+                "sysSn": sys_sn,
+                "uploadTime": str(start + datetime.timedelta(minutes=minute)),
+            }
+            for minute in minutes
+        ],
+    }
+
+
+DAYS = {
+    ("A", "2024-06-01"): _day("A", "2024-06-01", [10, 0, 20]),
+    ("A", "2024-06-02"): _day("A", "2024-06-02", [5]),
+    ("B", "2024-06-01"): _day("B", "2024-06-01", [5, 15]),
+    ("B", "2024-06-02"): _day("B", "2024-06-02", []),
+    ("C", "2024-06-01"): _day("C", "2024-06-01", []),
+    ("C", "2024-06-02"): _day("C", "2024-06-02", [0, 30]),
+}
+
+
+@pytest.fixture
+def api(mocker) -> client.AlphaEssAPI:
+    api = client.AlphaEssAPI(client.AlphaEssAuth(appid="appid", appsecret="secret"))
+
+    async def get(url, params):
+        if params["sysSn"] == "BAD":
+            raise client.AlphaEssRequestError({"code": 6002})
+        return DAYS[(params["sysSn"], params["queryDate"])]
+
+    mocker.patch.object(api, "_get", side_effect=get)
+    return api
+
+
+def test_date_range():
+    assert stream.date_range("2024-02-28", "2024-03-01") == [
+        "2024-02-28",
+        "2024-02-29",
+        "2024-03-01",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rows_are_merged_by_upload_time(api):
+    rows = [
+        row
+        async for row in stream.merged_history(
+            api, ["A", "B", "C"], "2024-06-01", "2024-06-02"
+        )
+    ]
+
+    times = [row.upload_time for row in rows]
+    assert times == sorted(times)
+    assert [row.sys_sn for row in rows] == ["A", "B", "A", "B", "A", "C", "A", "C"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_errors_are_raised(api):
+    with pytest.raises(client.AlphaEssRequestError):
+        async for _ in stream.merged_history(api, ["A", "BAD"], "2024-06-01"):
+            pass
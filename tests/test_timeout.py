@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from alphaessaio import client
+from alphaessaio.deadline import AlphaEssDeadlineError, AlphaEssTimeoutError, deadline
+
+
+class StalledResponse:
+    """Response that never arrives, honouring the request timeout like aiohttp."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.timeout.total)
+        raise asyncio.TimeoutError
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+@pytest.fixture
+def stalled_get(mocker):
+    return mocker.patch.object(
+        client.aiohttp.ClientSession,
+        "get",
+        side_effect=lambda *args, timeout, **kwargs: StalledResponse(timeout),
+    )
+
+
+@pytest.fixture
+def api() -> client.AlphaEssAPI:
+    return client.AlphaEssAPI(
+        client.AlphaEssAuth(appid="appid", appsecret="secret"),
+        timeouts={"getLastPowerData": client.aiohttp.ClientTimeout(total=0.01)},
+    )
+
+
+@pytest.mark.asyncio
+async def test_endpoint_timeout_raises_distinct_error(api, stalled_get):
+    with pytest.raises(AlphaEssTimeoutError) as error:
+        await api.get_last_power_data("SN1")
+    assert not isinstance(error.value, AlphaEssDeadlineError)
+    assert stalled_get.call_args.kwargs["timeout"].total == 0.01
+
+
+@pytest.mark.asyncio
+async def test_deadline_clips_request_timeout(api, stalled_get):
+    with deadline(0.01), pytest.raises(AlphaEssDeadlineError):
+        await api.get_sum_data_for_customer("SN1")
+    timeout = stalled_get.call_args.kwargs["timeout"]
+    assert timeout.total <= 0.01
+    assert timeout.sock_read <= 0.01
+
+
+@pytest.mark.asyncio
+async def test_fan_out_shares_remaining_budget(api, stalled_get):
+    with deadline(0.05):
+        results = await asyncio.gather(
+            *(api.get_one_day_power_by_sn("2024-06-01", f"SN{i}") for i in range(5)),
+            return_exceptions=True,
+        )
+        with pytest.raises(AlphaEssDeadlineError):
+            await api.get_ess_list()
+
+    assert all(isinstance(result, AlphaEssDeadlineError) for result in results)
+    assert stalled_get.call_count == 5
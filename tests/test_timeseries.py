@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from alphaessaio import response, timeseries
+from tests.conftest import power_day, power_models
+
+
+def test_append_and_range_query(tmp_path):
+    store = timeseries.TimeSeriesStore(tmp_path)
+
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 288
+    assert (
+        store.append("power", "SN1", power_models(power_day("2024-06-02"))[::-1]) == 288
+    )
+
+    columns = timeseries.TimeSeriesStore(tmp_path).read(
+        "power", "SN1", "2024-06-01 23:00:00", "2024-06-02 01:00:00"
+    )
+
+    assert len(columns["time"]) == 24
+    assert columns["time"][0] == timeseries.to_epoch("2024-06-01 23:00:00")
+    assert np.all(np.diff(columns["time"]) == 300)
+    assert isinstance(columns["ppv"], np.memmap)
+    assert columns["ppv"].sum() == 24 * 100.0
+    assert store.sys_sns("power") == ["SN1"]
+
+
+def test_overlapping_rows_are_skipped(tmp_path):
+    store = timeseries.TimeSeriesStore(tmp_path)
+    store.append(
+        "power", "SN1", power_models(power_day("2024-06-01", skip=range(144, 288)))
+    )
+
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 144
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 0
+    assert store.rows("power", "SN1") == 288
+    assert store.last_time("power", "SN1") == timeseries.to_epoch("2024-06-01 23:55:00")
+
+
+def test_older_rows_are_merged_in(tmp_path):
+    store = timeseries.TimeSeriesStore(tmp_path)
+    store.append("power", "SN1", power_models(power_day("2024-06-02")))
+    store.append(
+        "power", "SN1", power_models(power_day("2024-06-03", skip=range(100, 110)))
+    )
+
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 288
+    assert store.append("power", "SN1", power_models(power_day("2024-06-03"))) == 10
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 0
+
+    columns = store.read("power", "SN1")
+    assert len(columns["time"]) == 3 * 288
+    assert np.all(np.diff(columns["time"]) == 300)
+    assert columns["ppv"].sum() == 3 * 288 * 100.0
+    assert store.sys_sns("power") == ["SN1"]
+
+
+def test_merge_crashed_between_renames_is_recovered(tmp_path):
+    store = timeseries.TimeSeriesStore(tmp_path)
+    store.append("power", "SN1", power_models(power_day("2024-06-02")))
+    # state after the first rename of a merge, the merged files are still aside
+    directory = tmp_path / "power" / "SN1"
+    directory.rename(tmp_path / "power" / "SN1.old")
+    (tmp_path / "power" / "SN1.merge").mkdir()
+
+    store = timeseries.TimeSeriesStore(tmp_path)
+    assert store.rows("power", "SN1") == 288
+    assert not (tmp_path / "power" / "SN1.old").exists()
+
+    directory.rename(tmp_path / "power" / "SN1.old")
+    assert store.append("power", "SN1", power_models(power_day("2024-06-01"))) == 288
+    assert store.rows("power", "SN1") == 2 * 288
+    assert store.sys_sns("power") == ["SN1"]
+    assert sorted(path.name for path in (tmp_path / "power").iterdir()) == ["SN1"]
+
+
+def test_energy_dataset_and_empty_reads(tmp_path):
+    store = timeseries.TimeSeriesStore(tmp_path)
+    rows = [
+        response.DataOneDateEnergyBySn(
+            eCharge=1.0,
+            eChargingPile=0.0,
+            eDischarge=2.0,
+            eGridCharge=0.0,
+            eInput=3.0,
+            eOutput=4.0,
+            epv=5.0 + day,
+            sysSn="SN1",
+            theDate=f"2024-06-{day:02d}",
+        )
+        for day in range(1, 31)
+    ]
+    store.append("energy", "SN1", rows)
+
+    june = store.read("energy", "SN1", "2024-06-10", "2024-06-20")
+    assert list(june["epv"]) == [5.0 + day for day in range(10, 20)]
+
+    assert len(store.read("energy", "SN2")["time"]) == 0
+    with pytest.raises(ValueError):
+        store.read("weather", "SN1")